@@ -2,23 +2,15 @@ import os
 import platform
 import subprocess
 
-import ayon_api
-from ayon_core.pipeline import get_representation_path
 from ayon_core.addon import (
     AYONAddon,
     IPluginPaths,
     click_wrap,
     ensure_addons_are_process_ready,
 )
-from ayon_core.lib.transcoding import (
-    VIDEO_EXTENSIONS, IMAGE_EXTENSIONS
-)
 
 from .version import __version__
 
-VIDEO_EXTENSIONS_TUPLE = tuple(VIDEO_EXTENSIONS)
-IMAGE_EXTENSIONS_TUPLE = tuple(IMAGE_EXTENSIONS)
-
 
 class ColorbleedAddon(AYONAddon, IPluginPaths):
     name = "colorbleed"
@@ -61,81 +53,200 @@ class ColorbleedAddon(AYONAddon, IPluginPaths):
             .option("--entity_type", required=True, help="Entity type")
             .argument("entity_ids", nargs=-1, required=True)
         )
+        (
+            main_group.command(
+                self._cli_convert_apng,
+                name="convert-apng",
+                help="Convert representations to APNG."
+            )
+            .option("--project", required=True, help="Project name")
+            .option(
+                "--profile",
+                default="",
+                help="APNGC settings profile, not used by 'native' assembler"
+            )
+            .option(
+                "--status_file",
+                default=None,
+                help="Write progress as JSON lines to this file"
+            )
+            .option(
+                "--assembler",
+                default=None,
+                help="APNG assembler, 'apngc' or 'native'"
+            )
+            .option(
+                "--compression",
+                default=None,
+                help="Compression backend, 'tinify', 'local' or 'none'"
+            )
+            .argument("representation_ids", nargs=-1, required=True)
+        )
+        (
+            main_group.command(
+                self._cli_daemon,
+                name="daemon",
+                help=(
+                    "Run resident process that runs the 'run' and "
+                    "'show-in-explorer' commands for faster startup."
+                )
+            )
+            .option(
+                "--stop",
+                is_flag=True,
+                default=False,
+                help="Stop the running daemon"
+            )
+        )
         # Convert main command to click object and add it to parent group
         addon_click_group.add_command(
             main_group.to_click_obj()
         )
 
     def _cli_main(self):
+        # Addons are prepared by the commands that run in this process, so
+        # requests handed over to the daemon do not pay for it
+        pass
+
+    def _ensure_process_ready(self):
         ensure_addons_are_process_ready(
             addon_name=self.name,
             addon_version=self.version
         )
 
+    def _send_to_daemon(self, command, **kwargs):
+        """Return True if the running daemon took the request."""
+        from .daemon import send_request
+
+        return send_request(command, **kwargs)
+
+    def _get_entity_representations(
+        self, project_name, entity_type, entity_ids
+    ):
+        """Return resolved path and representation entity pairs."""
+        from .resolve import iter_representation_paths
+
+        return list(iter_representation_paths(
+            project_name, {entity_type: entity_ids}
+        ))
+
     def _get_entity_paths(self, project_name, entity_type, entity_ids):
-        paths: "list[str]" = []
-        if entity_type == "version":
-            representations = ayon_api.get_representations(
-                project_name=project_name,
-                version_ids=entity_ids,
-            )
-            for representation in representations:
-                path = get_representation_path(representation)
-                paths.append(path)
-        return paths
+        return [
+            path for path, _representation in
+            self._get_entity_representations(
+                project_name, entity_type, entity_ids)
+        ]
+
+    def _get_open_file_settings(self, project_name):
+        from .actions import DEFAULT_OPEN_FILE_SETTINGS
+        from .project_cache import get_project_settings
+
+        project_settings = get_project_settings(project_name)
+        return project_settings.get(self.name, {}).get(
+            "open_file", DEFAULT_OPEN_FILE_SETTINGS)
 
     def _cli_run(
         self, project, entity_type, entity_ids
     ):
-        """Run paths using OS default application"""
-
-        paths = self._get_entity_paths(project, entity_type, entity_ids)
-        if not paths:
+        """Run the best path of each version using OS default application"""
+        if self._send_to_daemon(
+            "run",
+            project=project,
+            entity_type=entity_type,
+            entity_ids=list(entity_ids)
+        ):
             return
+        self._ensure_process_ready()
+        self.run_entities(project, entity_type, entity_ids)
 
-        # Unfortunately the user is unable to pick a specific representation
-        # from the web frontend. So we will prioritize certain files over
-        # others - hoping we're running a file that makes sense to run.
-        def prioritize(path: str) -> int:
-            # Lower number is prioritized
-            order = 0
-
-            # Prefer certain image/video extensions first
-            if path.endswith(".exr"):
-                order -= 1000
-            elif path.endswith("_h264.mp4"):
-                order -= 30
-            elif path.endswith(".mp4"):
-                order -= 20
-
-            # Videos first, then images
-            if path.endswith(VIDEO_EXTENSIONS_TUPLE):
-                order -= 1000
-            elif path.endswith(IMAGE_EXTENSIONS_TUPLE):
-                order -= 500
+    def run_entities(self, project, entity_type, entity_ids):
+        from .actions import get_best_path_per_version
 
-            # Avoid paths that do not exist
-            if not os.path.exists(path):
-                order += 9999
+        items = self._get_entity_representations(
+            project, entity_type, entity_ids)
+        if not items:
+            return
 
-            return order
+        open_file_settings = self._get_open_file_settings(project)
+        paths = get_best_path_per_version(items, open_file_settings)
+        max_open_files = open_file_settings.get("max_open_files", 0)
+        if max_open_files and len(paths) > max_open_files:
+            self.log.warning(
+                f"Opening only {max_open_files} of {len(paths)} files.")
+            paths = paths[:max_open_files]
 
-        paths.sort(key=prioritize)
-        self.run_file(paths[0])
+        for path in paths:
+            self.run_file(path)
 
     def _cli_show_in_explorer(
         self, project, entity_type, entity_ids
     ):
         """Open paths in system explorer"""
+        if self._send_to_daemon(
+            "show-in-explorer",
+            project=project,
+            entity_type=entity_type,
+            entity_ids=list(entity_ids)
+        ):
+            return
+        self._ensure_process_ready()
+        self.show_entities_in_explorer(project, entity_type, entity_ids)
+
+    def show_entities_in_explorer(self, project, entity_type, entity_ids):
+        from .actions import get_unique_folders
+
         paths = self._get_entity_paths(project, entity_type, entity_ids)
-        folders = set()
-        for path in paths:
-            if os.path.isfile(path):
-                path = os.path.dirname(path)
-            folders.add(path)
+        folders = get_unique_folders(paths)
+        if not folders:
+            return
+
+        open_file_settings = self._get_open_file_settings(project)
+        max_open_folders = open_file_settings.get("max_open_folders", 0)
+        if max_open_folders and len(folders) > max_open_folders:
+            self.log.warning(
+                f"Showing only {max_open_folders} of {len(folders)} folders.")
+            folders = folders[:max_open_folders]
 
         for folder in folders:
             self.open_in_explorer(folder)
+
+    def _cli_convert_apng(
+        self,
+        project,
+        profile,
+        representation_ids,
+        status_file=None,
+        assembler=None,
+        compression=None
+    ):
+        """Convert representations to APNG"""
+        from .apng_job import convert_representations
+
+        self._ensure_process_ready()
+        convert_representations(
+            project,
+            profile,
+            representation_ids,
+            status_file=status_file,
+            assembler=assembler,
+            compression=compression,
+            logger=self.log
+        )
+
+    def _cli_daemon(self, stop=False):
+        """Run daemon that runs the CLI actions in this process"""
+        from .daemon import ActionDaemon, STOP_COMMAND
+
+        if stop:
+            if not self._send_to_daemon(STOP_COMMAND):
+                print("No colorbleed daemon is running.")
+            return
+
+        self._ensure_process_ready()
+        ActionDaemon({
+            "run": self.run_entities,
+            "show-in-explorer": self.show_entities_in_explorer,
+        }).serve()
     # endregion
 
     @staticmethod
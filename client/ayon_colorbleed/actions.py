@@ -0,0 +1,158 @@
+"""Resolve and rank published files for the CLI actions of the addon."""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from ayon_core.lib.transcoding import VIDEO_EXTENSIONS, IMAGE_EXTENSIONS
+
+VIDEO_EXTENSIONS_TUPLE = tuple(VIDEO_EXTENSIONS)
+IMAGE_EXTENSIONS_TUPLE = tuple(IMAGE_EXTENSIONS)
+
+# Maximum number of threads used to check whether paths exist
+MAX_EXISTS_WORKERS = 16
+
+# Used when the project settings do not define `open_file` settings
+DEFAULT_OPEN_FILE_SETTINGS = {
+    "suffix_priorities": [
+        {"suffix": ".exr", "priority": 1000},
+        {"suffix": "_h264.mp4", "priority": 30},
+        {"suffix": ".mp4", "priority": 20},
+    ],
+    "video_priority": 1000,
+    "image_priority": 500,
+    "max_open_files": 10,
+    "max_open_folders": 10,
+}
+
+# Priority penalty of paths that do not exist or have no data
+MISSING_PENALTY = 9999
+
+
+def paths_exist(paths: "list[str]") -> "dict[str, bool]":
+    """Return whether each path exists, checking all paths concurrently.
+
+    On network shares each check is a round trip, so running them in a
+    thread pool makes the total cost roughly that of the slowest check.
+    """
+    unique_paths = list(dict.fromkeys(paths))
+    if len(unique_paths) <= 1:
+        return {path: os.path.exists(path) for path in unique_paths}
+
+    max_workers = min(MAX_EXISTS_WORKERS, len(unique_paths))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        exists = executor.map(os.path.exists, unique_paths)
+        return dict(zip(unique_paths, exists))
+
+
+def get_files_size(repre_entity: dict) -> Optional[int]:
+    """Return total size of the representation files as stored on server.
+
+    Returns:
+        Optional[int]: Total size in bytes or None if sizes are unknown.
+    """
+    sizes = [
+        file_info.get("size")
+        for file_info in repre_entity.get("files") or []
+    ]
+    if not sizes or any(size is None for size in sizes):
+        return None
+    return sum(sizes)
+
+
+def rank_representations(
+    items: "list[tuple[str, dict]]",
+    open_file_settings: Optional[dict] = None
+) -> "list[tuple[str, dict]]":
+    """Return items ordered from most to least preferred to open.
+
+    Unfortunately the user is unable to pick a specific representation from
+    the web frontend. So we prioritize certain files over others - hoping
+    we're running a file that makes sense to run.
+
+    Paths whose representation files are known to be empty on the server
+    or that do not exist on disk are ranked last. Existence is checked for
+    all paths at once in a thread pool.
+
+    Args:
+        items: Resolved path and representation entity pairs.
+        open_file_settings: The `open_file` addon settings defining the
+            priorities. Defaults to `DEFAULT_OPEN_FILE_SETTINGS`.
+    """
+    if not open_file_settings:
+        open_file_settings = DEFAULT_OPEN_FILE_SETTINGS
+    suffix_priorities = [
+        (item["suffix"].lower(), item["priority"])
+        for item in open_file_settings.get("suffix_priorities", [])
+        if item.get("suffix")
+    ]
+    video_priority = open_file_settings.get("video_priority", 0)
+    image_priority = open_file_settings.get("image_priority", 0)
+
+    exists = paths_exist([path for path, _repre_entity in items])
+
+    def get_priority(item: "tuple[str, dict]") -> int:
+        # Higher number is prioritized
+        path, repre_entity = item
+        lower_path = path.lower()
+        priority = 0
+
+        # Prefer certain image/video extensions first
+        for suffix, suffix_priority in suffix_priorities:
+            if lower_path.endswith(suffix):
+                priority += suffix_priority
+                break
+
+        # Videos first, then images
+        if lower_path.endswith(VIDEO_EXTENSIONS_TUPLE):
+            priority += video_priority
+        elif lower_path.endswith(IMAGE_EXTENSIONS_TUPLE):
+            priority += image_priority
+
+        # Avoid paths that do not exist or have no data
+        if get_files_size(repre_entity) == 0 or not exists[path]:
+            priority -= MISSING_PENALTY
+
+        return priority
+
+    return sorted(items, key=get_priority, reverse=True)
+
+
+def rank_representation_paths(
+    items: "list[tuple[str, dict]]",
+    open_file_settings: Optional[dict] = None
+) -> "list[str]":
+    """Return paths ordered from most to least preferred to open.
+
+    See `rank_representations`.
+    """
+    ranked = rank_representations(items, open_file_settings)
+    return [path for path, _repre_entity in ranked]
+
+
+def get_best_path_per_version(
+    items: "list[tuple[str, dict]]",
+    open_file_settings: Optional[dict] = None
+) -> "list[str]":
+    """Return the most preferred path to open of each version.
+
+    All items are ranked together so existence of all paths is checked in
+    one go. Paths are returned from most to least preferred.
+    """
+    paths_by_version_id = {}
+    for path, repre_entity in rank_representations(
+        items, open_file_settings
+    ):
+        paths_by_version_id.setdefault(repre_entity.get("versionId"), path)
+    return list(paths_by_version_id.values())
+
+
+def get_unique_folders(paths: "list[str]") -> "list[str]":
+    """Return the unique folders of paths, keeping their order.
+
+    Paths that are not files are considered to be folders themselves.
+    """
+    folders = {}
+    for path in paths:
+        folder = os.path.dirname(path) if os.path.isfile(path) else path
+        folders.setdefault(folder, None)
+    return list(folders)
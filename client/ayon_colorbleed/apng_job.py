@@ -0,0 +1,255 @@
+"""Convert published representations to APNG.
+
+This is shared by the `ConvertToAPNG` loader and the `convert-apng` CLI
+command of the addon. The loader can spawn the CLI command as a detached
+process which reports its progress as JSON lines to a status file.
+"""
+import os
+import json
+import time
+import asyncio
+import logging
+from typing import Optional
+
+import clique
+
+from . import lib, apng_writer
+from .compression import (
+    DEFAULT_COMPRESSION_BACKEND,
+    create_compression_backend,
+)
+from .frame_cache import FrameCache
+from .sequence import get_representation_sequence
+
+
+def get_assembler(apngc_settings: dict, assembler: Optional[str] = None):
+    """Return assembler to use, defaulting to the one from settings."""
+    return assembler or apngc_settings.get(
+        "assembler", lib.DEFAULT_ASSEMBLER)
+
+
+def get_compression(
+    apngc_settings: dict,
+    compression: Optional[str] = None
+) -> str:
+    """Return compression backend to use, defaulting to settings."""
+    return compression or apngc_settings.get(
+        "compression_backend", DEFAULT_COMPRESSION_BACKEND)
+
+
+def validate_apngc_settings(
+    apngc_settings: dict,
+    profile: str,
+    assembler: Optional[str] = None,
+    compression: Optional[str] = None
+):
+    """Raise ValueError if settings are not sufficient to convert."""
+    assembler = get_assembler(apngc_settings, assembler)
+    compression = get_compression(apngc_settings, compression)
+    if assembler == "native":
+        if not apng_writer.is_available():
+            raise ValueError(
+                "Pillow is required for the native APNG assembler.")
+    else:
+        if not apngc_settings.get("executable"):
+            raise ValueError("No APNGC executable path found in settings.")
+        if not profile:
+            raise ValueError("No APNGC profiles found in settings.")
+        if compression == "tinify" and not apngc_settings.get(
+            "tinify_api_key"
+        ):
+            raise ValueError("No Tinify API key found in settings.")
+    if not apngc_settings.get("output_directory"):
+        raise ValueError(
+            "No conversion output directory found in settings.")
+
+
+def create_limiter(*apngc_settings: dict) -> lib.AdaptiveLimiter:
+    """Return limiter for frame conversions configured in settings.
+
+    When settings of multiple projects share the limiter, the smallest pool
+    size is used and the pool size adapts if any of them enables it.
+    """
+    return lib.AdaptiveLimiter(
+        min(
+            settings.get("pool_size") or lib.get_default_pool_size()
+            for settings in apngc_settings
+        ),
+        adaptive=any(
+            settings.get("adaptive_pool_size", False)
+            for settings in apngc_settings
+        )
+    )
+
+
+def create_frame_cache(apngc_settings: dict) -> Optional[FrameCache]:
+    """Return frame cache configured in settings, if enabled."""
+    cache_directory = apngc_settings.get("cache_directory")
+    if not cache_directory:
+        return None
+    max_size_gb = apngc_settings.get("cache_max_size_gb", 0)
+    return FrameCache(
+        cache_directory,
+        max_bytes=int(max_size_gb * 1024 ** 3)
+    )
+
+
+def report_output(collection: clique.Collection, filepath: str):
+    """Print where the APNG file of `collection` was delivered to."""
+    print(f"Delivered output file for {collection}: {filepath}")
+
+
+def get_generate_apngs_kwargs(
+    apngc_settings: dict,
+    profile: str,
+    assembler: Optional[str] = None,
+    compression: Optional[str] = None
+) -> dict:
+    """Return keyword arguments for `lib.generate_apngs` from settings.
+
+    Generated files are moved or copied atomically to the output directory
+    from settings.
+    """
+    output_directory = apngc_settings["output_directory"]
+
+    # Ensure output folder can exist
+    os.makedirs(output_directory, exist_ok=True)
+
+    return dict(
+        apngc_executable=apngc_settings["executable"],
+        apngc_settings_profile=profile,
+        assembler=get_assembler(apngc_settings, assembler),
+        compression=create_compression_backend(
+            get_compression(apngc_settings, compression),
+            tinify_api_key=apngc_settings.get("tinify_api_key"),
+            local_colors=apngc_settings.get("local_compression_colors", 256)
+        ),
+        fps=apngc_settings.get("native_fps", 25.0),
+        conversion_backend=apngc_settings.get(
+            "conversion_backend", lib.DEFAULT_CONVERSION_BACKEND),
+        frame_cache=create_frame_cache(apngc_settings),
+        fail_fast=apngc_settings.get("fail_fast", True),
+        output_directory=output_directory,
+        scratch_directory=apngc_settings.get("scratch_directory") or None,
+        collapse_duplicates=apngc_settings.get(
+            "collapse_duplicate_frames", False),
+        on_complete=report_output
+    )
+
+
+class StatusWriter:
+    """Write progress of a conversion as JSON lines to a status file.
+
+    Each line is a JSON object with at least the `event` and `time` keys.
+    Events are `started`, `progress`, `completed`, `finished` and `failed`.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def write(self, event: str, **data):
+        data = {"event": event, "time": time.time(), **data}
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(data) + "\n")
+
+
+def read_status(path: str, offset: int = 0) -> "tuple[list[dict], int]":
+    """Read events written by `StatusWriter` since `offset`.
+
+    Only complete lines are read, so a line that is still being written is
+    returned by the next call.
+
+    Returns:
+        tuple[list[dict], int]: The events and the offset to read from next.
+    """
+    try:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+    except FileNotFoundError:
+        return [], offset
+
+    end = data.rfind(b"\n") + 1
+    events = [
+        json.loads(line) for line in data[:end].splitlines() if line.strip()
+    ]
+    return events, offset + end
+
+
+def convert_representations(
+    project_name: str,
+    profile: str,
+    representation_ids: "list[str]",
+    status_file: Optional[str] = None,
+    assembler: Optional[str] = None,
+    compression: Optional[str] = None,
+    logger: Optional[logging.Logger] = None
+):
+    """Convert representations to APNG in a single batch.
+
+    This is what the `convert-apng` CLI command runs.
+
+    Args:
+        project_name: Project the representations are in.
+        profile: Path to the APNGC settings .json profile.
+        representation_ids: Representations to convert.
+        status_file: Optional path to write progress to as JSON lines.
+        assembler: Assembler to write the APNG files with. Defaults to
+            the assembler from settings.
+        compression: Compression backend to compress the frames with.
+            Defaults to the backend from settings.
+        logger: Logger to stream the output of APNGC to.
+    """
+    from .project_cache import get_project_settings
+    from .resolve import iter_representation_paths
+
+    status = StatusWriter(status_file) if status_file else None
+
+    def on_progress(collection, done, total):
+        if status:
+            status.write(
+                "progress", sequence=str(collection), done=done, total=total)
+
+    try:
+        project_settings = get_project_settings(project_name)
+        apngc_settings = project_settings["colorbleed"]["apngc"]
+        validate_apngc_settings(
+            apngc_settings, profile, assembler, compression)
+
+        sequences = [
+            get_representation_sequence(repre_entity, path)
+            for path, repre_entity in iter_representation_paths(
+                project_name, {"representation": representation_ids}
+            )
+        ]
+
+        if status:
+            status.write(
+                "started", sequences=[str(seq) for seq in sequences])
+
+        kwargs = get_generate_apngs_kwargs(
+            apngc_settings, profile, assembler, compression)
+        report = kwargs.pop("on_complete")
+
+        def on_complete(collection, filepath):
+            report(collection, filepath)
+            if status:
+                status.write("completed", sequence=str(collection))
+
+        limiter = create_limiter(apngc_settings)
+        asyncio.run(lib.generate_apngs(
+            sequences,
+            limiter=limiter,
+            on_complete=on_complete,
+            on_progress=on_progress,
+            logger=logger,
+            **kwargs
+        ))
+    except Exception as exc:
+        if status:
+            status.write("failed", error=str(exc))
+        raise
+
+    print(f"Converted {len(sequences)} sequences with concurrency {limiter}")
+    if status:
+        status.write("finished")
@@ -0,0 +1,415 @@
+"""Write APNG files from PNG frames without the external APNGC executable.
+
+Frames are streamed to the output file one at a time, so only the previous
+frame and the frames that are being compressed are kept in memory. Each
+frame is cropped to the region that changed since the previous frame and
+identical frames are merged into a single frame with a longer delay. The
+cropped frames are compressed in parallel in worker processes.
+
+Crops of frames with alpha are also compressed with the pixels that did
+not change made transparent and blended over the previous frame, which
+usually compresses better, and the smaller of both is written. Frames are
+never disposed, as each frame only updates the previous one.
+
+This requires Pillow, see `is_available`.
+"""
+import io
+import os
+import struct
+import zlib
+import fractions
+import collections
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Iterable, Optional
+
+from .png import PNG_SIGNATURE, scale_delay
+
+# APNG `dispose_op` and `blend_op` of the frames. Frames only cover the
+# region that changed, so the previous frame is kept as is (DISPOSE_OP_NONE).
+# The region either replaces the previous frame including its alpha
+# (BLEND_OP_SOURCE) or has its unchanged pixels transparent and is
+# composited over it (BLEND_OP_OVER).
+APNG_DISPOSE_OP_NONE = 0
+APNG_BLEND_OP_SOURCE = 0
+APNG_BLEND_OP_OVER = 1
+
+# PNG color types of the image modes frames are written as
+PNG_COLOR_TYPES = {"RGB": 2, "RGBA": 6}
+
+# Maximum number of frames queued for compression per worker process
+PENDING_FRAMES_PER_WORKER = 2
+
+
+def is_available() -> bool:
+    """Return whether Pillow is available to write APNG files."""
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _pack_chunk(chunk_type: bytes, data: bytes) -> bytes:
+    return b"".join((
+        struct.pack(">I", len(data)),
+        chunk_type,
+        data,
+        struct.pack(">I", zlib.crc32(chunk_type + data)),
+    ))
+
+
+def _compress_image_data(
+    mode: str,
+    size: "tuple[int, int]",
+    data: bytes,
+    compress_level: int
+) -> bytes:
+    from PIL import Image
+
+    image = Image.frombytes(mode, size, data)
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", compress_level=compress_level)
+    png = buffer.getvalue()
+
+    # Join the data of all IDAT chunks
+    image_data = []
+    offset = len(PNG_SIGNATURE)
+    while offset < len(png):
+        length, chunk_type = struct.unpack_from(">I4s", png, offset)
+        if chunk_type == b"IDAT":
+            image_data.append(png[offset + 8:offset + 8 + length])
+        offset += length + 12
+    return b"".join(image_data)
+
+
+def _encode_frame(
+    mode: str,
+    size: "tuple[int, int]",
+    data: bytes,
+    compress_level: int,
+    over_data: Optional[bytes] = None
+) -> "tuple[int, bytes]":
+    """Return blend op and compressed PNG image data of raw frame pixels.
+
+    When `over_data` is given it is compressed too and used with
+    `APNG_BLEND_OP_OVER` if it is smaller.
+
+    This runs in the worker processes of `APNGWriter`.
+    """
+    image_data = _compress_image_data(mode, size, data, compress_level)
+    if over_data is not None:
+        over_image_data = _compress_image_data(
+            mode, size, over_data, compress_level)
+        if len(over_image_data) < len(image_data):
+            return APNG_BLEND_OP_OVER, over_image_data
+    return APNG_BLEND_OP_SOURCE, image_data
+
+
+def get_over_region(previous, region):
+    """Return `region` to blend over `previous` or None if not possible.
+
+    Pixels that did not change are made transparent, so they keep the
+    previous frame. This is only possible when all pixels that changed are
+    opaque, as blending would mix others with the previous frame.
+    """
+    from PIL import Image, ImageChops
+
+    difference = ImageChops.difference(previous, region)
+    changed = difference.getchannel(0)
+    for band in difference.split()[1:]:
+        changed = ImageChops.lighter(changed, band)
+    changed = changed.point(lambda value: 255 if value else 0)
+
+    # Changed pixels that are not fully opaque
+    transparency = region.getchannel("A").point(lambda value: 255 - value)
+    if ImageChops.multiply(changed, transparency).getbbox():
+        return None
+
+    over = Image.new("RGBA", region.size, (0, 0, 0, 0))
+    over.paste(region, mask=changed)
+    return over
+
+
+def get_changed_bbox(
+    previous,
+    image
+) -> "Optional[tuple[int, int, int, int]]":
+    """Return bounding box of pixels that differ between two images.
+
+    Returns:
+        Optional[tuple[int, int, int, int]]: The box or None if the images
+            are identical.
+    """
+    from PIL import ImageChops
+
+    # `getbbox` of RGBA images only considers alpha, so check each band
+    difference = ImageChops.difference(previous, image)
+    boxes = [box for box in (
+        band.getbbox() for band in difference.split()
+    ) if box]
+    if not boxes:
+        return None
+    return (
+        min(box[0] for box in boxes),
+        min(box[1] for box in boxes),
+        max(box[2] for box in boxes),
+        max(box[3] for box in boxes),
+    )
+
+
+class _PendingFrame:
+    """Frame that is compressed or waiting to be written."""
+
+    def __init__(self, future: Future, bbox: "tuple[int, int, int, int]"):
+        self.future = future
+        self.bbox = bbox
+        self.run_length = 1
+
+
+class APNGWriter:
+    """Stream PNG frames to an APNG file.
+
+    Use as context manager so the file is finalized and the worker processes
+    are shut down when done. When an error occurs the partially written file
+    is removed.
+
+    Pass an `executor` to share its worker processes between the files of a
+    batch. It is not shut down by the writer.
+
+    Examples:
+        >>> with APNGWriter(path, fps=25) as writer:
+        >>>     for frame_path in frame_paths:
+        >>>         writer.add_frame(frame_path)
+
+    Args:
+        path: Path of the APNG file to write.
+        fps: Frames per second of the animation.
+        loops: Number of times to play the animation, zero to loop forever.
+        compress_level: Zlib compression level of the frames, 0-9.
+        max_workers: Number of processes compressing frames in parallel.
+            Defaults to the number of CPUs.
+        executor: Process pool to compress frames with. Defaults to a pool
+            of `max_workers` processes owned by the writer.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        fps: float = 25.0,
+        loops: int = 0,
+        compress_level: int = 9,
+        max_workers: Optional[int] = None,
+        executor: Optional[ProcessPoolExecutor] = None
+    ):
+        self.path = path
+        self.loops = loops
+        self.compress_level = compress_level
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._shared_executor = executor
+
+        delay = fractions.Fraction(1 / fps).limit_denominator(0xFFFF)
+        self._delay = (delay.numerator, delay.denominator)
+        self._file = None
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending: "collections.deque[_PendingFrame]" = (
+            collections.deque()
+        )
+        self._previous = None
+        self._mode: Optional[str] = None
+        self._size: "Optional[tuple[int, int]]" = None
+        self._actl_offset = 0
+        self._sequence_number = 0
+        self._frame_count = 0
+
+    def __enter__(self):
+        self._file = open(self.path, "wb")
+        self._executor = self._shared_executor or ProcessPoolExecutor(
+            max_workers=self.max_workers)
+        return self
+
+    def _shutdown_executor(self, cancel_futures: bool = False):
+        if self._executor is None:
+            return
+        if self._executor is self._shared_executor:
+            for frame in self._pending:
+                frame.future.cancel()
+        else:
+            self._executor.shutdown(wait=True, cancel_futures=cancel_futures)
+        self._executor = None
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            try:
+                self.close()
+                return
+            except BaseException:
+                self._discard()
+                raise
+        self._discard()
+
+    def _discard(self):
+        # Remove the partially written file
+        self._shutdown_executor(cancel_futures=True)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def add_frame(self, path: str):
+        """Add frame shown for the duration of a single frame.
+
+        All frames must have the same resolution. Frames identical to the
+        previous frame extend the duration of the previous frame.
+        """
+        from PIL import Image
+
+        with Image.open(path) as image:
+            if self._mode is None:
+                has_alpha = (
+                    "A" in image.getbands()
+                    or "transparency" in image.info
+                )
+                self._mode = "RGBA" if has_alpha else "RGB"
+                self._size = image.size
+                self._write_header()
+            elif image.size != self._size:
+                raise ValueError(
+                    f"Frame {path} has resolution {image.size}, "
+                    f"expected {self._size}"
+                )
+            image.load()
+            frame = image.convert(self._mode)
+
+        if self._previous is None:
+            bbox = (0, 0, *self._size)
+        else:
+            bbox = get_changed_bbox(self._previous, frame)
+            if bbox is None:
+                self._pending[-1].run_length += 1
+                return
+
+        region = frame.crop(bbox)
+        over_data = None
+        if self._previous is not None and self._mode == "RGBA":
+            over = get_over_region(self._previous.crop(bbox), region)
+            if over is not None:
+                over_data = over.tobytes()
+        future = self._executor.submit(
+            _encode_frame,
+            self._mode,
+            region.size,
+            region.tobytes(),
+            self.compress_level,
+            over_data
+        )
+        self._pending.append(_PendingFrame(future, bbox))
+        self._previous = frame
+
+        # The duration of the last frame is not known until the next frame
+        # differs from it, so it is always kept pending
+        self._write_pending(keep=1)
+
+    def close(self):
+        """Write all pending frames and finalize the file."""
+        if self._file is None:
+            return
+        if self._mode is None:
+            raise ValueError(f"No frames were added to {self.path}")
+
+        self._write_pending(keep=0, wait=True)
+        self._file.write(_pack_chunk(b"IEND", b""))
+
+        # Write the final frame count to the animation control chunk
+        actl = struct.pack(">II", self._frame_count, self.loops)
+        self._file.seek(self._actl_offset)
+        self._file.write(_pack_chunk(b"acTL", actl))
+        self._file.close()
+        self._file = None
+        self._shutdown_executor()
+
+    def _write_header(self):
+        width, height = self._size
+        ihdr = struct.pack(
+            ">IIBBBBB", width, height, 8, PNG_COLOR_TYPES[self._mode],
+            0, 0, 0
+        )
+        self._file.write(PNG_SIGNATURE)
+        self._file.write(_pack_chunk(b"IHDR", ihdr))
+        # Frame count is written on close
+        self._actl_offset = self._file.tell()
+        self._file.write(_pack_chunk(b"acTL", struct.pack(">II", 0, 0)))
+
+    def _write_pending(self, keep: int, wait: bool = False):
+        max_pending = self.max_workers * PENDING_FRAMES_PER_WORKER
+        while len(self._pending) > keep:
+            frame = self._pending[0]
+            # Unless waiting, only wait for compression when too many frames
+            # are pending
+            if (
+                not wait
+                and len(self._pending) <= max_pending
+                and not frame.future.done()
+            ):
+                break
+            self._pending.popleft()
+            self._write_frame(frame)
+
+    def _write_frame(self, frame: _PendingFrame):
+        blend_op, image_data = frame.future.result()
+        x_min, y_min, x_max, y_max = frame.bbox
+        delay_num, delay_den = scale_delay(*self._delay, frame.run_length)
+        fctl = struct.pack(
+            ">IIIIIHHBB",
+            self._sequence_number,
+            x_max - x_min,
+            y_max - y_min,
+            x_min,
+            y_min,
+            delay_num,
+            delay_den,
+            APNG_DISPOSE_OP_NONE,
+            blend_op
+        )
+        self._sequence_number += 1
+        self._file.write(_pack_chunk(b"fcTL", fctl))
+
+        if self._frame_count == 0:
+            # The first frame is also the default image
+            self._file.write(_pack_chunk(b"IDAT", image_data))
+        else:
+            fdat = struct.pack(">I", self._sequence_number) + image_data
+            self._sequence_number += 1
+            self._file.write(_pack_chunk(b"fdAT", fdat))
+        self._frame_count += 1
+
+
+def write_apng(
+    frame_paths: Iterable[str],
+    path: str,
+    fps: float = 25.0,
+    loops: int = 0,
+    compress_level: int = 9,
+    max_workers: Optional[int] = None,
+    executor: Optional[ProcessPoolExecutor] = None
+) -> str:
+    """Write APNG file from PNG frames in playback order.
+
+    See `APNGWriter` for the arguments.
+
+    Returns:
+        str: Path to the written APNG file.
+    """
+    with APNGWriter(
+        path,
+        fps=fps,
+        loops=loops,
+        compress_level=compress_level,
+        max_workers=max_workers,
+        executor=executor
+    ) as writer:
+        for frame_path in frame_paths:
+            writer.add_frame(frame_path)
+    return path
@@ -0,0 +1,245 @@
+"""Backends that compress the PNG frames of an APNG file.
+
+The `tinify` backend lets APNGC compress through the Tinify web service and
+needs an API key and internet access. The `local` backend reduces the colors
+of the staged frames before assembly in worker processes, so it also works
+offline, e.g. on render nodes. It requires Pillow.
+"""
+import os
+import logging
+import itertools
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+log = logging.getLogger(__name__)
+
+DEFAULT_COMPRESSION_BACKEND = "tinify"
+
+# Bits per channel the color channels of RGBA frames are reduced to by the
+# `local` backend. Quantizing to a palette would reduce the alpha too much.
+POSTERIZE_BITS = 6
+
+# Number of frames spread over the sequence the palette of RGB frames is
+# computed from and the maximum size of each sampled frame in pixels
+PALETTE_SAMPLE_FRAMES = 8
+PALETTE_SAMPLE_SIZE = 512
+
+
+def has_alpha(image) -> bool:
+    """Return whether a Pillow image has an alpha channel or transparency."""
+    return image.mode in {"RGBA", "LA"} or "transparency" in image.info
+
+
+def _quantize_frame(
+    path: str,
+    palette: Optional[bytes],
+    posterize_bits: int
+):
+    """Reduce the colors of a PNG frame in place.
+
+    This runs in the worker processes of `LocalCompression`.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(path) as image:
+        image.load()
+    if has_alpha(image) or palette is None:
+        image = image.convert("RGBA" if has_alpha(image) else "RGB")
+        bands = image.split()
+        rgb = ImageOps.posterize(
+            Image.merge("RGB", bands[:3]), posterize_bits)
+        image = Image.merge(image.mode, (*rgb.split(), *bands[3:]))
+    else:
+        palette_image = Image.new("P", (1, 1))
+        palette_image.putpalette(palette)
+        image = image.convert("RGB").quantize(
+            palette=palette_image, dither=Image.Dither.NONE)
+
+    # Replace the file rather than writing into it, staged frames may be
+    # links to source or cached files
+    tmp_path = f"{path}.tmp.png"
+    image.save(tmp_path, format="PNG", compress_level=9, optimize=True)
+    os.replace(tmp_path, path)
+
+
+class CompressionBackend:
+    """Compress frames of APNG files.
+
+    Backends that compress frames locally share a single process pool
+    between all sequences, which is created when first needed. Use the
+    backend as context manager, or call `shutdown`, to stop its workers.
+
+    Args:
+        max_workers: Number of worker processes for backends that compress
+            frames locally. Defaults to the number of CPUs.
+    """
+
+    name = "none"
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown(cancel_futures=exc_type is not None)
+
+    def get_executor(self) -> ProcessPoolExecutor:
+        """Return the process pool shared by all sequences."""
+        # Sequences are compressed from multiple threads
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers)
+            return self._executor
+
+    def shutdown(self, cancel_futures: bool = False):
+        """Stop the worker processes, if any were started."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=cancel_futures)
+
+    def compress_frames(self, paths: "list[str]"):
+        """Compress the staged PNG frames of a sequence in place.
+
+        This may be called from multiple threads at once.
+        """
+        pass
+
+    def get_tinify_api_key(self) -> Optional[str]:
+        """Return Tinify API key for APNGC to compress with, if any."""
+        return None
+
+
+class TinifyCompression(CompressionBackend):
+    """Compress with Tinify through APNGC.
+
+    This only applies to the `apngc` assembler.
+    """
+
+    name = "tinify"
+
+    def __init__(
+        self,
+        tinify_api_key: Optional[str] = None,
+        max_workers: Optional[int] = None
+    ):
+        super().__init__(max_workers)
+        self.tinify_api_key = tinify_api_key
+
+    def get_tinify_api_key(self) -> Optional[str]:
+        return self.tinify_api_key
+
+
+class LocalCompression(CompressionBackend):
+    """Reduce the colors of the frames locally in a process pool.
+
+    The frames of RGB sequences are quantized to a single palette computed
+    from frames sampled over the whole sequence, so colors do not flicker
+    between frames, and written as paletted PNGs. The color channels of
+    frames with alpha or transparency are posterized instead.
+
+    Args:
+        colors: Number of palette colors of RGB frames.
+        posterize_bits: Bits per color channel of RGBA frames.
+        max_workers: Number of worker processes.
+    """
+
+    name = "local"
+
+    def __init__(
+        self,
+        colors: int = 256,
+        posterize_bits: int = POSTERIZE_BITS,
+        max_workers: Optional[int] = None
+    ):
+        super().__init__(max_workers)
+        self.colors = colors
+        self.posterize_bits = posterize_bits
+
+    def get_palette(self, paths: "list[str]") -> Optional[bytes]:
+        """Return palette of frames or None if they have transparency.
+
+        The palette is computed from a montage of up to
+        `PALETTE_SAMPLE_FRAMES` frames spread evenly over `paths`.
+        """
+        from PIL import Image
+
+        step = max(1, len(paths) // PALETTE_SAMPLE_FRAMES)
+        samples = []
+        for path in paths[::step][:PALETTE_SAMPLE_FRAMES]:
+            with Image.open(path) as image:
+                if has_alpha(image):
+                    return None
+                sample = image.convert("RGB")
+            # Nearest neighbor keeps the original colors
+            sample.thumbnail(
+                (PALETTE_SAMPLE_SIZE, PALETTE_SAMPLE_SIZE),
+                Image.Resampling.NEAREST
+            )
+            samples.append(sample)
+
+        montage = Image.new("RGB", (
+            sum(sample.width for sample in samples),
+            max(sample.height for sample in samples)
+        ))
+        x = 0
+        for sample in samples:
+            montage.paste(sample, (x, 0))
+            x += sample.width
+        quantized = montage.quantize(
+            self.colors, method=Image.Quantize.MEDIANCUT)
+        return bytes(quantized.getpalette())
+
+    def compress_frames(self, paths: "list[str]"):
+        if not paths:
+            return
+        palette = self.get_palette(paths)
+        # Consume results to raise errors of the workers
+        list(self.get_executor().map(
+            _quantize_frame,
+            paths,
+            itertools.repeat(palette),
+            itertools.repeat(self.posterize_bits),
+            chunksize=max(1, len(paths) // (self.max_workers * 4))
+        ))
+
+
+COMPRESSION_BACKENDS = {
+    backend.name: backend
+    for backend in (CompressionBackend, TinifyCompression, LocalCompression)
+}
+
+
+def create_compression_backend(
+    name: str = DEFAULT_COMPRESSION_BACKEND,
+    tinify_api_key: Optional[str] = None,
+    local_colors: int = 256,
+    max_workers: Optional[int] = None
+) -> CompressionBackend:
+    """Return compression backend by name.
+
+    Falls back to no compression if the backend is unknown or, for the
+    `local` backend, if Pillow is not available.
+    """
+    if name == "tinify":
+        return TinifyCompression(tinify_api_key, max_workers=max_workers)
+    elif name == "local":
+        try:
+            import PIL  # noqa: F401
+        except ImportError:
+            log.warning(
+                "Pillow is not available for 'local' compression. "
+                "Frames are not compressed.")
+        else:
+            return LocalCompression(local_colors, max_workers=max_workers)
+    elif name != "none":
+        log.warning(
+            f"Unknown compression backend '{name}'. "
+            "Frames are not compressed.")
+    return CompressionBackend(max_workers=max_workers)
@@ -0,0 +1,373 @@
+"""Resident process that runs the CLI actions of the addon.
+
+Each web action starts a new `ayon addon colorbleed ...` process which has
+to connect to the server and prepare the addons before doing any work. When
+the daemon runs (`ayon addon colorbleed daemon`), those CLI commands only
+hand over their request to it over a local socket, and the daemon runs the
+action with its connection and caches already warm.
+
+The daemon listens on localhost only and requires an auth key. The address
+and key are written to a state file in a directory that only the current
+user can access, and clients only trust a state file owned by the current
+user that nobody else can read or write. Requests and responses are sent as
+JSON rather than pickled, so a connection can never run arbitrary code.
+
+Connecting, authenticating and each read and write of a message time out
+after `CONNECTION_TIMEOUT` seconds. A stalled client can't block the daemon
+and a state file pointing to a port that is now used by another process
+is treated as no daemon running. Clients wait twice as long as the daemon,
+so a client queued behind a stalled one is still served.
+"""
+import os
+import sys
+import json
+import socket
+import struct
+import logging
+import secrets
+from multiprocessing.connection import (
+    AuthenticationError,
+    Connection,
+    answer_challenge,
+    deliver_challenge,
+)
+from typing import Any, Callable, Optional
+
+log = logging.getLogger(__name__)
+
+# Seconds a client waits for the daemon to respond to a request
+REQUEST_TIMEOUT = 30.0
+
+# Seconds to connect, authenticate or send or receive a message before a
+# connection is considered stalled
+CONNECTION_TIMEOUT = 5.0
+
+# Errors of a connection that failed, stalled or did not authenticate
+CONNECTION_ERRORS = (OSError, EOFError, AuthenticationError)
+
+# Command that stops the daemon
+STOP_COMMAND = "stop"
+
+# Maximum size in bytes of a request or response
+MAX_MESSAGE_BYTES = 1024 ** 2
+
+STATE_FILENAME = "daemon.json"
+
+
+class UnsafeStateError(RuntimeError):
+    """Raised when the state directory is accessible by other users."""
+
+
+def _check_private(path: str, st: os.stat_result):
+    # Only the owner may have access. Windows has no POSIX ownership, the
+    # per-user application data directory is private by its ACL there.
+    if os.name != "posix":
+        return
+    if st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise UnsafeStateError(
+            f"{path} must be owned by the current user and not be "
+            "accessible by group or others."
+        )
+
+
+def get_state_directory() -> str:
+    """Return directory for the state file, private to the current user.
+
+    This is `$XDG_RUNTIME_DIR` on Linux and the user runtime directory of
+    `platformdirs` elsewhere, or in the home directory if `platformdirs` is
+    not available. The directory is created with mode 0700.
+
+    Raises:
+        UnsafeStateError: If the directory is accessible by other users.
+    """
+    base_directory = None
+    if sys.platform.startswith("linux"):
+        base_directory = os.environ.get("XDG_RUNTIME_DIR")
+    if not base_directory:
+        try:
+            import platformdirs
+            base_directory = platformdirs.user_runtime_dir()
+        except ImportError:
+            base_directory = os.path.join(os.path.expanduser("~"), ".cache")
+
+    directory = os.path.join(base_directory, "ayon_colorbleed")
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    _check_private(directory, os.lstat(directory))
+    return directory
+
+
+def get_state_filepath() -> str:
+    """Return path of the state file with the address of the daemon."""
+    return os.path.join(get_state_directory(), STATE_FILENAME)
+
+
+def write_state(path: str, state: dict):
+    """Write state file readable only by the current user."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    # Left over by a crashed process with the same pid
+    try:
+        os.remove(tmp_path)
+    except FileNotFoundError:
+        pass
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(
+        os, "O_NOFOLLOW", 0)
+    fd = os.open(tmp_path, flags, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def read_state(path: Optional[str] = None) -> Optional[dict]:
+    """Return state of the running daemon or None if there is none.
+
+    A state file that is not owned by the current user or that others can
+    access is ignored, as it may point to a listener of another user.
+    """
+    try:
+        path = path or get_state_filepath()
+        fd = os.open(path, os.O_RDONLY | getattr(os, "O_NOFOLLOW", 0))
+    except UnsafeStateError as exc:
+        log.warning(f"Ignoring colorbleed daemon: {exc}")
+        return None
+    except OSError:
+        return None
+
+    with os.fdopen(fd, "r", encoding="utf-8") as f:
+        try:
+            _check_private(path, os.fstat(f.fileno()))
+        except UnsafeStateError as exc:
+            log.warning(f"Ignoring colorbleed daemon: {exc}")
+            return None
+        try:
+            state = json.load(f)
+        except ValueError:
+            return None
+    return state if isinstance(state, dict) else None
+
+
+def _set_socket_timeout(sock: socket.socket, timeout: float):
+    """Make blocking sends and receives on `sock` fail after `timeout`.
+
+    `Connection` reads and writes the socket handle directly, so the timeout
+    is set on the socket rather than with `settimeout`, which would make it
+    non-blocking.
+    """
+    if os.name == "nt":
+        # DWORD in milliseconds
+        value = struct.pack("L", int(timeout * 1000))
+    else:
+        # struct timeval
+        seconds = int(timeout)
+        value = struct.pack(
+            "ll", seconds, int((timeout - seconds) * 1000000))
+    for option in (socket.SO_RCVTIMEO, socket.SO_SNDTIMEO):
+        sock.setsockopt(socket.SOL_SOCKET, option, value)
+
+
+def open_connection(
+    sock: socket.socket,
+    authkey: bytes,
+    server: bool = False,
+    timeout: Optional[float] = None
+) -> Connection:
+    """Return authenticated connection over a connected socket.
+
+    Both sides prove they know `authkey`, like `multiprocessing.connection`
+    does, with every send and receive timing out after `timeout` seconds,
+    which defaults to `CONNECTION_TIMEOUT`.
+
+    Raises:
+        OSError: If the connection failed or timed out.
+        EOFError: If the other side closed the connection.
+        AuthenticationError: If the other side does not know `authkey`.
+    """
+    try:
+        sock.settimeout(None)
+        _set_socket_timeout(sock, timeout or CONNECTION_TIMEOUT)
+        conn = Connection(sock.detach())
+    except OSError:
+        sock.close()
+        raise
+
+    try:
+        if server:
+            deliver_challenge(conn, authkey)
+            answer_challenge(conn, authkey)
+        else:
+            answer_challenge(conn, authkey)
+            deliver_challenge(conn, authkey)
+    except BaseException:
+        conn.close()
+        raise
+    return conn
+
+
+def send_message(conn, message: Any):
+    """Send JSON serializable message over connection."""
+    conn.send_bytes(json.dumps(message).encode("utf-8"))
+
+
+def receive_message(conn) -> Any:
+    """Receive message sent with `send_message`.
+
+    Raises:
+        ValueError: If the message is not valid JSON.
+        OSError: If the message is larger than `MAX_MESSAGE_BYTES`.
+        EOFError: If the connection was closed.
+    """
+    return json.loads(conn.recv_bytes(MAX_MESSAGE_BYTES).decode("utf-8"))
+
+
+class ActionDaemon:
+    """Serve requests of CLI commands until asked to stop.
+
+    Requests are handled one at a time, in the order they arrive.
+
+    Args:
+        handlers: Callables per command, called with the request arguments.
+        state_filepath: Where to write the address of the daemon to.
+            Defaults to `get_state_filepath()`.
+    """
+
+    def __init__(
+        self,
+        handlers: "dict[str, Callable[..., None]]",
+        state_filepath: Optional[str] = None
+    ):
+        self.handlers = handlers
+        self.state_filepath = state_filepath or get_state_filepath()
+        self._running = False
+
+    def serve(self):
+        authkey = secrets.token_bytes(32)
+        with socket.create_server(("127.0.0.1", 0)) as listener:
+            host, port = listener.getsockname()[:2]
+            write_state(self.state_filepath, {
+                "host": host,
+                "port": port,
+                "authkey": authkey.hex(),
+                "pid": os.getpid(),
+            })
+            log.info(f"Colorbleed daemon listening on {host}:{port}")
+            self._running = True
+            try:
+                while self._running:
+                    try:
+                        sock, _address = listener.accept()
+                        conn = open_connection(sock, authkey, server=True)
+                    except CONNECTION_ERRORS as exc:
+                        log.warning(f"Rejected connection: {exc!r}")
+                        continue
+                    try:
+                        with conn:
+                            self._handle(conn)
+                    except CONNECTION_ERRORS as exc:
+                        # E.g. the client stopped reading the response
+                        log.warning(f"Lost connection: {exc!r}")
+            finally:
+                self._running = False
+                self._remove_state()
+
+    def _handle(self, conn):
+        try:
+            request = receive_message(conn)
+            command = request["command"]
+            kwargs = request.get("kwargs", {})
+            if not isinstance(kwargs, dict):
+                raise TypeError("Request kwargs must be an object")
+        except (
+            EOFError, OSError, ValueError, KeyError, TypeError,
+            AttributeError
+        ) as exc:
+            log.warning(f"Invalid request: {exc}")
+            return
+
+        if command == STOP_COMMAND:
+            self._running = False
+            send_message(conn, {"success": True})
+            return
+
+        handler = self.handlers.get(command)
+        if handler is None:
+            send_message(conn, {
+                "success": False, "error": f"Unknown command: {command}"
+            })
+            return
+
+        log.info(f"Running '{command}' with {kwargs}")
+        try:
+            handler(**kwargs)
+        except Exception as exc:
+            log.error(f"Command '{command}' failed", exc_info=True)
+            send_message(conn, {"success": False, "error": str(exc)})
+            return
+        send_message(conn, {"success": True})
+
+    def _remove_state(self):
+        # Do not remove the state file of a daemon that started after us
+        state = read_state(self.state_filepath)
+        if state and state.get("pid") == os.getpid():
+            try:
+                os.remove(self.state_filepath)
+            except OSError:
+                pass
+
+
+def send_request(
+    command: str,
+    state_filepath: Optional[str] = None,
+    **kwargs
+) -> bool:
+    """Hand a request over to the running daemon.
+
+    Returns:
+        bool: False if no daemon is reachable and the caller should run the
+            request itself, True if the daemon took the request.
+
+    Raises:
+        RuntimeError: If the daemon failed to run the request.
+    """
+    state = read_state(state_filepath)
+    if not state:
+        return False
+
+    # The daemon accepts one connection at a time and drops a stalled one
+    # after `CONNECTION_TIMEOUT`, so outlast that before giving up
+    timeout = 2 * CONNECTION_TIMEOUT
+    try:
+        address = (state["host"], state["port"])
+        authkey = bytes.fromhex(state["authkey"])
+        conn = open_connection(
+            socket.create_connection(address, timeout=timeout),
+            authkey,
+            timeout=timeout
+        )
+    except (*CONNECTION_ERRORS, KeyError, TypeError, ValueError) as exc:
+        # Also when the state is stale and its port is used by another
+        # process that does not answer
+        log.debug(f"Colorbleed daemon is not reachable: {exc!r}")
+        return False
+
+    with conn:
+        try:
+            send_message(conn, {"command": command, "kwargs": kwargs})
+        except OSError as exc:
+            log.debug(f"Colorbleed daemon is not reachable: {exc!r}")
+            return False
+        if not conn.poll(REQUEST_TIMEOUT):
+            # The daemon may still run the request, so do not run it again
+            log.warning(
+                f"Colorbleed daemon did not respond to '{command}' "
+                f"within {REQUEST_TIMEOUT} seconds."
+            )
+            return True
+        try:
+            response = receive_message(conn)
+        except (EOFError, OSError, ValueError):
+            raise RuntimeError(
+                f"Colorbleed daemon closed the connection during '{command}'")
+
+    if not isinstance(response, dict) or not response.get("success"):
+        raise RuntimeError(
+            f"Colorbleed daemon failed '{command}': {response.get('error')}")
+    return True
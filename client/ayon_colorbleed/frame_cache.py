@@ -0,0 +1,134 @@
+"""On-disk cache of frames converted to PNG for APNG generation.
+
+Cached frames are keyed by the source file path, its modification time and
+size and the conversion parameters, so that running the APNG conversion
+again on the same source sequence (e.g. with another APNGC profile) can skip
+the conversion of frames that were converted before.
+"""
+import os
+import hashlib
+import logging
+import uuid
+from typing import Optional
+
+from .lib import PNG_CONVERSION_PARAMS
+from .staging import link_file
+
+log = logging.getLogger(__name__)
+
+
+class FrameCache:
+    """Content-addressed cache of converted PNG frames.
+
+    Entries are stored as `{root}/{key[:2]}/{key}.png`. Reading an entry
+    updates its modification time so `evict` can remove the least recently
+    used entries first once the cache exceeds `max_bytes`.
+
+    Args:
+        root: Root directory of the cache.
+        max_bytes: Maximum total size of the cache in bytes. When zero or
+            negative the cache is never evicted.
+        params: Conversion parameters that are part of each key.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        max_bytes: int = 0,
+        params: str = PNG_CONVERSION_PARAMS
+    ):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.params = params
+
+    def get_key(self, input_path: str) -> Optional[str]:
+        """Return cache key for source file or None if it does not exist."""
+        try:
+            stat = os.stat(input_path)
+        except OSError:
+            return None
+
+        key = "|".join((
+            os.path.normcase(os.path.abspath(input_path)),
+            str(stat.st_mtime_ns),
+            str(stat.st_size),
+            self.params
+        ))
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+    def _get_entry_path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], f"{key}.png")
+
+    def get(self, input_path: str) -> Optional[str]:
+        """Return path to the cached frame for `input_path` if any."""
+        key = self.get_key(input_path)
+        if not key:
+            return None
+
+        entry_path = self._get_entry_path(key)
+        try:
+            # Mark as recently used
+            os.utime(entry_path)
+        except OSError:
+            return None
+        return entry_path
+
+    def put(self, input_path: str, png_path: str):
+        """Store converted `png_path` as the cached frame for `input_path`.
+
+        The entry is hardlinked where possible, otherwise it is copied. It
+        is written under a temporary name first so concurrent runs never
+        see partially written entries.
+        """
+        key = self.get_key(input_path)
+        if not key:
+            return
+
+        entry_path = self._get_entry_path(key)
+        tmp_path = f"{entry_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+            link_file(png_path, tmp_path, symlink=False)
+            os.replace(tmp_path, entry_path)
+        except OSError as exc:
+            log.warning(f"Failed to cache frame {input_path}: {exc}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def evict(self):
+        """Remove least recently used entries until cache fits `max_bytes`."""
+        if self.max_bytes <= 0 or not os.path.isdir(self.root):
+            return
+
+        entries = []
+        total_bytes = 0
+        for bucket in os.scandir(self.root):
+            if not bucket.is_dir():
+                continue
+            for entry in os.scandir(bucket.path):
+                if not entry.name.endswith(".png"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total_bytes += stat.st_size
+
+        if total_bytes <= self.max_bytes:
+            return
+
+        # Oldest first
+        entries.sort()
+        removed = 0
+        for _mtime, size, path in entries:
+            if total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total_bytes -= size
+            removed += 1
+
+        log.debug(f"Evicted {removed} frames from frame cache: {self.root}")
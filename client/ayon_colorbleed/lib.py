@@ -1,66 +1,652 @@
 import subprocess
+import collections
 import contextlib
 import tempfile
 import os
 import asyncio
-from typing import Optional, Iterable, Callable
+import itertools
+import functools
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import (
+    Optional,
+    Iterable,
+    Iterator,
+    Callable,
+    AsyncIterator,
+    NamedTuple,
+    TYPE_CHECKING,
+)
 
 import clique
 
-from ayon_core.lib import get_oiio_tool_args
+from ayon_core.lib import get_oiio_tool_args, ToolNotFoundError
+
+from .compression import CompressionBackend, TinifyCompression
+from .png import (
+    collapse_duplicate_frames,
+    restore_duplicate_frames,
+    set_apng_frame_delays,
+)
+from .staging import (
+    deliver_file,
+    estimate_staging_bytes,
+    get_output_filepath,
+    get_png_frame_name,
+    get_staged_frames,
+    link_staged_frames,
+    select_scratch_directory,
+)
+
+if TYPE_CHECKING:
+    from .frame_cache import FrameCache
 
 VERBOSE = False
 
+log = logging.getLogger(__name__)
+
+# Output handling modes of `run_subprocess_async`
+SUBPROCESS_OUTPUT_MODES = {"capture", "discard", "stream"}
+
+# Maximum line length read from subprocess output when streaming
+SUBPROCESS_LINE_LIMIT = 1024 ** 2
+
+# Backends available to convert frames to PNG for APNGC. `iconvert` runs one
+# process per frame and is the fallback when the others are not available.
+CONVERSION_BACKENDS = {"iconvert", "oiiotool", "oiio_python"}
+DEFAULT_CONVERSION_BACKEND = "iconvert"
+
+# Parameters all conversion backends convert frames with. These are part of
+# the `FrameCache` key so changing them invalidates previously cached frames.
+PNG_CONVERSION_PARAMS = "uint8;sRGB;clear-keywords"
+
+
+# Estimated peak memory of a single frame conversion, used to limit the
+# default pool size on machines with many cores but little free memory
+MEMORY_PER_WORKER = 512 * 1024 ** 2
+
+# Assemblers to write the APNG file from the PNG frames with. `apngc` runs
+# the external APNGC executable, `native` uses `apng_writer` (Pillow).
+ASSEMBLERS = {"apngc", "native"}
+DEFAULT_ASSEMBLER = "apngc"
+
+
+class SubprocessError(RuntimeError):
+    """Raised when a subprocess exits with a non-zero exit code."""
+
+    def __init__(self, cmd: "list[str]", returncode: int, stderr: str = ""):
+        self.cmd = cmd
+        self.returncode = returncode
+        self.stderr = stderr
+        message = (
+            f"Command exited with code {returncode}: "
+            f"{subprocess.list2cmdline(cmd)}"
+        )
+        if stderr:
+            message += f"\n{stderr.strip()}"
+        super().__init__(message)
+
+
+class PoolError(RuntimeError):
+    """Raised when processing files in a pool failed for one or more files.
+
+    Attributes:
+        failures (dict[str, BaseException]): Error per failed file.
+    """
+
+    def __init__(self, failures: "dict[str, BaseException]"):
+        self.failures = failures
+        lines = [f"Processing failed for {len(failures)} file(s):"]
+        for filepath, exc in sorted(
+            failures.items(), key=lambda item: str(item[0])
+        ):
+            lines.append(f"- {filepath}: {exc}")
+        super().__init__("\n".join(lines))
+
+
+class _SubprocessOutput(NamedTuple):
+    stdout: str
+    stderr: str
+
+
+class SubprocessResult(_SubprocessOutput):
+    """Result of `run_subprocess_async`.
+
+    This is a `(stdout, stderr)` tuple, so it can be unpacked with
+    `stdout, stderr = await run_subprocess_async(...)`. The exit code is
+    available as the `returncode` attribute.
+
+    With `output` set to "discard" or "stream" the `stdout` and `stderr`
+    only contain the last lines of output.
+    """
+
+    def __new__(cls, stdout: str, stderr: str, returncode: int = 0):
+        result = super().__new__(cls, stdout, stderr)
+        result.returncode = returncode
+        return result
+
+    def __repr__(self):
+        return (
+            f"SubprocessResult(stdout={self.stdout!r}, "
+            f"stderr={self.stderr!r}, returncode={self.returncode!r})"
+        )
+
+
+async def _read_line(
+    stream: asyncio.StreamReader,
+    limit: int = SUBPROCESS_LINE_LIMIT
+) -> bytes:
+    """Return next line of stream or empty bytes at the end of the stream.
 
-async def run_subprocess_async(cmd: "list[str] | str") -> "tuple[str, str]":
-    """Run subprocess asynchronously and return stdout and stderr."""
+    Lines longer than `limit` are truncated to `limit` bytes and the rest
+    of the line is skipped, where `StreamReader.readline` would raise.
+    """
+    line = b""
+    while True:
+        try:
+            chunk = await stream.readuntil(b"\n")
+        except asyncio.IncompleteReadError as exc:
+            # Last line without line ending or end of stream
+            chunk = exc.partial
+        except asyncio.LimitOverrunError as exc:
+            chunk = await stream.read(exc.consumed)
+            line += chunk[:max(0, limit - len(line))]
+            continue
+        return line + chunk[:max(0, limit - len(line))]
+
+
+async def _read_lines(
+    stream: asyncio.StreamReader,
+    tail: "collections.deque[str]",
+    logger: Optional[logging.Logger] = None
+):
+    """Read lines from stream into `tail`, logging them if `logger` set."""
+    while True:
+        line = await _read_line(stream)
+        if not line:
+            return
+        line = line.decode(errors="replace").rstrip()
+        tail.append(line)
+        if logger:
+            logger.info(line)
+
+
+async def run_subprocess_async(
+    cmd: "list[str] | str",
+    check: bool = False,
+    output: str = "capture",
+    logger: Optional[logging.Logger] = None,
+    tail_lines: int = 50
+) -> SubprocessResult:
+    """Run subprocess asynchronously and return its output and exit code.
+
+    The subprocess is killed when the task running it gets cancelled or
+    reading its output fails.
+
+    The result unpacks to `(stdout, stderr)`, see `SubprocessResult`.
+
+    Args:
+        cmd: Command to run.
+        check: Raise `SubprocessError` if the process exits with a
+            non-zero exit code. Disabled by default, so failures are only
+            raised when asked for.
+        output: How to handle the output of the process, one of
+            `SUBPROCESS_OUTPUT_MODES`. "capture" returns the full output.
+            "discard" ignores stdout and only keeps the last `tail_lines`
+            lines of stderr. "stream" logs each line of output as it comes
+            in and keeps the last `tail_lines` lines of both. Lines longer
+            than `SUBPROCESS_LINE_LIMIT` are truncated when not capturing.
+        logger: Logger to stream output to, e.g. of the calling plugin.
+            Defaults to the module logger.
+        tail_lines: Number of lines to keep for "discard" and "stream".
+    """
+    if output not in SUBPROCESS_OUTPUT_MODES:
+        raise ValueError(f"Invalid subprocess output mode: {output}")
     if isinstance(cmd, str):
         cmd = [cmd]
+    if logger is None:
+        logger = log
+
     proc = await asyncio.create_subprocess_exec(
         *cmd,
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE
+        stdout=(
+            asyncio.subprocess.DEVNULL if output == "discard"
+            else asyncio.subprocess.PIPE
+        ),
+        stderr=asyncio.subprocess.PIPE,
+        limit=SUBPROCESS_LINE_LIMIT
     )
-    stdout, stderr = await proc.communicate()
-    return stdout.decode(), stderr.decode()
+    try:
+        if output == "capture":
+            stdout, stderr = await proc.communicate()
+            stdout, stderr = stdout.decode(), stderr.decode()
+        else:
+            stream_logger = logger if output == "stream" else None
+            stdout_tail = collections.deque(maxlen=tail_lines)
+            stderr_tail = collections.deque(maxlen=tail_lines)
+            readers = [_read_lines(proc.stderr, stderr_tail, stream_logger)]
+            if output == "stream":
+                readers.append(
+                    _read_lines(proc.stdout, stdout_tail, stream_logger))
+            await asyncio.gather(*readers)
+            await proc.wait()
+            stdout = "\n".join(stdout_tail)
+            stderr = "\n".join(stderr_tail)
+    except BaseException:
+        # Do not leave the process running when cancelled or on errors
+        with contextlib.suppress(ProcessLookupError):
+            proc.kill()
+        await proc.wait()
+        raise
 
+    if check and proc.returncode != 0:
+        raise SubprocessError(cmd, proc.returncode, stderr)
+    return SubprocessResult(stdout, stderr, proc.returncode)
 
-async def update_qt(app):
-    """Update Qt event loop indefinitely until task ends."""
-    if not app:
-        return
-    while True:
-        app.processEvents()
-        await asyncio.sleep(0.01)
 
+def _get_meminfo_available() -> Optional[int]:
+    """Return `MemAvailable` from /proc/meminfo in bytes, if available.
 
-async def create_tasks_pool(tasks, max_concurrent=100):
-    """Run async tasks in a pool with a maximum number of concurrent tasks."""
+    Unlike the free pages reported by `sysconf` this includes page cache
+    the kernel can reclaim, which on a machine that has been up for a while
+    is most of the memory that is not in use.
+    """
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    # Reported in kB
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
 
-    # Task runner within semaphore
-    async def _task_runner(semaphore, task):
-        async with semaphore:
-            return await task
 
-    semaphore = asyncio.Semaphore(max_concurrent)
+def get_available_memory() -> Optional[int]:
+    """Return available physical memory in bytes or None if unknown."""
+    try:
+        import psutil
+        return psutil.virtual_memory().available
+    except ImportError:
+        pass
 
-    result = await asyncio.gather(
-        *(_task_runner(semaphore, task) for task in tasks)
-    )
+    available = _get_meminfo_available()
+    if available is not None:
+        return available
+
+    if hasattr(os, "sysconf"):
+        try:
+            return (
+                os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+            )
+        except (ValueError, OSError):
+            return None
+
+    if os.name == "nt":
+        import ctypes
+
+        class MEMORYSTATUSEX(ctypes.Structure):
+            _fields_ = [
+                ("dwLength", ctypes.c_ulong),
+                ("dwMemoryLoad", ctypes.c_ulong),
+                ("ullTotalPhys", ctypes.c_ulonglong),
+                ("ullAvailPhys", ctypes.c_ulonglong),
+                ("ullTotalPageFile", ctypes.c_ulonglong),
+                ("ullAvailPageFile", ctypes.c_ulonglong),
+                ("ullTotalVirtual", ctypes.c_ulonglong),
+                ("ullAvailVirtual", ctypes.c_ulonglong),
+                ("sullAvailExtendedVirtual", ctypes.c_ulonglong),
+            ]
+
+        status = MEMORYSTATUSEX()
+        status.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return status.ullAvailPhys
+
+    return None
+
+
+def get_default_pool_size(
+    memory_per_worker: int = MEMORY_PER_WORKER
+) -> int:
+    """Return default number of concurrent workers for this machine.
 
-    return result
+    This is the CPU count, limited by how many workers of
+    `memory_per_worker` bytes fit in the currently available memory.
+    """
+    pool_size = os.cpu_count() or 1
+    available_memory = get_available_memory()
+    if available_memory is not None:
+        pool_size = min(pool_size, available_memory // memory_per_worker)
+    return max(1, int(pool_size))
+
+
+class AdaptiveLimiter:
+    """Limit concurrency of async tasks with an optionally adaptive limit.
+
+    When `adaptive` is enabled the limit is adjusted using additive increase,
+    multiplicative decrease (AIMD) based on the latency of each task. The
+    limit increases by one after `limit` tasks finished within `tolerance`
+    times the lowest observed latency, and it is halved when the latency
+    exceeds that because the machine is saturated.
+
+    The same limiter can be shared across pools to bound their total
+    concurrency.
+
+    Args:
+        limit: Initial maximum number of concurrent tasks.
+        adaptive: Whether to adjust the limit based on task latency.
+        min_limit: Lower bound of the adaptive limit.
+        max_limit: Upper bound of the adaptive limit. Defaults to twice the
+            CPU count or `limit`, whichever is larger.
+        tolerance: Latency multiplier over the lowest observed latency at
+            which the machine is considered saturated.
+    """
+
+    def __init__(
+        self,
+        limit: int,
+        adaptive: bool = False,
+        min_limit: int = 1,
+        max_limit: Optional[int] = None,
+        tolerance: float = 1.5
+    ):
+        if max_limit is None:
+            max_limit = max(limit, 2 * (os.cpu_count() or 1))
+        self.limit = max(min_limit, limit)
+        self.adaptive = adaptive
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+
+        self.active = 0
+        self.completed = 0
+        self.min_latency: Optional[float] = None
+        self.peak_limit = self.limit
+        self._started: Optional[float] = None
+        self._ended: Optional[float] = None
+        self._since_adjust = 0
+        # Created lazily so the limiter is bound to the running event loop
+        self._condition: Optional[asyncio.Condition] = None
+
+    @property
+    def max_concurrent(self) -> int:
+        """Maximum number of concurrent tasks the limiter may ever allow."""
+        return self.max_limit if self.adaptive else self.limit
+
+    @property
+    def throughput(self) -> float:
+        """Completed tasks per second since the first task started."""
+        if self._started is None or not self.completed:
+            return 0.0
+        elapsed = (self._ended or time.perf_counter()) - self._started
+        return self.completed / elapsed if elapsed > 0 else 0.0
+
+    async def acquire(self):
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.active < self.limit)
+            self.active += 1
+        if self._started is None:
+            self._started = time.perf_counter()
+
+    async def release(self, latency: Optional[float] = None):
+        self.completed += 1
+        self._ended = time.perf_counter()
+        if latency is not None and self.adaptive:
+            self._adjust(latency)
+        async with self._condition:
+            self.active -= 1
+            self._condition.notify_all()
+
+    def _adjust(self, latency: float):
+        if self.min_latency is None or latency < self.min_latency:
+            self.min_latency = latency
+        self._since_adjust += 1
+
+        if latency > self.min_latency * self.tolerance:
+            # Saturated, back off at most once per `limit` completed tasks
+            # so a single burst of slow tasks does not collapse the limit
+            if self._since_adjust >= self.limit:
+                self.limit = max(self.min_limit, self.limit // 2)
+                self._since_adjust = 0
+                log.debug(f"Decreased concurrency limit to {self.limit}")
+        elif self._since_adjust >= self.limit:
+            self.limit = min(self.max_limit, self.limit + 1)
+            self.peak_limit = max(self.peak_limit, self.limit)
+            self._since_adjust = 0
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        """Acquire a slot for the duration of the context."""
+        await self.acquire()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            await self.release(time.perf_counter() - start)
+
+    def __str__(self):
+        return (
+            f"limit {self.limit} (peak {self.peak_limit}), "
+            f"{self.completed} tasks at {self.throughput:.2f} tasks/s"
+        )
+
+
+async def iter_pool_results(
+    items: Iterable,
+    processor: Callable,
+    max_concurrent: Optional[int] = None,
+    limiter: Optional[AdaptiveLimiter] = None,
+    fail_fast: bool = True
+) -> AsyncIterator[tuple]:
+    """Process items with a fixed number of workers and yield the results.
+
+    The workers consume `items` lazily, so at most one item per worker is
+    taken from it at any time. This allows `items` to be a generator over
+    very long or multiple sequences without creating a coroutine for each
+    item up front.
+
+    Examples:
+        >>> async for filepath, result in iter_pool_results(files, convert):
+        >>>     print(f"Finished {filepath}")
+
+    Args:
+        items: Items to process.
+        processor: Async function to process a single item with. It should
+            raise an error if processing failed.
+        max_concurrent: Maximum number of concurrently processed items.
+            Defaults to `get_default_pool_size`. Ignored when `limiter` is
+            provided.
+        limiter: Limiter to process the items with, e.g. to share it across
+            multiple pools or to adapt the concurrency at runtime.
+        fail_fast: When processing an item fails, cancel all running work
+            and raise. When disabled, all items are processed before the
+            failures are raised.
+
+    Yields:
+        tuple: The item and its result, in order of completion rather than
+            in order of `items`.
+
+    Raises:
+        PoolError: When processing failed for any of the items.
+        Exception: Any error raised while iterating `items`, after running
+            work was cancelled.
+    """
+    if limiter is None:
+        limiter = AdaptiveLimiter(max_concurrent or get_default_pool_size())
+    num_workers = limiter.max_concurrent
+
+    iterator = iter(items)
+    outcomes = asyncio.Queue()
+    worker_done = object()
+    iteration_failed = object()
+
+    async def _worker():
+        try:
+            # All workers pull from the same iterator
+            while True:
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                except Exception as exc:
+                    # Raised by `items` itself, report it to the consumer
+                    # rather than ending this worker silently
+                    outcomes.put_nowait((iteration_failed, None, exc))
+                    break
+                async with limiter.slot():
+                    try:
+                        result = await processor(item)
+                    except Exception as exc:
+                        outcome = (item, None, exc)
+                    else:
+                        outcome = (item, result, None)
+                outcomes.put_nowait(outcome)
+        finally:
+            outcomes.put_nowait(worker_done)
+
+    workers = [asyncio.ensure_future(_worker()) for _ in range(num_workers)]
+    running = len(workers)
+    failures = {}
+    try:
+        while running:
+            outcome = await outcomes.get()
+            if outcome is worker_done:
+                running -= 1
+                continue
+
+            item, result, exc = outcome
+            if item is iteration_failed:
+                raise exc
+            if exc is not None:
+                failures[item] = exc
+                if fail_fast:
+                    raise PoolError(failures) from exc
+                continue
+
+            yield item, result
+    finally:
+        # Cancel running work, also when the consumer stopped iterating or
+        # got cancelled itself
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    if failures:
+        raise PoolError(failures)
+
+
+async def create_tasks_pool(
+    tasks,
+    max_concurrent: Optional[int] = None,
+    limiter: Optional[AdaptiveLimiter] = None,
+    fail_fast: bool = True
+):
+    """Run async tasks in a pool with a maximum number of concurrent tasks.
+
+    Args:
+        tasks: Coroutines to run. These are consumed lazily.
+        max_concurrent: Maximum number of concurrent tasks. Defaults to
+            `get_default_pool_size`. Ignored when `limiter` is provided.
+        limiter: Limiter to run the tasks with, e.g. to share it across
+            multiple pools or to adapt the concurrency at runtime.
+        fail_fast: When a task raises an error, cancel all queued and
+            running tasks and raise it. When disabled, all tasks run to
+            completion before the first error is raised.
+
+    Returns:
+        list: Results of the tasks in order of `tasks`.
+    """
+    # Coroutines taken by a worker that did not start running yet, e.g.
+    # because the worker is still waiting for a slot of the limiter
+    unstarted = {}
+
+    def _take(tasks):
+        for index, task in enumerate(tasks):
+            unstarted[index] = task
+            yield index, task
+
+    async def _run(indexed_task):
+        index, task = indexed_task
+        unstarted.pop(index, None)
+        return await task
+
+    tasks = iter(tasks)
+    results = {}
+    try:
+        async for (index, _task), result in iter_pool_results(
+            _take(tasks),
+            _run,
+            max_concurrent=max_concurrent,
+            limiter=limiter,
+            fail_fast=fail_fast
+        ):
+            results[index] = result
+    except PoolError as exc:
+        first = min(exc.failures, key=lambda indexed_task: indexed_task[0])
+        raise exc.failures[first]
+    finally:
+        # Close coroutines that never started so they do not warn, also
+        # when the pool got cancelled
+        for task in itertools.chain(unstarted.values(), tasks):
+            if asyncio.iscoroutine(task):
+                task.close()
+
+    return [results[index] for index in sorted(results)]
 
 
 async def process_files_in_pool(
     filepaths: Iterable[str],
     processor: Callable,
-    pool_size=15
-):
-    """Process files in parallel using a pool of subprocesses."""
-    # TODO: We may want to raise an error or stop the pool if one of the
-    #  processes returned an error code that was not 0
-    tasks = [processor(file) for file in filepaths]
-    return await create_tasks_pool(tasks, max_concurrent=pool_size)
+    pool_size: Optional[int] = None,
+    limiter: Optional[AdaptiveLimiter] = None,
+    fail_fast: bool = True
+) -> list:
+    """Process files in parallel using a pool of subprocesses.
+
+    Use `iter_pool_results` instead to handle results in order of
+    completion as they complete.
+
+    Args:
+        filepaths: Files to process. These are consumed lazily.
+        processor: Async function to process a single file with. It should
+            raise an error if processing failed.
+        pool_size: Maximum number of files processed concurrently. Defaults
+            to `get_default_pool_size`. Ignored when `limiter` is provided.
+        limiter: Limiter to process the files with.
+        fail_fast: Stop processing on the first failed file. When disabled
+            all files are processed and all failures are reported at once.
+
+    Returns:
+        list: Results of the processor, in order of `filepaths`.
+
+    Raises:
+        PoolError: When processing failed for any of the files.
+        Exception: Any error raised while iterating `filepaths`.
+    """
+    async def _process(indexed_filepath):
+        return await processor(indexed_filepath[1])
+
+    results = {}
+    try:
+        async for (index, _filepath), result in iter_pool_results(
+            enumerate(filepaths),
+            _process,
+            max_concurrent=pool_size,
+            limiter=limiter,
+            fail_fast=fail_fast
+        ):
+            results[index] = result
+    except PoolError as exc:
+        # Report the failed files rather than their index
+        raise PoolError({
+            filepath: error
+            for (_index, filepath), error in exc.failures.items()
+        }) from exc.__cause__
+    return [results[index] for index in sorted(results)]
 
 
 @contextlib.contextmanager
@@ -68,9 +654,13 @@ def background_task(task):
     """Run background task and cancel it when context exits.
 
     Examples:
-        >>> with background_task(update_qt(app)):
-        >>>     # Do something else
-        >>>     pass
+        >>> async def heartbeat():
+        >>>     while True:
+        >>>         print("Still converting...")
+        >>>         await asyncio.sleep(10)
+        >>>
+        >>> with background_task(heartbeat()):
+        >>>     await generate_apng(...)
 
     Args:
         task (Coroutine): Task to run in the background.
@@ -85,93 +675,717 @@ def background_task(task):
         background.cancel()
 
 
+def get_iconvert_args(input_path: str, output_path: str) -> "list[str]":
+    """Return `iconvert` arguments to convert a frame for APNGC."""
+    # Convert using `iconvert` because it actually converts the alpha
+    # correctly instead of darkening the image like `ffmpeg` seems to do
+    return get_oiio_tool_args(
+        "iconvert",
+        "-d", "uint8",
+        "--sRGB",
+        "--clear-keywords",
+        input_path,
+        output_path
+    )
+
+
+def format_frame_ranges(frames: Iterable[int]) -> str:
+    """Return frames as compact frame ranges, e.g. `1001-1010,1012`."""
+    ranges = []
+    start = end = None
+    for frame in sorted(frames):
+        if start is not None and frame == end + 1:
+            end = frame
+            continue
+        if start is not None:
+            ranges.append(f"{start}-{end}" if start != end else str(start))
+        start = end = frame
+    if start is not None:
+        ranges.append(f"{start}-{end}" if start != end else str(start))
+    return ",".join(ranges)
+
+
+def _convert_file_with_oiio(input_path: str, output_path: str):
+    """Convert a single frame to PNG using the OpenImageIO Python bindings.
+
+    This is the equivalent of `get_iconvert_args` and runs in the worker
+    processes of a `ProcessPoolExecutor`.
+    """
+    import OpenImageIO as oiio
+
+    buf = oiio.ImageBuf(input_path)
+    if buf.has_error:
+        raise RuntimeError(buf.geterror())
+    spec = buf.specmod()
+    spec.attribute("oiio:ColorSpace", "sRGB")
+    spec.erase_attribute("Keywords")
+    if not buf.write(output_path, oiio.UINT8):
+        raise RuntimeError(buf.geterror())
+
+
+class ConversionJob(NamedTuple):
+    """Unit of work of `PNGConverter` converting one or more files to PNG.
+
+    Attributes:
+        label: Label to report the job with.
+        filepaths: Files converted by the job.
+        output_folder: Folder to write the PNG files to.
+        group: Index of the sequence the job belongs to when converting
+            multiple sequences in one pool.
+        input_pattern: Frame pattern of the files when converting a whole
+            sequence in one `oiiotool` process.
+        frames: Frame ranges of `input_pattern` to convert.
+    """
+    label: str
+    filepaths: "tuple[str, ...]"
+    output_folder: str
+    group: int = 0
+    input_pattern: Optional[str] = None
+    frames: Optional[str] = None
+
+    def __str__(self):
+        return self.label
+
+
+class PNGConverter:
+    """Convert files to uint8 sRGB PNG with one of `CONVERSION_BACKENDS`.
+
+    The output files are named after the input files using
+    `get_png_frame_name`. Use as async context manager so that the worker
+    processes of the `oiio_python` backend are shut down when done, and are
+    killed when the conversion failed or got cancelled.
+
+    Examples:
+        >>> async with PNGConverter("oiiotool") as converter:
+        >>>     jobs = converter.iter_jobs(filepaths, output_folder)
+        >>>     await process_files_in_pool(jobs, converter.convert)
+
+    Args:
+        backend: Conversion backend, one of `CONVERSION_BACKENDS`. Backends
+            that are not available fall back to `iconvert`.
+        max_workers: Number of worker processes of the `oiio_python`
+            backend. Defaults to `get_default_pool_size`.
+    """
+
+    def __init__(
+        self,
+        backend: str = DEFAULT_CONVERSION_BACKEND,
+        max_workers: Optional[int] = None
+    ):
+        self.backend = self._get_available_backend(backend)
+        self.max_workers = max_workers or get_default_pool_size()
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @staticmethod
+    def _get_available_backend(backend: str) -> str:
+        if backend == "oiio_python":
+            try:
+                import OpenImageIO  # noqa: F401
+                return backend
+            except ImportError:
+                log.warning(
+                    "OpenImageIO Python bindings are not available. "
+                    "Falling back to 'iconvert' conversion.")
+        elif backend == "oiiotool":
+            try:
+                get_oiio_tool_args("oiiotool")
+                return backend
+            except ToolNotFoundError:
+                log.warning(
+                    "Unable to find 'oiiotool'. "
+                    "Falling back to 'iconvert' conversion.")
+        elif backend != "iconvert":
+            log.warning(
+                f"Unknown conversion backend '{backend}'. "
+                "Falling back to 'iconvert' conversion.")
+        return "iconvert"
+
+    async def __aenter__(self):
+        if self.backend == "oiio_python":
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        executor, self._executor = self._executor, None
+        if executor is None:
+            return
+
+        # `ProcessPoolExecutor` has no public API to get at its workers
+        processes = list((executor._processes or {}).values())
+        if exc_type is None:
+            executor.shutdown(wait=False)
+        else:
+            # The pool failed or got cancelled, so drop conversions that did
+            # not start yet and kill the ones that are still running
+            executor.shutdown(wait=False, cancel_futures=True)
+            for process in processes:
+                with contextlib.suppress(OSError):
+                    process.terminate()
+
+        # Wait for the workers to exit without blocking the event loop
+        def join():
+            for process in processes:
+                process.join()
+
+        await asyncio.get_running_loop().run_in_executor(None, join)
+
+    def iter_jobs(
+        self,
+        filepaths: Iterable[str],
+        output_folder: str,
+        group: int = 0
+    ) -> Iterator[ConversionJob]:
+        """Yield jobs to convert `filepaths` into `output_folder`.
+
+        The `oiiotool` backend converts each sequence in a single job, the
+        other backends convert each file in its own job.
+        """
+        if self.backend == "oiiotool":
+            collections, filepaths = clique.assemble(
+                filepaths,
+                minimum_items=1,
+                assume_padded_when_ambiguous=True
+            )
+            for collection in collections:
+                if not collection.padding:
+                    collection.padding = len(str(min(collection.indexes)))
+                yield ConversionJob(
+                    label=str(collection),
+                    filepaths=tuple(collection),
+                    output_folder=output_folder,
+                    group=group,
+                    input_pattern=collection.format(
+                        "{head}{padding}{tail}"),
+                    frames=format_frame_ranges(collection.indexes)
+                )
+
+        for filepath in filepaths:
+            yield ConversionJob(
+                label=filepath,
+                filepaths=(filepath,),
+                output_folder=output_folder,
+                group=group
+            )
+
+    async def convert(self, job: ConversionJob):
+        """Run conversion job.
+
+        Raises:
+            SubprocessError: When a conversion process failed.
+        """
+        output = "capture" if VERBOSE else "discard"
+        if job.input_pattern:
+            output_path = os.path.join(
+                job.output_folder, get_png_frame_name(job.input_pattern))
+            result = await run_subprocess_async(
+                get_oiio_tool_args(
+                    "oiiotool",
+                    "--frames", job.frames,
+                    job.input_pattern,
+                    "-d", "uint8",
+                    "--sattrib", "oiio:ColorSpace", "sRGB",
+                    "--eraseattrib", "Keywords",
+                    "-o", output_path
+                ),
+                check=True,
+                output=output
+            )
+        else:
+            input_path = job.filepaths[0]
+            output_path = os.path.join(
+                job.output_folder, get_png_frame_name(input_path))
+            if self._executor is not None:
+                result = await asyncio.get_running_loop().run_in_executor(
+                    self._executor,
+                    _convert_file_with_oiio,
+                    input_path,
+                    output_path
+                )
+            else:
+                result = await run_subprocess_async(
+                    get_iconvert_args(input_path, output_path),
+                    check=True,
+                    output=output
+                )
+
+        print("Converted", job, "to PNG:", output_path)
+        if VERBOSE:
+            print(result)
+        return result
+
+
+async def convert_files_to_png(
+    filepaths: "list[str]",
+    output_folder: str,
+    backend: str = DEFAULT_CONVERSION_BACKEND,
+    limiter: Optional[AdaptiveLimiter] = None,
+    fail_fast: bool = True
+):
+    """Convert files to uint8 sRGB PNG files in `output_folder`.
+
+    The output files are named after the input files using
+    `get_png_frame_name`.
+
+    Args:
+        filepaths: Paths of the files to convert.
+        output_folder: Folder to write the PNG files to.
+        backend: Conversion backend, one of `CONVERSION_BACKENDS`. Backends
+            that are not available fall back to `iconvert`.
+        limiter: Limiter for the number of concurrent conversions.
+        fail_fast: Stop converting on the first failed conversion.
+
+    Raises:
+        PoolError: When the conversion of any of the files failed.
+    """
+    if limiter is None:
+        limiter = AdaptiveLimiter(get_default_pool_size())
+
+    async with PNGConverter(backend, limiter.max_concurrent) as converter:
+        return await process_files_in_pool(
+            converter.iter_jobs(filepaths, output_folder),
+            converter.convert,
+            limiter=limiter,
+            fail_fast=fail_fast
+        )
+
+
+def _get_available_assembler(assembler: str) -> str:
+    if assembler == "native":
+        from .apng_writer import is_available
+
+        if is_available():
+            return assembler
+        log.warning(
+            "Pillow is not available for the 'native' assembler. "
+            "Falling back to 'apngc'.")
+    elif assembler != "apngc":
+        log.warning(
+            f"Unknown assembler '{assembler}'. Falling back to 'apngc'.")
+    return "apngc"
+
+
+def get_apng_filename(input_sequence: clique.Collection) -> str:
+    """Return filename of the APNG file for `input_sequence`.
+
+    For example `render.####.exr` becomes `render.png`.
+    """
+    name = os.path.basename(input_sequence.head).rstrip("._- ")
+    return f"{name or 'animation'}.png"
+
+
+async def run_apngc(
+        png_folder: str,
+        apngc_executable: str,
+        apngc_settings_profile: str,
+        tinify_api_key: Optional[str] = None,
+        apng_folder: Optional[str] = None,
+        logger: Optional[logging.Logger] = None
+) -> str:
+    """Generate APNG file from folder of PNG files using APNGC CLI.
+
+    Args:
+        png_folder: Folder with only the PNG frames to assemble.
+        apngc_executable: Path to the APNGC executable.
+        apngc_settings_profile: Path to the APNGC settings .json profile.
+        tinify_api_key: Optional Tinify API key to use for compression.
+        apng_folder: Empty folder to write the APNG file to. When not
+            provided a temporary folder is created which the caller is
+            responsible for removing.
+        logger: Logger to stream the output of APNGC to.
+
+    Returns:
+        str: Path to the generated APNG file.
+
+    Raises:
+        SubprocessError: When APNGC failed.
+    """
+    if apng_folder is None:
+        apng_folder = tempfile.mkdtemp(prefix="transcoding_", suffix="_apng")
+    apngc_args = [
+        apngc_executable,
+        "headless",
+        "--settings",
+        apngc_settings_profile,
+        "--folder",
+        png_folder,
+        "--output_path",
+        apng_folder,
+    ]
+    if tinify_api_key:
+        apngc_args.extend([
+            "--tinify",
+            tinify_api_key
+        ])
+
+    print(f"Running {subprocess.list2cmdline(apngc_args)}")
+    await run_subprocess_async(
+        apngc_args, check=True, output="stream", logger=logger)
+
+    # There should just be a single PNG file in this temp folder
+    filename = os.listdir(apng_folder)[0]
+    filepath = os.path.join(apng_folder, filename)
+    print(f"Finished APNG generation: {filepath}")
+    return filepath
+
+
+async def generate_apngs(
+        input_sequences: "list[clique.Collection]",
+        apngc_executable: str,
+        apngc_settings_profile: str,
+        tinify_api_key: Optional[str] = None,
+        conversion_backend: str = DEFAULT_CONVERSION_BACKEND,
+        frame_cache: "Optional[FrameCache]" = None,
+        limiter: Optional[AdaptiveLimiter] = None,
+        fail_fast: bool = True,
+        on_complete: Optional[Callable[[clique.Collection, str], None]] = None,
+        on_progress: Optional[
+            Callable[[clique.Collection, int, int], None]
+        ] = None,
+        max_concurrent_apngc: int = 4,
+        output_directory: Optional[str] = None,
+        scratch_directory: Optional[str] = None,
+        collapse_duplicates: bool = False,
+        assembler: str = DEFAULT_ASSEMBLER,
+        fps: float = 25.0,
+        compression: Optional[CompressionBackend] = None,
+        logger: Optional[logging.Logger] = None
+) -> "list[Optional[str]]":
+    """Generate APNG files from input sequences using APNGC CLI.
+
+    The frames of all sequences are converted to PNG in a single pool, in
+    order of the sequences. The APNG file of a sequence is assembled as soon
+    as all of its frames are converted, while the frames of the next
+    sequences are still being converted.
+
+    With the `native` assembler the APNG file is written by `apng_writer`
+    instead of APNGC, so the APNGC arguments are not used.
+
+    Frames are compressed by the `compression` backend before assembly.
+    By default APNGC compresses the APNG file with Tinify, for which either
+    the settings profile itself must specify a valid Tinify API key, or the
+    `tinify_api_key` argument must be provided.
+
+    Args:
+        input_sequences: Input sequences to convert to APNG.
+        apngc_executable: Path to the APNGC executable.
+        apngc_settings_profile: Path to the APNGC settings .json profile.
+            This must be an existing .json file on disk.
+        tinify_api_key: Optional Tinify API key to use for compression.
+        conversion_backend: Backend used to convert frames to PNG, one of
+            `CONVERSION_BACKENDS`.
+        frame_cache: Optional cache to reuse frames converted in earlier
+            runs from and to store newly converted frames in.
+        limiter: Limiter for the number of concurrent frame conversions.
+            Share it to also bound the conversions of other batches.
+        fail_fast: Stop converting all sequences on the first failed frame.
+            When disabled all other sequences are still generated before
+            the failures are raised.
+        on_complete: Callback called with the input sequence and the path
+            to its generated APNG file as soon as it is generated.
+        on_progress: Callback called with the input sequence, the number of
+            its finished conversion jobs and its total number of jobs each
+            time one of its conversion jobs finished.
+        max_concurrent_apngc: Maximum number of concurrent APNGC processes.
+        output_directory: Directory to deliver the APNG files to with
+            `deliver_file` under a unique name from `get_output_filepath`.
+            All temporary files are removed when this returns. If not
+            provided, the APNG files are left in temporary folders which
+            the caller is responsible for removing.
+        scratch_directory: Directory to stage the PNG frames and APNG files
+            in, e.g. on a fast local disk. Falls back to the system temp
+            directory if it has too little free space for the frames that
+            are converted, see `select_scratch_directory`.
+        collapse_duplicates: Pass runs of identical frames to APNGC as a
+            single frame which is shown for the duration of the run. If the
+            frame count of the APNG file does not match, APNGC is run again
+            without collapsing.
+        assembler: Assembler to write the APNG files with, one of
+            `ASSEMBLERS`. Falls back to `apngc` if not available.
+        fps: Frame rate of the APNG files written by the `native`
+            assembler. APNGC takes the frame rate from its profile.
+        compression: Backend to compress the frames with. Defaults to
+            Tinify through APNGC with `tinify_api_key`. Its worker
+            processes are shut down when this returns.
+        logger: Logger to stream the output of APNGC to, e.g. of the
+            calling plugin. Defaults to the module logger.
+
+    Returns:
+        list[Optional[str]]: Paths to the generated APNG files in order of
+            `input_sequences`.
+
+    Raises:
+        PoolError: When the conversion of any of the frames failed.
+        SubprocessError: When APNGC failed.
+    """
+    staged_per_sequence = []
+    to_convert_per_sequence = []
+    for input_sequence in input_sequences:
+        staged, to_convert = get_staged_frames(input_sequence, frame_cache)
+        staged_per_sequence.append(staged)
+        to_convert_per_sequence.append(to_convert)
+    scratch_directory = select_scratch_directory(
+        estimate_staging_bytes(to_convert_per_sequence), scratch_directory)
+
+    assembler = _get_available_assembler(assembler)
+    if compression is None:
+        compression = TinifyCompression(tinify_api_key)
+    if compression.get_tinify_api_key() and assembler == "native":
+        log.warning("Tinify compression is only applied by APNGC.")
+    if limiter is None:
+        limiter = AdaptiveLimiter(get_default_pool_size())
+    apngc_semaphore = asyncio.Semaphore(max_concurrent_apngc)
+    outputs: "list[Optional[str]]" = [None] * len(input_sequences)
+
+    async with contextlib.AsyncExitStack() as stack:
+        converter = PNGConverter(conversion_backend, limiter.max_concurrent)
+
+        # Generate PNG sequences
+        png_folders = []
+        jobs_per_sequence = []
+        for index, to_convert in enumerate(to_convert_per_sequence):
+            png_folder = stack.enter_context(
+                tempfile.TemporaryDirectory(prefix="transcoding_",
+                                            suffix="_png",
+                                            dir=scratch_directory))
+            link_staged_frames(staged_per_sequence[index], png_folder)
+            png_folders.append(png_folder)
+            jobs_per_sequence.append(
+                list(converter.iter_jobs(to_convert, png_folder, index)))
+
+        # Entered after the staging folders so their workers are stopped
+        # before the folders they write to are removed
+        await stack.enter_async_context(converter)
+        stack.enter_context(compression)
+
+        async def assemble(index: int):
+            input_sequence = input_sequences[index]
+            png_folder = png_folders[index]
+            print(f"Converted {input_sequence} to PNG to: {png_folder}")
+            if frame_cache:
+                for input_path in to_convert_per_sequence[index]:
+                    frame_cache.put(
+                        input_path,
+                        os.path.join(png_folder,
+                                     get_png_frame_name(input_path))
+                    )
+
+            png_paths = [
+                os.path.join(png_folder, get_png_frame_name(path))
+                for path in input_sequence
+            ]
+            # APNGC includes all files of the output folder, so each
+            # sequence gets its own
+            if output_directory:
+                apng_folder = stack.enter_context(
+                    tempfile.TemporaryDirectory(prefix="transcoding_",
+                                                suffix="_apng",
+                                                dir=scratch_directory))
+            else:
+                apng_folder = tempfile.mkdtemp(prefix="transcoding_",
+                                               suffix="_apng",
+                                               dir=scratch_directory)
+
+            loop = asyncio.get_running_loop()
+            async with apngc_semaphore:
+                await loop.run_in_executor(
+                    None, compression.compress_frames, png_paths)
+
+            if assembler == "native":
+                from .apng_writer import write_apng
+
+                # The writer merges identical frames itself. It shares the
+                # worker processes of the compression backend, so the batch
+                # uses a single process pool however many files are written
+                # at once.
+                filepath = os.path.join(
+                    apng_folder, get_apng_filename(input_sequence))
+                async with apngc_semaphore:
+                    await loop.run_in_executor(None, functools.partial(
+                        write_apng,
+                        png_paths,
+                        filepath,
+                        fps=fps,
+                        max_workers=compression.max_workers,
+                        executor=compression.get_executor()
+                    ))
+                print(f"Finished APNG generation: {filepath}")
+            else:
+                run_lengths = None
+                if collapse_duplicates:
+                    duplicates_folder = stack.enter_context(
+                        tempfile.TemporaryDirectory(prefix="transcoding_",
+                                                    suffix="_duplicates",
+                                                    dir=scratch_directory))
+                    run_lengths = await loop.run_in_executor(
+                        None,
+                        collapse_duplicate_frames,
+                        png_paths,
+                        duplicates_folder
+                    )
+                    collapsed = sum(run_lengths) - len(run_lengths)
+                    if collapsed:
+                        print(f"Collapsed {collapsed} duplicate frames of "
+                              f"{input_sequence}")
+                    else:
+                        run_lengths = None
+
+                async with apngc_semaphore:
+                    filepath = await run_apngc(
+                        png_folder,
+                        apngc_executable,
+                        apngc_settings_profile,
+                        compression.get_tinify_api_key(),
+                        apng_folder=apng_folder,
+                        logger=logger
+                    )
+                    if run_lengths and not set_apng_frame_delays(
+                        filepath, run_lengths
+                    ):
+                        # APNGC dropped or merged frames itself, so the
+                        # delays can't be matched to the collapsed frames
+                        log.warning(
+                            f"Frame count of {filepath} does not match the "
+                            f"frames passed to APNGC. Generating APNG of "
+                            f"{input_sequence} again without collapsing "
+                            f"duplicate frames."
+                        )
+                        os.remove(filepath)
+                        restore_duplicate_frames(duplicates_folder,
+                                                 png_folder)
+                        filepath = await run_apngc(
+                            png_folder,
+                            apngc_executable,
+                            apngc_settings_profile,
+                            compression.get_tinify_api_key(),
+                            apng_folder=apng_folder,
+                            logger=logger
+                        )
+            if output_directory:
+                output_filepath = get_output_filepath(
+                    filepath, output_directory)
+                deliver_file(filepath, output_filepath)
+                filepath = output_filepath
+            outputs[index] = filepath
+            if on_complete:
+                on_complete(input_sequence, filepath)
+
+        remaining = [len(jobs) for jobs in jobs_per_sequence]
+        assemble_tasks = [
+            asyncio.ensure_future(assemble(index))
+            for index, count in enumerate(remaining) if not count
+        ]
+        pool_error = None
+        try:
+            try:
+                async for job, _result in iter_pool_results(
+                    itertools.chain.from_iterable(jobs_per_sequence),
+                    converter.convert,
+                    limiter=limiter,
+                    fail_fast=fail_fast
+                ):
+                    remaining[job.group] -= 1
+                    if on_progress:
+                        total = len(jobs_per_sequence[job.group])
+                        on_progress(
+                            input_sequences[job.group],
+                            total - remaining[job.group],
+                            total
+                        )
+                    if not remaining[job.group]:
+                        assemble_tasks.append(
+                            asyncio.ensure_future(assemble(job.group)))
+            except PoolError as exc:
+                if fail_fast:
+                    raise
+                # Finish the sequences that did convert before raising
+                pool_error = exc
+
+            await asyncio.gather(*assemble_tasks)
+        finally:
+            for task in assemble_tasks:
+                task.cancel()
+            await asyncio.gather(*assemble_tasks, return_exceptions=True)
+
+        if frame_cache:
+            frame_cache.evict()
+
+    if pool_error:
+        raise pool_error
+    return outputs
+
 
 async def generate_apng(
         input_sequence: clique.Collection,
         apngc_executable: str,
         apngc_settings_profile: str,
-        tinify_api_key: Optional[str] = None
+        tinify_api_key: Optional[str] = None,
+        conversion_backend: str = DEFAULT_CONVERSION_BACKEND,
+        frame_cache: "Optional[FrameCache]" = None,
+        limiter: Optional[AdaptiveLimiter] = None,
+        fail_fast: bool = True,
+        output_directory: Optional[str] = None,
+        scratch_directory: Optional[str] = None,
+        assembler: str = DEFAULT_ASSEMBLER,
+        fps: float = 25.0,
+        compression: Optional[CompressionBackend] = None,
+        logger: Optional[logging.Logger] = None
 ) -> str:
     """Generate APNG file from input sequence using APNGC CLI.
 
-    The APNGC CLI uses Tinify to compress the resulting APNG file, so either
+    By default APNGC compresses the APNG file with Tinify, for which either
     the settings profile itself must specify a valid Tinify API key, or the
     `tinify_api_key` argument must be provided.
 
+    See `generate_apngs` to convert multiple sequences in one batch.
+
     Args:
         input_sequence: Input sequence to convert to APNG.
         apngc_executable: Path to the APNGC executable.
         apngc_settings_profile: Path to the APNGC settings .json profile.
             This must be an existing .json file on disk.
         tinify_api_key: Optional Tinify API key to use for compression.
+        conversion_backend: Backend used to convert frames to PNG, one of
+            `CONVERSION_BACKENDS`.
+        frame_cache: Optional cache to reuse frames converted in earlier
+            runs from and to store newly converted frames in.
+        limiter: Limiter for the number of concurrent frame conversions.
+        fail_fast: Stop converting frames on the first failed frame. When
+            disabled all frames are converted before failures are raised.
+        output_directory: Directory to deliver the APNG file to. See
+            `generate_apngs`.
+        scratch_directory: Directory to stage files in. See
+            `generate_apngs`.
+        assembler: Assembler to write the APNG file with, one of
+            `ASSEMBLERS`.
+        fps: Frame rate of the APNG file written by the `native`
+            assembler.
+        compression: Backend to compress the frames with. See
+            `generate_apngs`.
+        logger: Logger to stream the output of APNGC to.
 
     Returns:
         str: Path to the generated APNG file.
+
+    Raises:
+        PoolError: When the conversion of any of the frames failed.
+        SubprocessError: When APNGC failed.
     """
-    # Enforce padding on sequence if not set to be length of first frame
-    # This fixes some cases if `clique.assemble` was not called with
-    # `assume_padded_when_ambiguous=True`
-    if not input_sequence.padding:
-        input_sequence.padding = len(str(list(input_sequence.indexes)[0]))
+    outputs = await generate_apngs(
+        [input_sequence],
+        apngc_executable=apngc_executable,
+        apngc_settings_profile=apngc_settings_profile,
+        tinify_api_key=tinify_api_key,
+        conversion_backend=conversion_backend,
+        frame_cache=frame_cache,
+        limiter=limiter,
+        fail_fast=fail_fast,
+        output_directory=output_directory,
+        scratch_directory=scratch_directory,
+        assembler=assembler,
+        fps=fps,
+        compression=compression,
+        logger=logger
+    )
+    return outputs[0]
 
-    with contextlib.ExitStack() as stack:
-        # Generate PNG sequence
-        png_folder = stack.enter_context(
-            tempfile.TemporaryDirectory(prefix="transcoding_", suffix="_png"))
 
-        async def convert_to_png(
-                input_path
-        ):
-            fname = os.path.splitext(os.path.basename(input_path))[0] + ".png"
-            output_path = os.path.join(png_folder, fname)
-            # Convert using `iconvert` because it actually converts the alpha
-            # correctly instead of darkening the image like `ffmpeg` seems to do
-            iconvert = get_oiio_tool_args(
-                "iconvert",
-                "-d", "uint8",
-                "--sRGB",
-                "--clear-keywords",
-                input_path,
-                output_path
-            )
-            result = await run_subprocess_async(iconvert)
-            print("Converted", input_path, "to PNG:", output_path)
-            if VERBOSE:
-                print(result)
-
-            return result
-
-        # TODO: Skip conversion if input is already png?
-        await process_files_in_pool(input_sequence, convert_to_png)
-        print(f"Converted {input_sequence} to PNG to: {png_folder}")
-
-        # Generate APNG using `apngc` CLI
-        # Note: APNGC processes a folder of PNGs - and will include *all*
-        # files. So we should isolate the PNG files we want into a dedicated
-        # temp folder
-        apng_folder = tempfile.TemporaryDirectory(prefix="transcoding_",
-                                                  suffix="_apng").name
-        apngc_args = [
-            apngc_executable,
-            "headless",
-            "--settings",
-            apngc_settings_profile,
-            "--folder",
-            png_folder,
-            "--output_path",
-            apng_folder,
-        ]
-        if tinify_api_key:
-            apngc_args.extend([
-                "--tinify",
-                tinify_api_key
-            ])
-
-        print(f"Running {subprocess.list2cmdline(apngc_args)}")
-        await run_subprocess_async(apngc_args)
-
-        # There should just be a single PNG file in this temp folder
-        filename = os.listdir(apng_folder)[0]
-        filepath = os.path.join(apng_folder, filename)
-        print(f"Finished APNG generation: {filepath}")
-        return filepath
@@ -1,27 +1,169 @@
 import os
-import shutil
 import time
 import asyncio
+import contextlib
+import tempfile
+import traceback
+from collections import defaultdict
 
-from qtpy import QtWidgets
-import clique
+from qtpy import QtWidgets, QtCore
 
-from ayon_core.lib import is_running_from_build, EnumDef
+from ayon_core.lib import (
+    is_running_from_build,
+    get_ayon_launcher_args,
+    run_detached_process,
+    EnumDef,
+    BoolDef,
+)
 from ayon_core.pipeline import load
-from ayon_core.pipeline.context_tools import get_project_settings
 
-from ayon_colorbleed import lib
+from ayon_colorbleed import lib, apng_job
+from ayon_colorbleed.project_cache import get_project_settings
+from ayon_colorbleed.sequence import get_representation_sequence
 
 # TODO: Remove forced reload if not in dev mode
 import importlib
 importlib.reload(lib)
+importlib.reload(apng_job)
+
+# Seconds without new status events after which a background conversion is
+# assumed to have died before writing its `finished` or `failed` event
+STATUS_STALE_TIMEOUT = 15 * 60
+
+
+class CoroutineThread(QtCore.QThread):
+    """Run a coroutine in its own asyncio event loop on a separate thread.
+
+    The result, or the error raised by the coroutine, is available once the
+    thread emits `finished`.
+    """
+
+    def __init__(self, coroutine, parent=None):
+        super().__init__(parent)
+        self._coroutine = coroutine
+        self.result = None
+        self.error = None
+
+    def run(self):
+        try:
+            self.result = asyncio.run(self._coroutine)
+        except BaseException as exc:
+            self.error = exc
+
 
 def run_task_with_qt_update(task):
-    async def runner(_task):
-        app = QtWidgets.QApplication.instance()
-        with lib.background_task(lib.update_qt(app)):
-            return await _task
-    return asyncio.run(runner(task))
+    """Run coroutine to completion while keeping the Qt UI responsive.
+
+    The coroutine runs in a `CoroutineThread` while this thread waits in a
+    nested `QEventLoop`, which only wakes up to handle Qt events and quits
+    on the thread's `finished` signal. This avoids polling
+    `QApplication.processEvents` from within the asyncio event loop.
+    """
+    if not QtWidgets.QApplication.instance():
+        return asyncio.run(task)
+
+    event_loop = QtCore.QEventLoop()
+    thread = CoroutineThread(task)
+    thread.finished.connect(event_loop.quit)
+    thread.start()
+    # The `finished` signal is queued to this thread, so it quits the event
+    # loop even if the coroutine finished before the event loop started
+    event_loop.exec_()
+    thread.wait()
+
+    if thread.error is not None:
+        raise thread.error
+    return thread.result
+
+
+def show_error(title, message, details=None):
+    """Show error message box, e.g. for errors outside of `load`."""
+    box = QtWidgets.QMessageBox(
+        QtWidgets.QMessageBox.Critical, title, message)
+    if details:
+        box.setDetailedText(details)
+    box.exec_()
+
+
+class StatusFileWatcher(QtCore.QObject):
+    """Log progress of a background conversion from its status file.
+
+    Polls the JSON lines status file written by the `convert-apng` CLI
+    command until it reports the conversion `finished` or `failed`, then
+    removes the file. The launched process can't tell when the conversion
+    ends, as on some platforms it only is a launcher that exits right away,
+    so the watcher also stops when no events were written for
+    `stale_timeout` seconds.
+    """
+
+    # Keep watchers alive while they are running
+    _active = set()
+
+    def __init__(
+        self,
+        path,
+        log,
+        interval=500,
+        stale_timeout=STATUS_STALE_TIMEOUT,
+        parent=None
+    ):
+        super().__init__(parent)
+        self._path = path
+        self._log = log
+        self._offset = 0
+        self._stale_timeout = stale_timeout
+        self._last_event_time = time.monotonic()
+
+        self._timer = QtCore.QTimer(self)
+        self._timer.timeout.connect(self._on_timeout)
+        self._timer.start(interval)
+        self._active.add(self)
+
+    def stop(self):
+        """Stop watching and remove the status file."""
+        self._timer.stop()
+        self._active.discard(self)
+        with contextlib.suppress(OSError):
+            os.remove(self._path)
+
+    def _on_timeout(self):
+        events, self._offset = apng_job.read_status(self._path, self._offset)
+        now = time.monotonic()
+        if events:
+            self._last_event_time = now
+
+        # Only log the latest progress per sequence
+        progress = {}
+        ended = False
+        for event in events:
+            if event["event"] == "progress":
+                progress[event["sequence"]] = event
+                continue
+            elif event["event"] == "started":
+                for sequence in event["sequences"]:
+                    self._log.info(f"Converting {sequence}")
+            elif event["event"] == "completed":
+                self._log.info(f"Finished {event['sequence']}")
+            elif event["event"] == "failed":
+                self._log.error(f"Conversion failed: {event['error']}")
+                ended = True
+            elif event["event"] == "finished":
+                self._log.info("Finished background conversion.")
+                ended = True
+
+        for event in progress.values():
+            self._log.info(
+                f"Converted {event['done']}/{event['total']} "
+                f"of {event['sequence']}")
+
+        if ended:
+            self.stop()
+        elif now - self._last_event_time > self._stale_timeout:
+            self._log.warning(
+                f"Background conversion wrote no progress for "
+                f"{self._stale_timeout:.0f} seconds. Stopped watching "
+                f"{self._path}")
+            self.stop()
 
 
 class ConvertToAPNG(load.LoaderPlugin):
@@ -42,16 +184,16 @@ class ConvertToAPNG(load.LoaderPlugin):
     icon = "compress"
     color = "#7289da"
 
-    _apngc_settings = {}
+    # Representations queued by `load` to be converted in a single batch
+    # once the loader finished calling `load` for all selections. Each entry
+    # is the project name, profile, assembler, compression backend, whether
+    # to run in background and the representation context.
+    _queue: "list[tuple[str, str, str, str, bool, dict]]" = []
 
     @classmethod
     def get_apngc_settings(cls, project_name):
-        # Cache for as long as loader is in memory
-        if cls._apngc_settings.get(project_name) is None:
-            settings = get_project_settings(project_name)
-            apngc_settings = settings.get("colorbleed", {}).get("apngc", {})
-            cls._apngc_settings[project_name] = apngc_settings
-        return cls._apngc_settings[project_name]
+        settings = get_project_settings(project_name)
+        return settings.get("colorbleed", {}).get("apngc", {})
 
     @classmethod
     def get_options(cls, contexts):
@@ -59,17 +201,55 @@ class ConvertToAPNG(load.LoaderPlugin):
         project_name = context["project"]["name"]
         settings_profile = cls.get_apngc_settings(project_name)
         profiles: list[str] = settings_profile.get("profiles")
-        if not profiles:
-            return []
 
-        return [
-            EnumDef(
+        options = []
+        if profiles:
+            options.append(EnumDef(
                 "profile", items=[{
                     "value": profile,
                     "label": os.path.basename(profile)
                 } for profile in profiles]
+            ))
+        return options + [
+            EnumDef(
+                "assembler",
+                label="Assembler",
+                items=[
+                    {"value": "apngc", "label": "APNGC"},
+                    {"value": "native", "label": "Native"},
+                ],
+                tooltip=(
+                    "Write the APNG with the APNGC executable or natively "
+                    "in Python, which does not use the APNGC profile."
+                ),
+                default=apng_job.get_assembler(settings_profile)
+            ),
+            EnumDef(
+                "compression",
+                label="Compression",
+                items=[
+                    {"value": "tinify", "label": "Tinify (online)"},
+                    {"value": "local", "label": "Local (offline)"},
+                    {"value": "none", "label": "None"},
+                ],
+                tooltip=(
+                    "Compress with Tinify through APNGC, which needs an "
+                    "internet connection and API key, or locally on this "
+                    "machine."
+                ),
+                default=apng_job.get_compression(settings_profile)
+            ),
+            BoolDef(
+                "run_in_background",
+                label="Run in background",
+                tooltip=(
+                    "Convert in a separate process so the loader stays "
+                    "responsive. Progress is logged by the loader."
+                ),
+                default=settings_profile.get("run_in_background", False)
             )
         ]
+
     @classmethod
     def is_compatible_loader(cls, context):
         if context["representation"]["name"] == "thumbnail":
@@ -80,68 +260,173 @@ class ConvertToAPNG(load.LoaderPlugin):
         # TODO: Open popup dialog that logs the output of the conversion
         #       and if possible allow the user to cancel the conversion
         #       or see when it finished.
-        # TODO: Run multiples in one batch and at the end of the first open
-        #       temporary directory (or at end the end of all) so the user
-        #       has access to the files and can do with it whatever they want
-        # TODO: Run completely in spawned off process to make it easier to
-        #       spawn many. OR submit it to farm on Deadline is probably
-        #       better.
-
-        path = self.filepath_from_context(context)
+        # TODO: Submit to farm on Deadline is probably better.
+
         project_name: str = context["project"]["name"]
         settings_profile = self.get_apngc_settings(project_name)
 
         profile = options.get("profile")
-        if not profile:
+        assembler = apng_job.get_assembler(
+            settings_profile, options.get("assembler"))
+        compression = apng_job.get_compression(
+            settings_profile, options.get("compression"))
+        if not profile and assembler != "native":
             # TODO: Support picking profile dynamically based on context
             raise RuntimeError("Please use with option box.")
 
-        executable = settings_profile.get("executable")
-        tinify_api_key = settings_profile.get("tinify_api_key")
-        output_directory = settings_profile.get("output_directory")
-        if not executable:
-            raise ValueError("No APNGC executable path found in settings.")
-        if not profile:
-            raise ValueError("No APNGC profiles found in settings.")
-        if not tinify_api_key:
-            raise ValueError("No Tinify API key found in settings.")
-        if not output_directory:
-            raise ValueError(
-                "No conversion output directory found in settings.")
-
-        # Get the sequence
-        folder = os.path.dirname(path)
-        fname = os.path.basename(path)
-        head = fname.split(".")[0]  # head before frame number
-        ext = os.path.splitext(fname)[-1]
-        sequence = [
-            os.path.join(folder, fname) for fname in os.listdir(folder)
-            if fname.startswith(head) and fname.endswith(ext)
-        ]
+        apng_job.validate_apngc_settings(
+            settings_profile, profile, assembler, compression)
+
+        # The loader calls `load` for each selected representation, so we
+        # queue it and convert all of them in one batch once the loader
+        # returns control to the Qt event loop
+        queue = ConvertToAPNG._queue
+        queue.append((
+            project_name,
+            profile,
+            assembler,
+            compression,
+            options.get("run_in_background", False),
+            context
+        ))
+        if len(queue) == 1:
+            if QtWidgets.QApplication.instance():
+                QtCore.QTimer.singleShot(0, self.process_queue_deferred)
+            else:
+                self.process_queue()
+
+    def process_queue_deferred(self):
+        """Run `process_queue` from the Qt event loop and report errors.
+
+        Errors raised from a Qt timer callback do not reach the loader, so
+        they are logged and shown to the user here instead.
+        """
+        try:
+            self.process_queue()
+        except Exception as exc:
+            self.log.error("Conversion to APNG failed.", exc_info=True)
+            show_error(
+                "Convert to APNG failed",
+                f"Conversion to APNG failed: {exc}",
+                details=traceback.format_exc()
+            )
+
+    @classmethod
+    def get_shared_limiter(cls, project_names):
+        """Return limiter shared by all conversions of a batch.
+
+        A batch can contain representations of different projects, so the
+        limiter is configured from the settings of all of them, like each
+        project's conversions are limited when run in the background.
+        """
+        return apng_job.create_limiter(*(
+            cls.get_apngc_settings(project_name)
+            for project_name in sorted(project_names)
+        ))
+
+    def process_queue(self):
+        """Convert all queued representations in a single batch.
+
+        Representations are grouped per project, APNGC profile, assembler
+        and compression backend. All groups converted in this process share
+        one limiter so that the frames of all sequences are converted by a
+        single pool.
+        """
+        queue = list(ConvertToAPNG._queue)
+        ConvertToAPNG._queue.clear()
+        if not queue:
+            return
+
+        contexts_by_group = defaultdict(list)
+        for entry in queue:
+            *key, context = entry
+            contexts_by_group[tuple(key)].append(context)
+
+        # Projects of the groups that are converted in this process
+        project_names = {
+            key[0] for key in contexts_by_group if not key[-1]
+        }
+        limiter = None
+        tasks = []
+        sequence_count = 0
+        try:
+            for key, contexts in contexts_by_group.items():
+                (
+                    project_name, profile, assembler, compression,
+                    in_background
+                ) = key
+                if in_background:
+                    self.run_in_background(
+                        project_name, profile, assembler, compression, [
+                            context["representation"]["id"]
+                            for context in contexts
+                        ]
+                    )
+                    continue
+
+                if limiter is None:
+                    limiter = self.get_shared_limiter(project_names)
+
+                sequences = []
+                for context in contexts:
+                    path = self.filepath_from_context(context)
+                    sequences.append(get_representation_sequence(
+                        context["representation"], path))
+                    print(f"Converting {sequences[-1]}")
+                sequence_count += len(sequences)
+
+                settings_profile = self.get_apngc_settings(project_name)
+                tasks.append(lib.generate_apngs(
+                    sequences,
+                    limiter=limiter,
+                    logger=self.log,
+                    **apng_job.get_generate_apngs_kwargs(
+                        settings_profile, profile, assembler, compression)
+                ))
+        except Exception:
+            # Do not leave the batches created so far un-awaited
+            for task in tasks:
+                task.close()
+            raise
+
+        if not tasks:
+            return
+
+        async def run_batches():
+            return await asyncio.gather(*tasks)
+
+        run_task_with_qt_update(run_batches())
+        self.log.info(
+            f"Converted {sequence_count} sequences with concurrency "
+            f"{limiter}")
+
+    def run_in_background(
+        self,
+        project_name,
+        profile,
+        assembler,
+        compression,
+        representation_ids
+    ):
+        """Spawn detached `convert-apng` CLI process for representations.
+
+        Progress of the process is logged by a `StatusFileWatcher`.
+        """
+        fd, status_file = tempfile.mkstemp(
+            prefix="ayon_apng_", suffix=".jsonl")
+        os.close(fd)
 
-        collections, remainder = clique.assemble(
-            sequence,
-            assume_padded_when_ambiguous=True)
-        assert not remainder, f"No sequence collection found for {path}"
-        collection = collections[0]
-
-        # Ensure output folder can exist
-        os.makedirs(output_directory, exist_ok=True)
-
-        print(f"Converting {collection}")
-        task = lib.generate_apng(
-            collection,
-            apngc_executable=executable,
-            apngc_settings_profile=profile,
-            tinify_api_key=tinify_api_key
+        args = get_ayon_launcher_args(
+            "addon", "colorbleed", "convert-apng",
+            "--project", project_name,
+            "--profile", profile or "",
+            "--status_file", status_file,
+            "--assembler", assembler,
+            "--compression", compression,
+            *representation_ids
         )
-        filepath = run_task_with_qt_update(task)
-
-        # Copy the file to the output location
-        fname = os.path.basename(filepath)
-        head, ext = os.path.splitext(fname)
-        timestamp = time.strftime("%Y%m%d-%H%M%S")
-        fname = f"{head}_{timestamp}{ext}"
-        output_filepath = os.path.join(output_directory, fname)
-        shutil.copyfile(filepath, output_filepath)
-        print(f"Copied output file: {output_filepath}")
\ No newline at end of file
+        self.log.info(
+            f"Converting {len(representation_ids)} representations "
+            "in background")
+        run_detached_process(args)
+        StatusFileWatcher(status_file, self.log)
@@ -0,0 +1,61 @@
+import pyblish.api
+
+from ayon_api import get_products
+
+from ayon_colorbleed.publish_timing import timed
+
+
+class CollectExistingProductGroups(pyblish.api.ContextPlugin):
+    """Collect product group of existing products of all instances.
+
+    The products are queried in a single call so that plugins can look up
+    the current group of an instance's product without a server round trip.
+
+    The groups are stored in `context.data["existingProductGroups"]` as
+    `{folder_id: {product_name: product_group}}`. Products that do not exist
+    yet are not included.
+    """
+
+    order = pyblish.api.CollectorOrder + 0.495
+    label = "Collect Existing Product Groups"
+
+    @timed
+    def process(self, context):
+        product_names_by_folder_id = {}
+        for instance in context:
+            if not instance.data.get("publish", True):
+                continue
+            folder_entity = instance.data.get("folderEntity")
+            product_name = instance.data.get("productName")
+            if not folder_entity or not product_name:
+                continue
+            folder_id = folder_entity["id"]
+            product_names_by_folder_id.setdefault(
+                folder_id, set()).add(product_name)
+
+        existing_product_groups = {}
+        context.data["existingProductGroups"] = existing_product_groups
+        if not product_names_by_folder_id:
+            return
+
+        product_names = set().union(*product_names_by_folder_id.values())
+        project_name = context.data["projectName"]
+        for product_entity in get_products(
+            project_name,
+            folder_ids=set(product_names_by_folder_id),
+            product_names=product_names,
+            fields={"name", "folderId", "attrib.productGroup"}
+        ):
+            folder_id = product_entity["folderId"]
+            product_name = product_entity["name"]
+            if product_name not in product_names_by_folder_id[folder_id]:
+                continue
+
+            product_group = product_entity["attrib"].get("productGroup")
+            existing_product_groups.setdefault(
+                folder_id, {})[product_name] = product_group
+
+        self.log.debug(
+            "Collected existing product groups: {}".format(
+                existing_product_groups)
+        )
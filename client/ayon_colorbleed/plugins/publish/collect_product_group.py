@@ -2,14 +2,22 @@ import pyblish.api
 from ayon_core.lib import TextDef
 from ayon_core.pipeline.publish import AYONPyblishPluginMixin
 
+from ayon_colorbleed.publish_timing import timed
+
 
 class CollectUserProductGroup(pyblish.api.InstancePlugin,
                               AYONPyblishPluginMixin):
-    """Allow user to define `productGroup` on publish in new publisher"""
+    """Allow user to define `productGroup` on publish in new publisher
+
+    The group of the existing product, as collected by
+    `CollectExistingProductGroups`, is only read to log when the user
+    defined group changes it.
+    """
 
     order = pyblish.api.CollectorOrder + 0.499
     label = "Collect User Product Group"
 
+    @timed
     def process(self, instance):
 
         attr_values = self.get_attr_values_from_data(instance.data)
@@ -28,9 +36,30 @@ class CollectUserProductGroup(pyblish.api.InstancePlugin,
             )
             return
 
+        existing_product_group = self.get_existing_product_group(instance)
+        if (
+            existing_product_group
+            and existing_product_group != user_product_group
+        ):
+            self.log.info(
+                "Changing product group of existing product from '{}' "
+                "to '{}'".format(existing_product_group, user_product_group)
+            )
         self.log.debug("Setting product group: {}".format(user_product_group))
         instance.data["productGroup"] = user_product_group
 
+    @staticmethod
+    def get_existing_product_group(instance):
+        """Return group of the existing product of the instance, if any."""
+        folder_entity = instance.data.get("folderEntity")
+        product_name = instance.data.get("productName")
+        if not folder_entity or not product_name:
+            return None
+        existing_product_groups = instance.context.data.get(
+            "existingProductGroups", {})
+        return existing_product_groups.get(
+            folder_entity["id"], {}).get(product_name)
+
     @classmethod
     def get_attribute_defs(cls):
         return [
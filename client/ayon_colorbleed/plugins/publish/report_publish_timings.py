@@ -0,0 +1,65 @@
+import os
+import json
+import time
+import getpass
+
+import pyblish.api
+
+from ayon_colorbleed.publish_timing import TIMINGS_KEY, summarize_timings
+
+
+class ReportPublishTimings(pyblish.api.ContextPlugin):
+    """Log the time spent in the publish plugins of the colorbleed addon.
+
+    Optionally the timings are written as JSON to a directory configured in
+    settings so they can be compared across publishes.
+    """
+
+    order = pyblish.api.IntegratorOrder + 0.499
+    label = "Report Colorbleed Publish Timings"
+
+    json_directory = ""
+
+    @classmethod
+    def apply_settings(cls, project_settings):
+        settings = project_settings["colorbleed"]["publish_timings"]
+        cls.enabled = settings["enabled"]
+        cls.json_directory = settings["json_directory"]
+
+    def process(self, context):
+        timings = context.data.get(TIMINGS_KEY)
+        if not timings:
+            return
+
+        summary = summarize_timings(timings)
+        lines = [
+            "{duration:8.3f}s {server_calls:4d} calls {count:4d}x  "
+            "{plugin}".format(**item)
+            for item in summary
+        ]
+        self.log.info(
+            "Colorbleed plugin timings (slowest first):\n{}".format(
+                "\n".join(lines))
+        )
+
+        if self.json_directory:
+            self.write_json(context, timings, summary)
+
+    def write_json(self, context, timings, summary):
+        os.makedirs(self.json_directory, exist_ok=True)
+        filepath = os.path.join(
+            self.json_directory,
+            "publish_timings_{}_{}.json".format(
+                time.strftime("%Y%m%d_%H%M%S"), os.getpid())
+        )
+        data = {
+            "time": time.time(),
+            "user": getpass.getuser(),
+            "project": context.data.get("projectName"),
+            "host": context.data.get("hostName"),
+            "summary": summary,
+            "timings": timings,
+        }
+        with open(filepath, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=4)
+        self.log.debug("Wrote publish timings to: {}".format(filepath))
@@ -4,12 +4,17 @@ import pyblish.api
 from ayon_core.lib import EnumDef
 from ayon_core.pipeline.publish import AYONPyblishPluginMixin
 from ayon_core.pipeline import get_current_project_name
-from ayon_api import get_project
 
+from ayon_colorbleed.project_cache import (
+    get_project_statuses,
+    invalidate_project_cache,
+)
+from ayon_colorbleed.publish_timing import timed
 
-def get_project_status_names(project_entity: dict) -> List[str]:
-    """Return available status names in current project"""
-    statuses = project_entity["statuses"]
+
+def get_project_status_names(project_name: str) -> List[str]:
+    """Return available status names in project"""
+    statuses = get_project_statuses(project_name)
     return [status["name"] for status in statuses]
 
 
@@ -24,9 +29,9 @@ class SetVersionStatus(pyblish.api.InstancePlugin, AYONPyblishPluginMixin):
     @classmethod
     def apply_settings(cls, project_settings):
         project_name = get_current_project_name()
-        project = get_project(project_name)
-        cls.statuses = get_project_status_names(project)
+        cls.statuses = get_project_status_names(project_name)
 
+    @timed
     def process(self, instance):
         attr_values = self.get_attr_values_from_data(instance.data)
         status = attr_values.get("status")
@@ -41,6 +46,19 @@ class SetVersionStatus(pyblish.api.InstancePlugin, AYONPyblishPluginMixin):
                 f"data is already set to: {existing_status}")
             return
 
+        project_name = instance.context.data["projectName"]
+        if status not in get_project_status_names(project_name):
+            # The cached statuses may be outdated, e.g. the status was
+            # renamed since the publisher was reset
+            invalidate_project_cache(project_name)
+            status_names = get_project_status_names(project_name)
+            self.__class__.statuses = status_names
+            if status not in status_names:
+                self.log.warning(
+                    f"Status '{status}' does not exist in project "
+                    f"'{project_name}', the version status is not set.")
+                return
+
         self.log.info(f"Setting status to: {status}")
         instance.data["status"] = status
 
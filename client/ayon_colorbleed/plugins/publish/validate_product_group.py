@@ -1,16 +1,22 @@
 import pyblish.api
 
 from ayon_core.pipeline.publish import AYONPyblishPluginMixin
-from ayon_api import get_product_by_name
+
+from ayon_colorbleed.publish_timing import timed
 
 
 class ValidateProductGroupChange(pyblish.api.InstancePlugin,
                                  AYONPyblishPluginMixin):
-    """Log a warning if `productGroup` changes from current product's group"""
+    """Log a warning if `productGroup` changes from current product's group
+
+    The current groups are collected for all instances at once by
+    `CollectExistingProductGroups`.
+    """
 
     order = pyblish.api.ValidatorOrder
     label = "Validate Product Group Change"
 
+    @timed
     def process(self, instance):
 
         if not instance.data.get("productGroup"):
@@ -21,24 +27,19 @@ class ValidateProductGroupChange(pyblish.api.InstancePlugin,
             "Instance has product group set to: {}".format(product_group)
         )
 
-        asset_doc = instance.data.get("assetEntity")
-        if not asset_doc:
+        folder_entity = instance.data.get("folderEntity")
+        if not folder_entity:
             return
 
         product_name = instance.data.get("productName")
         if not product_name:
             return
 
-        # Get existing product if it exists
-        project_name = instance.context.data["projectName"]
-        existing_product_doc = get_product_by_name(
-            project_name, product_name, asset_doc["_id"],
-            fields=["data.productGroup"]
-        )
-        if not existing_product_doc:
-            return
-
-        existing_group = existing_product_doc.get("data", {}).get("productGroup")
+        # Get group of existing product if it exists
+        existing_product_groups = instance.context.data.get(
+            "existingProductGroups", {})
+        existing_group = existing_product_groups.get(
+            folder_entity["id"], {}).get(product_name)
         if not existing_group:
             return
 
@@ -0,0 +1,217 @@
+"""Read and patch PNG and APNG files by their chunks.
+
+These only parse the chunk headers, or memory-map the file, so they are
+cheap enough to run on every frame of a sequence without decoding it.
+"""
+import os
+import mmap
+import zlib
+import struct
+import hashlib
+import fractions
+from typing import Optional
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# PNG IHDR color types that can be passed through to APNGC as-is: grayscale,
+# RGB, grayscale with alpha and RGBA. Paletted PNGs are always converted.
+PASSTHROUGH_PNG_COLOR_TYPES = {0, 2, 4, 6}
+
+# The `gAMA` chunk value PNG encoders write for sRGB (1/2.2 * 100000)
+SRGB_GAMMA = 45455
+
+
+def is_passthrough_png(path: str) -> bool:
+    """Return whether PNG file can be used without conversion.
+
+    This only reads the PNG chunk headers up to the first image data chunk
+    and checks whether the image is 8 bits per channel, is not paletted and
+    is not tagged with a colorspace other than sRGB. Such files are already
+    what the `iconvert` conversion in `generate_apng` would produce.
+
+    Args:
+        path: Path to the file to probe.
+
+    Returns:
+        bool: True if the file is a PNG that does not need conversion.
+    """
+    try:
+        with open(path, "rb") as f:
+            if f.read(8) != PNG_SIGNATURE:
+                return False
+
+            is_srgb = True
+            while True:
+                header = f.read(8)
+                if len(header) < 8:
+                    # Truncated file, let the conversion deal with it
+                    return False
+                length, chunk_type = struct.unpack(">I4s", header)
+                if chunk_type == b"IHDR":
+                    ihdr = f.read(length)
+                    if len(ihdr) < 13:
+                        return False
+                    bit_depth, color_type = ihdr[8], ihdr[9]
+                    if bit_depth != 8:
+                        return False
+                    if color_type not in PASSTHROUGH_PNG_COLOR_TYPES:
+                        return False
+                    f.seek(4, os.SEEK_CUR)  # CRC
+                    continue
+                elif chunk_type == b"sRGB":
+                    # Explicit sRGB always wins over gamma and ICC profile
+                    return True
+                elif chunk_type == b"iCCP":
+                    # Embedded ICC profile we can't verify to be sRGB
+                    is_srgb = False
+                elif chunk_type == b"gAMA":
+                    data = f.read(4)
+                    if len(data) < 4:
+                        return False
+                    gamma = struct.unpack(">I", data)[0]
+                    if abs(gamma - SRGB_GAMMA) > 1:
+                        is_srgb = False
+                    f.seek(4, os.SEEK_CUR)  # CRC
+                    continue
+                elif chunk_type in {b"IDAT", b"IEND"}:
+                    return is_srgb
+
+                # Skip chunk data and CRC
+                f.seek(length + 4, os.SEEK_CUR)
+    except OSError:
+        return False
+
+
+def get_png_pixel_hash(path: str) -> Optional[str]:
+    """Return hash of the image header and pixel data of a PNG file.
+
+    Only the IHDR and IDAT chunks are hashed, so frames that only differ in
+    metadata hash the same. The file is memory-mapped so the pixel data is
+    hashed without reading it into memory first.
+
+    Returns:
+        Optional[str]: The hash or None if the file is not a valid PNG.
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    try:
+        with open(path, "rb") as f, mmap.mmap(
+            f.fileno(), 0, access=mmap.ACCESS_READ
+        ) as data:
+            if data[:8] != PNG_SIGNATURE:
+                return None
+            view = memoryview(data)
+            try:
+                offset = 8
+                while offset + 8 <= len(data):
+                    length, chunk_type = struct.unpack_from(
+                        ">I4s", data, offset)
+                    start = offset + 8
+                    if chunk_type in {b"IHDR", b"IDAT"}:
+                        hasher.update(view[start:start + length])
+                    elif chunk_type == b"IEND":
+                        break
+                    offset = start + length + 4
+            finally:
+                view.release()
+    except (OSError, ValueError, struct.error):
+        return None
+    return hasher.hexdigest()
+
+
+def collapse_duplicate_frames(
+    paths: "list[str]",
+    duplicates_folder: str
+) -> "list[int]":
+    """Move frames identical to the frame before them out of their folder.
+
+    Use `restore_duplicate_frames` to move them back.
+
+    Args:
+        paths: PNG frames in playback order.
+        duplicates_folder: Folder to move the duplicate frames to. Frames
+            keep their filename, so it must be on the same filesystem and
+            only hold the duplicates of a single folder.
+
+    Returns:
+        list[int]: The number of frames each remaining frame is shown for,
+            in order of the remaining frames.
+    """
+    run_lengths = []
+    previous_hash = None
+    for path in paths:
+        pixel_hash = get_png_pixel_hash(path)
+        if pixel_hash is not None and pixel_hash == previous_hash:
+            os.replace(
+                path, os.path.join(duplicates_folder, os.path.basename(path)))
+            run_lengths[-1] += 1
+            continue
+        previous_hash = pixel_hash
+        run_lengths.append(1)
+    return run_lengths
+
+
+def restore_duplicate_frames(duplicates_folder: str, folder: str):
+    """Move frames from `collapse_duplicate_frames` back to `folder`."""
+    for filename in os.listdir(duplicates_folder):
+        os.replace(
+            os.path.join(duplicates_folder, filename),
+            os.path.join(folder, filename)
+        )
+
+
+def scale_delay(
+    delay_num: int,
+    delay_den: int,
+    factor: float
+) -> "tuple[int, int]":
+    """Return APNG frame delay multiplied by `factor` as 16-bit fraction."""
+    # A zero denominator means 1/100th seconds
+    delay = fractions.Fraction(delay_num, delay_den or 100)
+    delay *= fractions.Fraction(factor)
+    delay = delay.limit_denominator(0xFFFF)
+    return min(delay.numerator, 0xFFFF), delay.denominator
+
+
+def set_apng_frame_delays(path: str, run_lengths: "list[int]") -> bool:
+    """Multiply the delay of each APNG frame by its run length in place.
+
+    The frame control (fcTL) chunks are patched and their CRC updated.
+
+    Returns:
+        bool: False if the frame count does not match `run_lengths`, in
+            which case the file is left untouched.
+    """
+    with open(path, "r+b") as f:
+        if f.read(8) != PNG_SIGNATURE:
+            return False
+
+        # Find the offsets of all fcTL chunks first
+        fctl_offsets = []
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                break
+            length, chunk_type = struct.unpack(">I4s", header)
+            if chunk_type == b"fcTL":
+                fctl_offsets.append(f.tell())
+            elif chunk_type == b"IEND":
+                break
+            f.seek(length + 4, os.SEEK_CUR)
+
+        if len(fctl_offsets) != len(run_lengths):
+            return False
+
+        for offset, run_length in zip(fctl_offsets, run_lengths):
+            if run_length == 1:
+                continue
+            f.seek(offset)
+            chunk = bytearray(f.read(26))
+            delay_num, delay_den = struct.unpack_from(">HH", chunk, 20)
+            struct.pack_into(
+                ">HH", chunk, 20,
+                *scale_delay(delay_num, delay_den, run_length)
+            )
+            f.seek(offset)
+            f.write(chunk)
+            f.write(struct.pack(">I", zlib.crc32(b"fcTL" + chunk)))
+    return True
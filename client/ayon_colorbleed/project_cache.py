@@ -0,0 +1,122 @@
+"""Short-lived cache of project data shared by the plugins of the addon.
+
+Plugins like `SetVersionStatus` read project data each time the publisher
+resets and the CLI actions resolve anatomy roots and settings on every
+request the daemon handles. The project rarely changes within a session, so
+the project entity, its anatomy and its settings are kept for `DEFAULT_TTL`
+seconds per project.
+
+Call `invalidate_project_cache` when the cached data is known to be stale.
+"""
+import copy
+import time
+import threading
+from typing import Any, Callable, Iterable, Optional
+
+import ayon_api
+
+# Seconds cached project data is considered valid
+DEFAULT_TTL = 300.0
+
+# Project name, kind of data and its variant to expiry time and the data
+_CACHE: "dict[tuple[str, str, Any], tuple[float, Any]]" = {}
+_LOCK = threading.Lock()
+
+
+def _get_cached(
+    key: "tuple[str, str, Any]",
+    getter: Callable[[], Any],
+    ttl: float
+) -> Any:
+    now = time.monotonic()
+    with _LOCK:
+        cached = _CACHE.get(key)
+    if cached and cached[0] > now:
+        return cached[1]
+
+    value = getter()
+    if value is not None:
+        with _LOCK:
+            _CACHE[key] = (now + ttl, value)
+    return value
+
+
+def get_project_entity(
+    project_name: str,
+    fields: Optional[Iterable[str]] = None,
+    ttl: float = DEFAULT_TTL
+) -> Optional[dict]:
+    """Return project entity, from cache if queried within `ttl` seconds.
+
+    A copy is returned so callers can't change the cached entity.
+
+    Args:
+        project_name: Name of the project.
+        fields: Fields to query. Defaults to all fields.
+        ttl: Seconds the entity is cached for.
+    """
+    if fields is not None:
+        fields = frozenset(fields)
+    project_entity = _get_cached(
+        (project_name, "entity", fields),
+        lambda: ayon_api.get_project(project_name, fields=fields),
+        ttl
+    )
+    return copy.deepcopy(project_entity)
+
+
+def get_project_statuses(
+    project_name: str,
+    ttl: float = DEFAULT_TTL
+) -> "list[dict]":
+    """Return the statuses of the project, only querying that field."""
+    project_entity = get_project_entity(
+        project_name, fields={"statuses"}, ttl=ttl)
+    if not project_entity:
+        return []
+    return project_entity.get("statuses") or []
+
+
+def get_project_settings(
+    project_name: str,
+    ttl: float = DEFAULT_TTL
+) -> dict:
+    """Return a copy of the project settings, cached for `ttl` seconds."""
+    from ayon_core.settings import get_project_settings as _get_settings
+
+    project_settings = _get_cached(
+        (project_name, "settings", None),
+        lambda: _get_settings(project_name),
+        ttl
+    )
+    return copy.deepcopy(project_settings)
+
+
+def get_anatomy(project_name: str, ttl: float = DEFAULT_TTL):
+    """Return anatomy of the project, cached for `ttl` seconds.
+
+    The anatomy is created from the cached project entity. It is shared by
+    all callers, so treat it as read-only.
+
+    Returns:
+        ayon_core.pipeline.Anatomy: The project anatomy.
+    """
+    from ayon_core.pipeline import Anatomy
+
+    def create_anatomy():
+        return Anatomy(
+            project_name,
+            project_entity=get_project_entity(project_name, ttl=ttl)
+        )
+
+    return _get_cached((project_name, "anatomy", None), create_anatomy, ttl)
+
+
+def invalidate_project_cache(project_name: Optional[str] = None):
+    """Remove cached data of a project, or of all projects if None."""
+    with _LOCK:
+        if project_name is None:
+            _CACHE.clear()
+            return
+        for key in [key for key in _CACHE if key[0] == project_name]:
+            _CACHE.pop(key)
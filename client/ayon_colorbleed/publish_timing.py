@@ -0,0 +1,131 @@
+"""Record how long the publish plugins of the addon take.
+
+Decorate the `process` method of a publish plugin with `timed` to record its
+wall time and number of server requests per instance (or per context for
+context plugins). Records are stored in `context.data["colorbleedTimings"]`
+and reported by the `ReportPublishTimings` plugin at the end of publishing.
+"""
+import time
+import inspect
+import functools
+import threading
+import contextlib
+from typing import Optional
+
+import ayon_api
+
+# Key in context data the timing records are stored under
+TIMINGS_KEY = "colorbleedTimings"
+
+
+@contextlib.contextmanager
+def count_server_calls():
+    """Count requests to the server made within the context.
+
+    The connection is shared by the process, so only requests made by the
+    thread that entered the context are counted. Contexts can be nested.
+
+    Yields:
+        list[int]: Single item list with the number of requests so far.
+    """
+    counter = [0]
+    try:
+        con = ayon_api.get_server_api_connection()
+    except Exception:
+        con = None
+    method = getattr(con, "_do_rest_request", None)
+    if method is None:
+        yield counter
+        return
+
+    thread_id = threading.get_ident()
+
+    @functools.wraps(method)
+    def counted(*args, **kwargs):
+        if threading.get_ident() == thread_id:
+            counter[0] += 1
+        return method(*args, **kwargs)
+
+    # Restore the previous attribute, which is the wrapper of the outer
+    # context when nested
+    had_attribute = "_do_rest_request" in vars(con)
+    con._do_rest_request = counted
+    try:
+        yield counter
+    finally:
+        if had_attribute:
+            con._do_rest_request = method
+        else:
+            del con._do_rest_request
+
+
+def add_timing(
+    context,
+    plugin: str,
+    instance: Optional[str],
+    duration: float,
+    server_calls: int
+):
+    """Add timing record to the publish context."""
+    context.data.setdefault(TIMINGS_KEY, []).append({
+        "plugin": plugin,
+        "instance": instance,
+        "duration": duration,
+        "server_calls": server_calls,
+    })
+
+
+def timed(process):
+    """Decorate `process` of a publish plugin to record its timing.
+
+    Pyblish passes the instance or context based on the argument name of
+    `process`, so the wrapper keeps the name of the decorated method.
+    """
+    arg_name = inspect.getfullargspec(process).args[1]
+
+    def run(plugin, obj):
+        context = getattr(obj, "context", obj)
+        instance = obj.data.get("name") if obj is not context else None
+        with count_server_calls() as counter:
+            start = time.perf_counter()
+            try:
+                return process(plugin, obj)
+            finally:
+                add_timing(
+                    context,
+                    plugin.__class__.__name__,
+                    instance,
+                    time.perf_counter() - start,
+                    counter[0]
+                )
+
+    if arg_name == "instance":
+        def wrapper(self, instance):
+            return run(self, instance)
+    elif arg_name == "context":
+        def wrapper(self, context):
+            return run(self, context)
+    else:
+        raise TypeError(
+            f"Can't time process with argument '{arg_name}', expected "
+            "'instance' or 'context'."
+        )
+    return functools.update_wrapper(wrapper, process)
+
+
+def summarize_timings(timings: "list[dict]") -> "list[dict]":
+    """Return total duration and server calls per plugin, slowest first."""
+    by_plugin = {}
+    for timing in timings:
+        summary = by_plugin.setdefault(timing["plugin"], {
+            "plugin": timing["plugin"],
+            "duration": 0.0,
+            "server_calls": 0,
+            "count": 0,
+        })
+        summary["duration"] += timing["duration"]
+        summary["server_calls"] += timing["server_calls"]
+        summary["count"] += 1
+    return sorted(
+        by_plugin.values(), key=lambda item: item["duration"], reverse=True
+    )
@@ -0,0 +1,117 @@
+"""Resolve entities to the published files of their representations.
+
+Used by the CLI actions of the addon which receive a selection of entity
+ids from the web frontend. Each entity type is resolved with a single query
+that only requests the fields needed to resolve paths, and the anatomy to
+resolve roots with comes from the shared `project_cache`.
+"""
+from typing import Iterator
+
+import ayon_api
+
+from .project_cache import get_anatomy
+
+# Entity types that can be resolved to representations
+SUPPORTED_ENTITY_TYPES = {"folder", "product", "version", "representation"}
+
+# Fields of representations needed to resolve and rank their paths
+REPRESENTATION_FIELDS = {
+    "id",
+    "name",
+    "versionId",
+    "attrib.path",
+    "files",
+    "context",
+}
+
+
+def _get_last_version_ids(
+    project_name: str,
+    product_ids: "set[str]"
+) -> "set[str]":
+    if not product_ids:
+        return set()
+    last_versions = ayon_api.get_last_versions(
+        project_name, product_ids, fields={"id"}
+    )
+    return {
+        version_entity["id"]
+        for version_entity in last_versions.values()
+        if version_entity
+    }
+
+
+def iter_representations(
+    project_name: str,
+    entity_ids_by_type: "dict[str, list[str]]"
+) -> Iterator[dict]:
+    """Yield representation entities of entities of any supported type.
+
+    Folders resolve to the last versions of all their products and products
+    resolve to their last version.
+
+    Args:
+        project_name: Project the entities are in.
+        entity_ids_by_type: Entity ids per entity type, one of
+            `SUPPORTED_ENTITY_TYPES`.
+
+    Yields:
+        dict: Representation entities with `REPRESENTATION_FIELDS`.
+    """
+    unsupported = set(entity_ids_by_type) - SUPPORTED_ENTITY_TYPES
+    if unsupported:
+        raise ValueError(
+            f"Unsupported entity types: {', '.join(sorted(unsupported))}")
+
+    product_ids = set(entity_ids_by_type.get("product", []))
+    folder_ids = set(entity_ids_by_type.get("folder", []))
+    if folder_ids:
+        product_ids.update(
+            product_entity["id"]
+            for product_entity in ayon_api.get_products(
+                project_name, folder_ids=folder_ids, fields={"id"}
+            )
+        )
+
+    version_ids = set(entity_ids_by_type.get("version", []))
+    version_ids |= _get_last_version_ids(project_name, product_ids)
+
+    representation_ids = set(entity_ids_by_type.get("representation", []))
+    seen = set()
+    if version_ids:
+        for repre_entity in ayon_api.get_representations(
+            project_name,
+            version_ids=version_ids,
+            fields=REPRESENTATION_FIELDS
+        ):
+            seen.add(repre_entity["id"])
+            yield repre_entity
+
+    representation_ids -= seen
+    if representation_ids:
+        yield from ayon_api.get_representations(
+            project_name,
+            representation_ids=representation_ids,
+            fields=REPRESENTATION_FIELDS
+        )
+
+
+def iter_representation_paths(
+    project_name: str,
+    entity_ids_by_type: "dict[str, list[str]]"
+) -> "Iterator[tuple[str, dict]]":
+    """Yield resolved path and representation entity of entities.
+
+    See `iter_representations` for the supported entities.
+
+    Yields:
+        tuple[str, dict]: Path and representation entity.
+    """
+    anatomy = get_anatomy(project_name)
+    for repre_entity in iter_representations(
+        project_name, entity_ids_by_type
+    ):
+        path = repre_entity["attrib"].get("path")
+        if not path:
+            continue
+        yield anatomy.fill_root(path), repre_entity
@@ -0,0 +1,157 @@
+"""Discover the frame sequence of a published representation.
+
+The frames are taken from the `files` of the representation entity where
+possible, so that no directory listing is needed. Only when that fails the
+publish folder is scanned, and the listing is cached per folder for as long
+as the folder's modification time does not change.
+"""
+import os
+import re
+import collections
+from typing import Optional
+
+import clique
+
+# Maximum number of folder listings kept in `_FOLDER_INDEX`
+FOLDER_INDEX_SIZE = 64
+
+# Folder path to its modification time and file names
+_FOLDER_INDEX: "collections.OrderedDict[str, tuple[int, list[str]]]" = (
+    collections.OrderedDict()
+)
+
+_NUMBER_REGEX = re.compile(r"\d+")
+
+
+def get_frame_pattern(
+    filename: str,
+    frame: "Optional[str | int]" = None
+) -> "tuple[re.Pattern, int]":
+    """Return compiled pattern matching frames of the sequence of `filename`.
+
+    Args:
+        filename: Filename of a frame of the sequence.
+        frame: Frame number of `filename`, e.g. from the representation
+            context. Defaults to the last number in the filename.
+
+    Returns:
+        tuple[re.Pattern, int]: Pattern with `head`, `frame` and `tail`
+            groups and the frame padding.
+
+    Raises:
+        ValueError: If `filename` has no frame number.
+    """
+    numbers = list(_NUMBER_REGEX.finditer(filename))
+    if frame is not None and str(frame).isdigit():
+        # Prefer the last number matching the frame, it may be padded
+        numbers = [
+            number for number in numbers
+            if int(number.group()) == int(frame)
+        ] or numbers
+    if not numbers:
+        raise ValueError(f"No frame number found in: {filename}")
+
+    match = numbers[-1]
+    head = filename[:match.start()]
+    tail = filename[match.end():]
+    frame = match.group()
+
+    pattern = re.compile(
+        f"^(?P<head>{re.escape(head)})"
+        r"(?P<frame>\d+)"
+        f"(?P<tail>{re.escape(tail)})$"
+    )
+    return pattern, len(frame)
+
+
+def collection_from_filenames(
+    folder: str,
+    filenames: "list[str]",
+    pattern: re.Pattern,
+    padding: int
+) -> Optional[clique.Collection]:
+    """Return collection of the filenames in `folder` matching `pattern`.
+
+    Frames are only included if they match the padding, like
+    `clique.assemble` with `assume_padded_when_ambiguous=True` does.
+    """
+    head = tail = None
+    indexes = set()
+    for filename in filenames:
+        match = pattern.match(filename)
+        if not match:
+            continue
+        frame = match.group("frame")
+        if len(frame) != padding and (
+            len(frame) < padding or frame.startswith("0")
+        ):
+            continue
+        head, tail = match.group("head"), match.group("tail")
+        indexes.add(int(frame))
+
+    if not indexes:
+        return None
+    return clique.Collection(
+        head=os.path.join(folder, head),
+        tail=tail,
+        padding=padding,
+        indexes=indexes
+    )
+
+
+def list_folder(folder: str) -> "list[str]":
+    """Return names of entries in `folder`, cached by folder mtime."""
+    mtime = os.stat(folder).st_mtime_ns
+    cached = _FOLDER_INDEX.get(folder)
+    if cached and cached[0] == mtime:
+        _FOLDER_INDEX.move_to_end(folder)
+        return cached[1]
+
+    with os.scandir(folder) as entries:
+        names = [entry.name for entry in entries]
+    _FOLDER_INDEX[folder] = (mtime, names)
+    while len(_FOLDER_INDEX) > FOLDER_INDEX_SIZE:
+        _FOLDER_INDEX.popitem(last=False)
+    return names
+
+
+def clear_folder_index():
+    """Clear cached folder listings."""
+    _FOLDER_INDEX.clear()
+
+
+def get_representation_sequence(
+    repre_entity: dict,
+    path: str
+) -> clique.Collection:
+    """Return the frame sequence of a representation.
+
+    Args:
+        repre_entity: Representation entity, optionally with `files` and
+            `context` data.
+        path: Resolved path to a frame of the representation.
+
+    Raises:
+        ValueError: If no sequence is found for `path`.
+    """
+    folder = os.path.dirname(path)
+    filename = os.path.basename(path)
+    frame = (repre_entity.get("context") or {}).get("frame")
+    pattern, padding = get_frame_pattern(filename, frame)
+
+    # Prefer the files stored on the representation
+    filenames = [
+        os.path.basename(file_info["path"])
+        for file_info in repre_entity.get("files") or []
+        if file_info.get("path")
+    ]
+    collection = collection_from_filenames(
+        folder, filenames, pattern, padding)
+    if collection is not None:
+        return collection
+
+    collection = collection_from_filenames(
+        folder, list_folder(folder), pattern, padding)
+    if collection is None:
+        raise ValueError(f"No sequence collection found for {path}")
+    return collection
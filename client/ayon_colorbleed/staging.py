@@ -0,0 +1,334 @@
+"""Stage frames in scratch directories and deliver the generated files.
+
+Frames that need no conversion are linked into the staging folders, the
+scratch directory is chosen by the estimated space the converted frames
+take, and generated files are moved to their output location atomically.
+"""
+import os
+import uuid
+import shutil
+import struct
+import logging
+import tempfile
+import contextlib
+import time
+from typing import Optional, TYPE_CHECKING
+
+import clique
+
+from .png import PNG_SIGNATURE, is_passthrough_png
+
+if TYPE_CHECKING:
+    from .frame_cache import FrameCache
+
+log = logging.getLogger(__name__)
+
+# Magic number at the start of OpenEXR files
+EXR_MAGIC = b"\x76\x2f\x31\x01"
+
+# Bytes per pixel of the 8-bit RGBA PNG frames staged for APNGC and the
+# typical size of the compressed PNG files relative to that. Rendered frames
+# usually compress to well under half of their raw size.
+STAGED_BYTES_PER_PIXEL = 4
+STAGED_PNG_COMPRESSION_RATIO = 0.5
+
+# Linux ioctl to share the data blocks of a file with another file on
+# filesystems supporting copy-on-write, e.g. Btrfs and XFS
+FICLONE = 0x40049409
+
+
+def _read_null_terminated(f, max_length: int = 256) -> bytes:
+    data = bytearray()
+    while len(data) < max_length:
+        char = f.read(1)
+        if not char or char == b"\0":
+            break
+        data += char
+    return bytes(data)
+
+
+def _read_exr_resolution(f) -> "Optional[tuple[int, int]]":
+    # Attributes are stored as `name\0type\0size value` up to an empty name
+    while True:
+        name = _read_null_terminated(f)
+        if not name:
+            return None
+        attr_type = _read_null_terminated(f)
+        size = struct.unpack("<i", f.read(4))[0]
+        if name == b"dataWindow" and attr_type == b"box2i":
+            x_min, y_min, x_max, y_max = struct.unpack("<4i", f.read(16))
+            return x_max - x_min + 1, y_max - y_min + 1
+        f.seek(size, os.SEEK_CUR)
+
+
+def get_image_resolution(path: str) -> "Optional[tuple[int, int]]":
+    """Return width and height from the header of a PNG or OpenEXR file.
+
+    Returns:
+        Optional[tuple[int, int]]: The resolution or None if the file is not
+            a PNG or OpenEXR file or its header could not be read.
+    """
+    try:
+        with open(path, "rb") as f:
+            signature = f.read(8)
+            if signature == PNG_SIGNATURE:
+                # IHDR is always the first chunk
+                chunk = f.read(16)
+                if chunk[4:8] != b"IHDR":
+                    return None
+                return struct.unpack(">II", chunk[8:16])
+            elif signature[:4] == EXR_MAGIC:
+                return _read_exr_resolution(f)
+    except (OSError, struct.error):
+        pass
+    return None
+
+
+def estimate_staging_bytes(
+    frames_per_sequence: "list[list[str]]"
+) -> int:
+    """Return estimated disk space needed to convert frames to PNG.
+
+    Only pass the frames that are converted, frames that are linked into
+    the staging folders take no space. The resolution is read from the
+    first frame of each sequence. For formats other than PNG and OpenEXR
+    the size of the first source frame is used per frame instead.
+    """
+    total = 0
+    for frames in frames_per_sequence:
+        if not frames:
+            continue
+        resolution = get_image_resolution(frames[0])
+        if resolution:
+            width, height = resolution
+            frame_bytes = int(
+                width * height * STAGED_BYTES_PER_PIXEL
+                * STAGED_PNG_COMPRESSION_RATIO
+            )
+        else:
+            try:
+                frame_bytes = os.path.getsize(frames[0])
+            except OSError:
+                frame_bytes = 0
+        total += frame_bytes * len(frames)
+    return total
+
+
+def select_scratch_directory(
+    required_bytes: int,
+    scratch_directory: Optional[str] = None
+) -> str:
+    """Return directory to stage frames in, preferably with enough space.
+
+    The `scratch_directory` is preferred, falling back to the system temp
+    directory if it has too little free space or is not available. The
+    space check is only advisory, as `required_bytes` is an estimate: when
+    no directory has enough space a warning is logged and the directory
+    with the most free space is returned.
+    """
+    candidates = [tempfile.gettempdir()]
+    if scratch_directory:
+        candidates.insert(0, scratch_directory)
+
+    free_per_directory = {}
+    for directory in candidates:
+        try:
+            os.makedirs(directory, exist_ok=True)
+            free = shutil.disk_usage(directory).free
+        except OSError as exc:
+            log.warning(f"Scratch directory {directory} is unusable: {exc}")
+            continue
+        if free >= required_bytes:
+            return directory
+        free_per_directory[directory] = free
+        log.warning(
+            f"Scratch directory {directory} has {free / 1024 ** 3:.1f} GB "
+            f"free, an estimated {required_bytes / 1024 ** 3:.1f} GB "
+            f"is needed."
+        )
+
+    if not free_per_directory:
+        return tempfile.gettempdir()
+    directory = max(free_per_directory, key=free_per_directory.get)
+    log.warning(
+        f"No scratch directory has enough free space, using {directory}. "
+        f"Converting may fail when the disk runs full."
+    )
+    return directory
+
+
+def get_png_frame_name(input_path: str) -> str:
+    """Return filename of the PNG frame staged for APNGC for `input_path`."""
+    return os.path.splitext(os.path.basename(input_path))[0] + ".png"
+
+
+def get_staged_frames(
+    input_sequence: clique.Collection,
+    frame_cache: "Optional[FrameCache]" = None
+) -> "tuple[dict[str, str], list[str]]":
+    """Return frames that need no conversion and frames to convert.
+
+    Frames that already are 8-bit sRGB PNGs and frames that were converted
+    before and are in `frame_cache` need no conversion.
+
+    Returns:
+        tuple[dict[str, str], list[str]]: The file to link into the staging
+            folder per input frame and the frames that need to be converted.
+    """
+    # Enforce padding on sequence if not set to be length of first frame
+    # This fixes some cases if `clique.assemble` was not called with
+    # `assume_padded_when_ambiguous=True`
+    if not input_sequence.padding:
+        input_sequence.padding = len(str(list(input_sequence.indexes)[0]))
+
+    staged = {}
+    to_convert = []
+    for input_path in input_sequence:
+        if (
+            input_path.lower().endswith(".png")
+            and is_passthrough_png(input_path)
+        ):
+            staged[input_path] = input_path
+        else:
+            to_convert.append(input_path)
+
+    if staged:
+        print(f"Linking {len(staged)} PNG frames that need no conversion")
+
+    if frame_cache:
+        uncached = []
+        for input_path in to_convert:
+            cached_path = frame_cache.get(input_path)
+            if cached_path:
+                staged[input_path] = cached_path
+            else:
+                uncached.append(input_path)
+        cached = len(to_convert) - len(uncached)
+        if cached:
+            print(f"Reusing {cached} PNG frames from frame cache")
+        to_convert = uncached
+
+    return staged, to_convert
+
+
+def link_staged_frames(staged: "dict[str, str]", png_folder: str):
+    """Link frames from `get_staged_frames` into `png_folder`."""
+    for input_path, source_path in staged.items():
+        output_path = os.path.join(png_folder, get_png_frame_name(input_path))
+        link_file(source_path, output_path)
+
+
+def link_file(src: str, dst: str, symlink: bool = True):
+    """Link `src` to `dst` without copying data where possible.
+
+    Tries a hardlink first, then a symlink and falls back to copying the
+    file if neither is supported, e.g. across filesystems on Windows.
+
+    Args:
+        src: Source file path.
+        dst: Destination file path.
+        symlink: Whether a symlink is allowed. Disable this when `src` may
+            be removed before `dst` is.
+    """
+    try:
+        os.link(src, dst)
+        return
+    except OSError:
+        pass
+
+    if symlink:
+        try:
+            os.symlink(src, dst)
+            return
+        except (OSError, NotImplementedError):
+            pass
+
+    shutil.copyfile(src, dst)
+
+
+def _clone_file(src_fd: int, dst_fd: int) -> bool:
+    """Share data of `src_fd` with `dst_fd` using a reflink, if possible."""
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    try:
+        fcntl.ioctl(dst_fd, FICLONE, src_fd)
+    except OSError:
+        return False
+    return True
+
+
+def _copy_file_range(src_fd: int, dst_fd: int, size: int) -> bool:
+    """Copy data in the kernel with `os.copy_file_range`, if possible."""
+    if not hasattr(os, "copy_file_range"):
+        return False
+    copied = 0
+    try:
+        while copied < size:
+            count = os.copy_file_range(src_fd, dst_fd, size - copied)
+            if not count:
+                break
+            copied += count
+    except OSError:
+        copied = -1
+    if copied == size:
+        return True
+
+    # Reset partially copied data for the next copy method
+    os.lseek(src_fd, 0, os.SEEK_SET)
+    os.lseek(dst_fd, 0, os.SEEK_SET)
+    os.ftruncate(dst_fd, 0)
+    return False
+
+
+def deliver_file(src: str, dst: str):
+    """Move `src` to `dst` atomically, copying data only if unavoidable.
+
+    On the same filesystem `src` is renamed to `dst`. Otherwise the data is
+    reflinked, copied with `copy_file_range` or streamed, in that order of
+    preference, to a temporary file next to `dst` which is then renamed to
+    `dst`. So `dst` never exists as a partially written file. `src` is left
+    in place when it is copied.
+    """
+    try:
+        os.replace(src, dst)
+        return
+    except OSError:
+        # Most likely on another filesystem
+        pass
+
+    folder, filename = os.path.split(dst)
+    tmp_path = os.path.join(folder, f".{filename}.{uuid.uuid4().hex}.tmp")
+    try:
+        with open(src, "rb") as fsrc, open(tmp_path, "wb") as fdst:
+            src_fd, dst_fd = fsrc.fileno(), fdst.fileno()
+            size = os.fstat(src_fd).st_size
+            if not (
+                _clone_file(src_fd, dst_fd)
+                or _copy_file_range(src_fd, dst_fd, size)
+            ):
+                shutil.copyfileobj(fsrc, fdst, 1024 ** 2)
+        os.replace(tmp_path, dst)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        raise
+
+
+def get_output_filepath(filepath: str, output_directory: str) -> str:
+    """Return unique timestamped path for `filepath` in `output_directory`.
+
+    For example `turntable.png` becomes `turntable_20240101-120000.png` and
+    `turntable_20240101-120000_1.png` if that already exists.
+    """
+    head, ext = os.path.splitext(os.path.basename(filepath))
+    timestamp = time.strftime("%Y%m%d-%H%M%S")
+    output_filepath = os.path.join(
+        output_directory, f"{head}_{timestamp}{ext}")
+    index = 0
+    while os.path.exists(output_filepath):
+        index += 1
+        output_filepath = os.path.join(
+            output_directory, f"{head}_{timestamp}_{index}{ext}")
+    return output_filepath
@@ -35,7 +35,7 @@ class ColorbleedAddon(BaseServerAddon):
                 },
                 entity_type="version",
                 entity_subtypes=None,
-                allow_multiselection=False,
+                allow_multiselection=True,
             ),
             SimpleActionManifest(
                 identifier="colorbleed.show_in_explorer",
@@ -49,7 +49,7 @@ class ColorbleedAddon(BaseServerAddon):
                 },
                 entity_type="version",
                 entity_subtypes=None,
-                allow_multiselection=False,
+                allow_multiselection=True,
             )
         ]
 
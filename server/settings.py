@@ -1,14 +1,223 @@
 from ayon_server.settings import BaseSettingsModel, SettingsField
 
 
+def conversion_backend_enum():
+    return [
+        {"value": "iconvert", "label": "iconvert (process per frame)"},
+        {"value": "oiiotool", "label": "oiiotool (process per sequence)"},
+        {"value": "oiio_python", "label": "OpenImageIO Python (worker pool)"},
+    ]
+
+
+def assembler_enum():
+    return [
+        {"value": "apngc", "label": "APNGC executable"},
+        {"value": "native", "label": "Native (Pillow)"},
+    ]
+
+
+def compression_backend_enum():
+    return [
+        {"value": "tinify", "label": "Tinify (APNGC, online)"},
+        {"value": "local", "label": "Local palette quantization (offline)"},
+        {"value": "none", "label": "None"},
+    ]
+
+
 class APNGCSettingsModel(BaseSettingsModel):
     executable: str = SettingsField("", title="APNGC Executable Path")
     profiles: list[str] = SettingsField(
         default_factory=list,
         title="APNGC Profiles")
-    tinify_api_key: str = SettingsField("", title="Tinify API key")
+    tinify_api_key: str = SettingsField(
+        "",
+        title="Tinify API key",
+        description="Only used by the Tinify compression backend."
+    )
     output_directory: str = SettingsField("",
                                           title="Conversion Output Directory")
+    run_in_background: bool = SettingsField(
+        False,
+        title="Run In Background By Default",
+        description=(
+            "Default of the loader option to convert in a separate process "
+            "so the loader stays responsive."
+        )
+    )
+    assembler: str = SettingsField(
+        "apngc",
+        title="APNG Assembler",
+        enum_resolver=assembler_enum,
+        description=(
+            "Default of the loader option to write the APNG file with. The "
+            "native assembler streams the frames to the APNG file in this "
+            "process and does not need the APNGC executable or Tinify."
+        )
+    )
+    native_fps: float = SettingsField(
+        25.0,
+        title="Native Assembler Frame Rate",
+        gt=0.0,
+        description=(
+            "Frame rate of APNG files written by the native assembler. "
+            "APNGC takes the frame rate from its profile."
+        )
+    )
+    compression_backend: str = SettingsField(
+        "tinify",
+        title="Compression Backend",
+        enum_resolver=compression_backend_enum,
+        description=(
+            "Default of the loader option to compress the frames with. "
+            "Tinify runs through APNGC and needs internet access and an API "
+            "key. Local quantization reduces the colors of the frames on "
+            "this machine and also works offline."
+        )
+    )
+    local_compression_colors: int = SettingsField(
+        256,
+        title="Local Compression Colors",
+        ge=2,
+        le=256,
+        description=(
+            "Number of palette colors of frames without alpha for local "
+            "compression."
+        )
+    )
+    conversion_backend: str = SettingsField(
+        "iconvert",
+        title="PNG Conversion Backend",
+        enum_resolver=conversion_backend_enum,
+        description=(
+            "Backend used to convert frames to PNG before APNGC runs. Falls "
+            "back to 'iconvert' if the backend is not available."
+        )
+    )
+    pool_size: int = SettingsField(
+        0,
+        title="Conversion Pool Size",
+        ge=0,
+        description=(
+            "Maximum number of frames converted concurrently. Zero picks a "
+            "default based on the CPU count and available memory."
+        )
+    )
+    adaptive_pool_size: bool = SettingsField(
+        False,
+        title="Adapt Pool Size",
+        description=(
+            "Adjust the number of concurrent conversions at runtime based "
+            "on per-frame conversion time, backing off when the machine is "
+            "saturated."
+        )
+    )
+    fail_fast: bool = SettingsField(
+        True,
+        title="Stop On First Failed Frame",
+        description=(
+            "Stop converting as soon as a frame fails to convert. When "
+            "disabled all frames are converted and all failed frames are "
+            "reported at the end."
+        )
+    )
+    cache_directory: str = SettingsField(
+        "",
+        title="Frame Cache Directory",
+        description=(
+            "Directory to cache converted PNG frames in so they are reused "
+            "across conversions. Leave empty to disable the cache."
+        )
+    )
+    cache_max_size_gb: float = SettingsField(
+        50.0,
+        title="Frame Cache Max Size (GB)",
+        ge=0.0,
+        description=(
+            "Least recently used frames are removed from the cache when it "
+            "grows beyond this size. Zero means unlimited."
+        )
+    )
+    collapse_duplicate_frames: bool = SettingsField(
+        False,
+        title="Collapse Duplicate Frames",
+        description=(
+            "Pass runs of identical frames, e.g. holds, to APNGC as a single "
+            "frame that is shown for the duration of the run. This reduces "
+            "compression work and the size of the APNG file. If APNGC "
+            "drops or merges frames itself the sequence is converted again "
+            "without collapsing."
+        )
+    )
+    scratch_directory: str = SettingsField(
+        "",
+        title="Scratch Directory",
+        description=(
+            "Fast local directory, e.g. on an NVMe disk or tmpfs, to stage "
+            "the PNG frames in during conversion. Falls back to the system "
+            "temp directory when it has too little free space. Leave empty "
+            "to use the system temp directory."
+        )
+    )
+
+
+class SuffixPriorityModel(BaseSettingsModel):
+    suffix: str = SettingsField("", title="Suffix")
+    priority: int = SettingsField(0, title="Priority")
+
+
+class OpenFileSettingsModel(BaseSettingsModel):
+    """Which file 'Open file' runs for a version with many representations.
+
+    Each file gets the priority of the first suffix it ends with plus the
+    video or image priority. The file with the highest priority is opened.
+    Files that do not exist are always ranked last.
+    """
+    suffix_priorities: list[SuffixPriorityModel] = SettingsField(
+        default_factory=list,
+        title="Suffix Priorities",
+        description="The first matching suffix applies, e.g. '_h264.mp4'."
+    )
+    video_priority: int = SettingsField(1000, title="Video Priority")
+    image_priority: int = SettingsField(500, title="Image Priority")
+    max_open_files: int = SettingsField(
+        10,
+        title="Max Open Files",
+        ge=0,
+        description=(
+            "Maximum number of files opened at once when running the action "
+            "on many versions. Set to 0 for no limit."
+        )
+    )
+    max_open_folders: int = SettingsField(
+        10,
+        title="Max Open Folders",
+        ge=0,
+        description=(
+            "Maximum number of folders shown at once by 'Show in explorer'. "
+            "Set to 0 for no limit."
+        )
+    )
+
+
+class PublishTimingsSettingsModel(BaseSettingsModel):
+    """Timings of the publish plugins of this addon."""
+    enabled: bool = SettingsField(
+        True,
+        title="Report Timings",
+        description=(
+            "Log the wall time and server requests per plugin at the end of "
+            "publishing."
+        )
+    )
+    json_directory: str = SettingsField(
+        "",
+        title="JSON Output Directory",
+        description=(
+            "Write the timings of each publish as a JSON file to this "
+            "directory for analysis across publishes. Leave empty to "
+            "disable."
+        )
+    )
 
 
 class ColorbleedSettings(BaseSettingsModel):
@@ -16,6 +225,14 @@ class ColorbleedSettings(BaseSettingsModel):
         default_factory=APNGCSettingsModel,
         title="APNGC"
     )
+    open_file: OpenFileSettingsModel = SettingsField(
+        default_factory=OpenFileSettingsModel,
+        title="Open File Action"
+    )
+    publish_timings: PublishTimingsSettingsModel = SettingsField(
+        default_factory=PublishTimingsSettingsModel,
+        title="Publish Timings"
+    )
 
 
 DEFAULT_VALUES = {
@@ -23,6 +240,34 @@ DEFAULT_VALUES = {
         "executable": "",
         "profiles": [],
         "tinify_api_key": "",
-        "output_directory": ""
+        "output_directory": "",
+        "run_in_background": False,
+        "assembler": "apngc",
+        "native_fps": 25.0,
+        "compression_backend": "tinify",
+        "local_compression_colors": 256,
+        "conversion_backend": "iconvert",
+        "pool_size": 0,
+        "adaptive_pool_size": False,
+        "fail_fast": True,
+        "cache_directory": "",
+        "cache_max_size_gb": 50.0,
+        "collapse_duplicate_frames": False,
+        "scratch_directory": ""
+    },
+    "open_file": {
+        "suffix_priorities": [
+            {"suffix": ".exr", "priority": 1000},
+            {"suffix": "_h264.mp4", "priority": 30},
+            {"suffix": ".mp4", "priority": 20}
+        ],
+        "video_priority": 1000,
+        "image_priority": 500,
+        "max_open_files": 10,
+        "max_open_folders": 10
+    },
+    "publish_timings": {
+        "enabled": True,
+        "json_directory": ""
     }
-}
\ No newline at end of file
+}
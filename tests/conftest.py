@@ -0,0 +1,57 @@
+import os
+import sys
+import importlib.util
+
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+CLIENT_DIR = os.path.join(os.path.dirname(TESTS_DIR), "client")
+ADDON_DIR = os.path.join(CLIENT_DIR, "ayon_colorbleed")
+STUBS_DIR = os.path.join(TESTS_DIR, "stubs")
+
+sys.path.insert(0, CLIENT_DIR)
+# Stubs of the AYON launcher modules, only used when they are not installed
+sys.path.append(STUBS_DIR)
+
+
+# Tests asserting wall-clock timings are flaky on loaded machines, so they
+# only run when this environment variable is set
+BENCHMARKS_ENV = "AYON_COLORBLEED_BENCHMARKS"
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        f"benchmark: asserts timings, only runs when {BENCHMARKS_ENV} is set"
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    if os.environ.get(BENCHMARKS_ENV):
+        return
+    skip = pytest.mark.skip(reason=f"set {BENCHMARKS_ENV}=1 to run")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
+
+
+def load_plugin(relative_path):
+    """Import plugin file of the addon, e.g. 'publish/set_status.py'."""
+    path = os.path.join(ADDON_DIR, "plugins", relative_path)
+    name = "colorbleed_plugin_" + os.path.splitext(
+        relative_path.replace("/", "_"))[0]
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def qapp():
+    """Return QApplication, rendering offscreen."""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    QtWidgets = pytest.importorskip("qtpy.QtWidgets")
+    app = QtWidgets.QApplication.instance()
+    if app is None:
+        app = QtWidgets.QApplication([])
+    return app
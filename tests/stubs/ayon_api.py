@@ -0,0 +1,16 @@
+"""Server API functions the addon uses. Tests patch the ones they need."""
+
+
+def _not_stubbed(name):
+    def func(*args, **kwargs):
+        raise NotImplementedError(f"ayon_api.{name} is not stubbed")
+    func.__name__ = name
+    return func
+
+
+get_server_api_connection = _not_stubbed("get_server_api_connection")
+get_project = _not_stubbed("get_project")
+get_products = _not_stubbed("get_products")
+get_product_by_name = _not_stubbed("get_product_by_name")
+get_last_versions = _not_stubbed("get_last_versions")
+get_representations = _not_stubbed("get_representations")
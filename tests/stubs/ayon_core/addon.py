@@ -0,0 +1,24 @@
+import logging
+
+
+class AYONAddon:
+    name = None
+
+    def __init__(self, *args, **kwargs):
+        self.log = logging.getLogger(self.__class__.__name__)
+
+
+class IPluginPaths:
+    pass
+
+
+class _ClickWrapper:
+    def __getattr__(self, name):
+        raise NotImplementedError(f"click_wrap.{name} is not stubbed")
+
+
+click_wrap = _ClickWrapper()
+
+
+def ensure_addons_are_process_ready(*args, **kwargs):
+    pass
@@ -0,0 +1,48 @@
+import logging
+
+
+class ToolNotFoundError(Exception):
+    pass
+
+
+class Logger:
+    @staticmethod
+    def get_logger(name=None):
+        return logging.getLogger(name)
+
+
+class AbstractAttrDef:
+    def __init__(self, key, default=None, **kwargs):
+        self.key = key
+        self.default = default
+        self.kwargs = kwargs
+
+
+class TextDef(AbstractAttrDef):
+    pass
+
+
+class EnumDef(AbstractAttrDef):
+    def __init__(self, key, items=None, default=None, **kwargs):
+        super().__init__(key, default=default, **kwargs)
+        self.items = items
+
+
+class BoolDef(AbstractAttrDef):
+    pass
+
+
+def get_oiio_tool_args(tool_name, *extra_args):
+    return [tool_name, *extra_args]
+
+
+def is_running_from_build():
+    return False
+
+
+def get_ayon_launcher_args(*args):
+    return list(args)
+
+
+def run_detached_process(args, **kwargs):
+    raise NotImplementedError("run_detached_process is not stubbed")
@@ -0,0 +1,2 @@
+VIDEO_EXTENSIONS = {".mov", ".mp4", ".mxf", ".avi", ".mkv"}
+IMAGE_EXTENSIONS = {".exr", ".png", ".jpg", ".jpeg", ".tif", ".tiff"}
@@ -0,0 +1,16 @@
+from . import load
+
+
+def get_current_project_name():
+    return None
+
+
+def get_representation_path(*args, **kwargs):
+    raise NotImplementedError("get_representation_path is not stubbed")
+
+
+__all__ = (
+    "load",
+    "get_current_project_name",
+    "get_representation_path",
+)
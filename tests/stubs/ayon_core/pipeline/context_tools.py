@@ -0,0 +1 @@
+from ayon_core.settings import get_project_settings  # noqa: F401
@@ -0,0 +1,13 @@
+import logging
+
+
+class LoaderPlugin:
+    def __init__(self, *args, **kwargs):
+        self.log = logging.getLogger(self.__class__.__name__)
+
+    @classmethod
+    def is_compatible_loader(cls, context):
+        return True
+
+    def filepath_from_context(self, context):
+        return context["representation"]["attrib"]["path"]
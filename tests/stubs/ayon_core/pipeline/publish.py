@@ -0,0 +1,4 @@
+class AYONPyblishPluginMixin:
+    @classmethod
+    def get_attr_values_from_data(cls, data):
+        return data.get("publish_attributes", {}).get(cls.__name__, {})
@@ -0,0 +1,6 @@
+def get_studio_settings(*args, **kwargs):
+    return {}
+
+
+def get_project_settings(project_name, *args, **kwargs):
+    return {}
@@ -0,0 +1,41 @@
+import logging
+
+CollectorOrder = 0
+ValidatorOrder = 1
+ExtractorOrder = 2
+IntegratorOrder = 3
+
+
+class _Data:
+    def __init__(self, data=None):
+        self.data = dict(data or {})
+
+
+class Context(_Data, list):
+    def __init__(self, data=None):
+        list.__init__(self)
+        _Data.__init__(self, data)
+
+
+class Instance(_Data):
+    def __init__(self, context, data=None):
+        super().__init__(data)
+        self.context = context
+        context.append(self)
+
+
+class Plugin:
+    order = 0
+    label = None
+    enabled = True
+
+    def __init__(self):
+        self.log = logging.getLogger(self.__class__.__name__)
+
+
+class ContextPlugin(Plugin):
+    pass
+
+
+class InstancePlugin(Plugin):
+    pass
@@ -0,0 +1,25 @@
+import os
+
+from ayon_colorbleed.actions import get_unique_folders
+
+
+def test_get_unique_folders(tmp_path):
+    shot = tmp_path / "shot"
+    renders = shot / "renders"
+    renders.mkdir(parents=True)
+    for name in ("a.exr", "b.exr"):
+        (shot / name).write_bytes(b"")
+
+    folders = get_unique_folders([
+        str(shot / "a.exr"),
+        str(shot / "b.exr"),
+        # Folder whose parent was already added is still its own folder
+        str(renders),
+        str(renders),
+    ])
+    assert folders == [str(shot), str(renders)]
+
+
+def test_get_unique_folders_keeps_missing_paths(tmp_path):
+    missing = os.path.join(str(tmp_path), "missing")
+    assert get_unique_folders([missing]) == [missing]
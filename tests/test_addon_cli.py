@@ -0,0 +1,32 @@
+import pytest
+
+import ayon_colorbleed
+
+
+@pytest.fixture
+def addon(monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        ayon_colorbleed,
+        "ensure_addons_are_process_ready",
+        lambda **kwargs: calls.append("prepare")
+    )
+    addon = ayon_colorbleed.ColorbleedAddon()
+    monkeypatch.setattr(
+        addon, "run_entities", lambda *args: calls.append("run"))
+    addon.calls = calls
+    return addon
+
+
+def test_daemon_requests_do_not_prepare_addons(addon, monkeypatch):
+    monkeypatch.setattr(addon, "_send_to_daemon", lambda *args, **kw: True)
+    addon._cli_main()
+    addon._cli_run("project", "version", ["id"])
+    assert addon.calls == []
+
+
+def test_fallback_prepares_addons(addon, monkeypatch):
+    monkeypatch.setattr(addon, "_send_to_daemon", lambda *args, **kw: False)
+    addon._cli_main()
+    addon._cli_run("project", "version", ["id"])
+    assert addon.calls == ["prepare", "run"]
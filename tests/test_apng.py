@@ -0,0 +1,164 @@
+import os
+import struct
+import zlib
+
+from ayon_colorbleed import lib, png
+
+
+def pack_chunk(chunk_type, data):
+    return (
+        struct.pack(">I", len(data))
+        + chunk_type
+        + data
+        + struct.pack(">I", zlib.crc32(chunk_type + data))
+    )
+
+
+def read_chunks(path):
+    """Return chunk type, data and whether its CRC is valid per chunk."""
+    with open(path, "rb") as f:
+        data = f.read()
+    assert data[:8] == png.PNG_SIGNATURE
+    chunks = []
+    offset = 8
+    while offset < len(data):
+        length, chunk_type = struct.unpack_from(">I4s", data, offset)
+        chunk_data = data[offset + 8:offset + 8 + length]
+        (crc,) = struct.unpack_from(">I", data, offset + 8 + length)
+        chunks.append((
+            chunk_type, chunk_data, crc == zlib.crc32(chunk_type + chunk_data)
+        ))
+        offset += length + 12
+    return chunks
+
+
+def get_frame_delays(path):
+    return [
+        struct.unpack_from(">HH", data, 20)
+        for chunk_type, data, _ in read_chunks(path)
+        if chunk_type == b"fcTL"
+    ]
+
+
+def write_apng(path, frame_count, delay=(1, 25)):
+    ihdr = struct.pack(">IIBBBBB", 2, 2, 8, 6, 0, 0, 0)
+    chunks = [
+        pack_chunk(b"IHDR", ihdr),
+        pack_chunk(b"acTL", struct.pack(">II", frame_count, 0)),
+    ]
+    sequence_number = 0
+    for index in range(frame_count):
+        fctl = struct.pack(
+            ">IIIIIHHBB", sequence_number, 2, 2, 0, 0, *delay, 0, 0)
+        chunks.append(pack_chunk(b"fcTL", fctl))
+        sequence_number += 1
+        image_data = zlib.compress(bytes([index]) * 18)
+        if index == 0:
+            chunks.append(pack_chunk(b"IDAT", image_data))
+        else:
+            chunks.append(pack_chunk(
+                b"fdAT", struct.pack(">I", sequence_number) + image_data))
+            sequence_number += 1
+    chunks.append(pack_chunk(b"IEND", b""))
+    with open(path, "wb") as f:
+        f.write(png.PNG_SIGNATURE + b"".join(chunks))
+
+
+def write_png(path, pixel_data, text=b""):
+    ihdr = struct.pack(">IIBBBBB", 2, 2, 8, 6, 0, 0, 0)
+    chunks = [pack_chunk(b"IHDR", ihdr)]
+    if text:
+        chunks.append(pack_chunk(b"tEXt", text))
+    chunks.append(pack_chunk(b"IDAT", zlib.compress(pixel_data)))
+    chunks.append(pack_chunk(b"IEND", b""))
+    with open(path, "wb") as f:
+        f.write(png.PNG_SIGNATURE + b"".join(chunks))
+
+
+def test_set_apng_frame_delays(tmp_path):
+    path = str(tmp_path / "animation.png")
+    write_apng(path, 3)
+
+    assert png.set_apng_frame_delays(path, [1, 3, 2])
+    assert get_frame_delays(path) == [(1, 25), (3, 25), (2, 25)]
+    assert all(crc_valid for _, _, crc_valid in read_chunks(path))
+
+
+def test_set_apng_frame_delays_count_mismatch(tmp_path):
+    path = str(tmp_path / "animation.png")
+    write_apng(path, 3)
+    with open(path, "rb") as f:
+        original = f.read()
+
+    assert not png.set_apng_frame_delays(path, [2, 2])
+    with open(path, "rb") as f:
+        assert f.read() == original
+
+
+def test_collapse_and_restore_duplicate_frames(tmp_path):
+    png_folder = tmp_path / "png"
+    duplicates_folder = tmp_path / "duplicates"
+    png_folder.mkdir()
+    duplicates_folder.mkdir()
+    paths = []
+    # Frames that only differ in metadata are duplicates too
+    for frame, (pixels, text) in enumerate((
+        (b"a", b""), (b"a", b"Comment\x00two"), (b"b", b""), (b"a", b"")
+    )):
+        path = str(png_folder / f"render.{frame:04d}.png")
+        write_png(path, pixels * 18, text)
+        paths.append(path)
+
+    run_lengths = png.collapse_duplicate_frames(
+        paths, str(duplicates_folder))
+    assert run_lengths == [2, 1, 1]
+    assert sorted(os.listdir(png_folder)) == [
+        "render.0000.png", "render.0002.png", "render.0003.png"]
+    assert os.listdir(duplicates_folder) == ["render.0001.png"]
+
+    png.restore_duplicate_frames(str(duplicates_folder), str(png_folder))
+    assert sorted(os.listdir(png_folder)) == [
+        os.path.basename(path) for path in paths]
+    assert not os.listdir(duplicates_folder)
+
+
+def test_generate_apngs_reruns_without_collapsing(tmp_path, monkeypatch):
+    import asyncio
+
+    import clique
+
+    from ayon_colorbleed.compression import CompressionBackend
+
+    source_folder = tmp_path / "source"
+    source_folder.mkdir()
+    for frame, pixels in enumerate((b"a", b"a", b"a", b"b"), start=1001):
+        write_png(str(source_folder / f"render.{frame}.png"), pixels * 18)
+    collection = clique.Collection(
+        str(source_folder / "render."), ".png", 4, set(range(1001, 1005)))
+
+    frame_counts = []
+
+    async def run_apngc(png_folder, *args, apng_folder=None, **kwargs):
+        frame_count = len(os.listdir(png_folder))
+        frame_counts.append(frame_count)
+        path = os.path.join(apng_folder, "render.png")
+        # Merge the last two frames like an APNGC optimization could
+        write_apng(path, frame_count if len(frame_counts) > 1 else 1)
+        return path
+
+    monkeypatch.setattr(lib, "run_apngc", run_apngc)
+    output_directory = tmp_path / "output"
+    output_directory.mkdir()
+    outputs = asyncio.run(lib.generate_apngs(
+        [collection],
+        "apngc",
+        "profile.json",
+        output_directory=str(output_directory),
+        scratch_directory=str(tmp_path / "scratch"),
+        collapse_duplicates=True,
+        compression=CompressionBackend(max_workers=1),
+    ))
+
+    # Collapsed to two frames first, all frames after the mismatch
+    assert frame_counts == [2, 4]
+    assert get_frame_delays(outputs[0]) == [(1, 25)] * 4
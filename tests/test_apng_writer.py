@@ -0,0 +1,196 @@
+"""Round trip and benchmark of the native `apng_writer` assembler.
+
+The benchmark only runs when benchmarks are enabled, see
+`conftest.BENCHMARKS_ENV`. Set `APNGC_EXECUTABLE` and
+`APNGC_SETTINGS_PROFILE` to also benchmark APNGC on the same frames,
+otherwise only the native writer is measured. Run with `pytest -s` to see
+the results.
+"""
+import os
+import time
+import random
+import struct
+import asyncio
+import fractions
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from ayon_colorbleed import lib
+from test_apng import read_chunks
+
+Image = pytest.importorskip("PIL.Image")
+ImageDraw = pytest.importorskip("PIL.ImageDraw")
+ImageChops = pytest.importorskip("PIL.ImageChops")
+
+from ayon_colorbleed.apng_writer import (  # noqa: E402
+    APNG_BLEND_OP_OVER,
+    APNG_BLEND_OP_SOURCE,
+    write_apng,
+)
+
+FPS = 25
+# Frame of each source frame, frames 10-19 hold frame 10
+HOLD_START = 10
+HOLD_END = 20
+
+
+def write_frames(folder, count, size=(320, 180)):
+    paths = []
+    for index in range(count):
+        position = HOLD_START if HOLD_START <= index < HOLD_END else index
+        image = Image.new("RGBA", size, (30, 30, 30, 255))
+        draw = ImageDraw.Draw(image)
+        x = position * 8
+        draw.rectangle([x, 40, x + 40, 80], fill=(255, 60, 0, 160))
+        path = os.path.join(folder, f"render.{index + 1001}.png")
+        image.save(path)
+        paths.append(path)
+    return paths
+
+
+def test_write_apng_round_trip(tmp_path):
+    paths = write_frames(str(tmp_path), 30)
+    output = write_apng(
+        paths, str(tmp_path / "animation.png"), fps=FPS, max_workers=2)
+
+    # Cropping to the changed region and merging the hold must pay off
+    frames_size = sum(os.path.getsize(path) for path in paths)
+    assert os.path.getsize(output) < frames_size
+
+    chunks = read_chunks(output)
+    assert all(crc_valid for _, _, crc_valid in chunks)
+    assert [chunk_type for chunk_type, _, _ in chunks[:2]] == [
+        b"IHDR", b"acTL"]
+    assert chunks[-1][0] == b"IEND"
+
+    frame_count, loops = struct.unpack(">II", chunks[1][1])
+    fctls = [data for chunk_type, data, _ in chunks if chunk_type == b"fcTL"]
+    # The hold is written as a single frame
+    assert frame_count == len(fctls) == 30 - (HOLD_END - HOLD_START - 1)
+    assert loops == 0
+
+    # fcTL and fdAT chunks share a single sequence without gaps
+    sequence_numbers = [
+        struct.unpack_from(">I", data)[0]
+        for chunk_type, data, _ in chunks
+        if chunk_type in {b"fcTL", b"fdAT"}
+    ]
+    assert sequence_numbers == list(range(len(sequence_numbers)))
+
+    # Delays in frames of the source sequence
+    delays = [
+        fractions.Fraction(*struct.unpack_from(">HH", data, 20)) * FPS
+        for data in fctls
+    ]
+    expected = [1] * frame_count
+    expected[HOLD_START] = HOLD_END - HOLD_START
+    assert delays == expected
+
+    assert_frames_match(output, paths, delays)
+
+
+def assert_frames_match(output, paths, delays):
+    # Decoded frames match the source frames they are shown for
+    with Image.open(output) as image:
+        assert image.n_frames == len(delays)
+        source_index = 0
+        for frame_index in range(image.n_frames):
+            image.seek(frame_index)
+            with Image.open(paths[source_index]) as source:
+                difference = ImageChops.difference(
+                    image.convert("RGBA"), source.convert("RGBA"))
+            assert not any(band.getbbox() for band in difference.split())
+            source_index += int(delays[frame_index])
+    assert source_index == len(paths)
+
+
+def get_blend_ops(path):
+    return [
+        data[25] for chunk_type, data, _ in read_chunks(path)
+        if chunk_type == b"fcTL"
+    ]
+
+
+def write_corner_frames(folder, count, size=(160, 90)):
+    # Opaque squares moving in opposite corners of a noisy background, so
+    # the changed region covers the whole frame but few pixels change
+    background = Image.frombytes(
+        "RGB", size, random.Random(0).randbytes(size[0] * size[1] * 3)
+    ).convert("RGBA")
+    paths = []
+    for index in range(count):
+        image = background.copy()
+        draw = ImageDraw.Draw(image)
+        x = index * 4
+        draw.rectangle([x, 0, x + 3, 3], fill=(255, 60, 0, 255))
+        draw.rectangle([size[0] - x - 4, size[1] - 4, size[0] - x - 1,
+                        size[1] - 1], fill=(0, 60, 255, 255))
+        path = os.path.join(folder, f"render.{index + 1001}.png")
+        image.save(path)
+        paths.append(path)
+    return paths
+
+
+def test_write_apng_blend_over(tmp_path):
+    paths = write_corner_frames(str(tmp_path), 8)
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        outputs = [
+            write_apng(
+                paths,
+                str(tmp_path / f"animation_{index}.png"),
+                fps=FPS,
+                executor=executor
+            )
+            for index in range(2)
+        ]
+        # The shared executor is left running
+        assert executor.submit(sum, [1, 2]).result() == 3
+
+    for output in outputs:
+        assert get_blend_ops(output) == (
+            [APNG_BLEND_OP_SOURCE] + [APNG_BLEND_OP_OVER] * 7)
+        assert_frames_match(output, paths, [1] * 8)
+
+
+def test_write_apng_no_blend_over_for_translucent_changes(tmp_path):
+    # Blending a translucent rectangle over the previous frame would mix
+    # it with that frame
+    paths = write_frames(str(tmp_path), 12)
+    output = write_apng(paths, str(tmp_path / "animation.png"), fps=FPS,
+                        max_workers=1)
+    assert set(get_blend_ops(output)) == {APNG_BLEND_OP_SOURCE}
+
+
+@pytest.mark.benchmark
+def test_benchmark_native_against_apngc(tmp_path):
+    png_folder = tmp_path / "png"
+    png_folder.mkdir()
+    paths = write_frames(str(png_folder), 60, size=(960, 540))
+    frames_size = sum(os.path.getsize(path) for path in paths)
+
+    start = time.perf_counter()
+    output = write_apng(paths, str(tmp_path / "native.png"), fps=FPS)
+    native_time = time.perf_counter() - start
+    native_size = os.path.getsize(output)
+    print(
+        f"\nnative: {native_time:.2f} s, {native_size / 1024:.0f} KB "
+        f"({frames_size / 1024:.0f} KB of frames)"
+    )
+    assert native_size < frames_size
+
+    executable = os.environ.get("APNGC_EXECUTABLE")
+    profile = os.environ.get("APNGC_SETTINGS_PROFILE")
+    if not executable or not os.path.isfile(executable) or not profile:
+        pytest.skip("APNGC is not available to compare against")
+
+    apng_folder = tmp_path / "apngc"
+    apng_folder.mkdir()
+    start = time.perf_counter()
+    output = asyncio.run(lib.run_apngc(
+        str(png_folder), executable, profile, apng_folder=str(apng_folder)))
+    apngc_time = time.perf_counter() - start
+    print(
+        f"apngc: {apngc_time:.2f} s, "
+        f"{os.path.getsize(output) / 1024:.0f} KB"
+    )
@@ -0,0 +1,62 @@
+import pytest
+
+from ayon_colorbleed.compression import LocalCompression
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def save_frames(folder, images):
+    paths = []
+    for index, image in enumerate(images):
+        path = str(folder / f"render.{index + 1001}.png")
+        image.save(path)
+        paths.append(path)
+    return paths
+
+
+def test_frames_with_transparency_keep_alpha(tmp_path):
+    transparent = Image.new("P", (4, 4), 0)
+    transparent.putpalette([0, 0, 0, 200, 100, 50])
+    transparent.info["transparency"] = 0
+    paths = save_frames(tmp_path, [
+        Image.new("LA", (4, 4), (128, 0)),
+        transparent,
+    ])
+
+    with LocalCompression(max_workers=1) as backend:
+        assert backend.get_palette(paths) is None
+        backend.compress_frames(paths)
+
+    for path in paths:
+        with Image.open(path) as image:
+            assert image.mode == "RGBA"
+            assert image.getextrema()[3] == (0, 0)
+
+
+def test_rgb_frames_are_paletted_from_all_frames(tmp_path):
+    # The first frame only has red, later frames also have blue
+    paths = save_frames(tmp_path, [
+        Image.new("RGB", (8, 8), (255, 0, 0))
+    ] + [
+        Image.new("RGB", (8, 8), (0, 0, 255)) for _ in range(15)
+    ])
+
+    with LocalCompression(colors=4, max_workers=2) as backend:
+        backend.compress_frames(paths)
+
+    for path, color in ((paths[0], (255, 0, 0)), (paths[-1], (0, 0, 255))):
+        with Image.open(path) as image:
+            assert image.mode == "P"
+            assert image.convert("RGB").getpixel((0, 0)) == color
+
+
+def test_sequences_share_worker_processes(tmp_path):
+    paths = save_frames(tmp_path, [Image.new("RGB", (4, 4))] * 2)
+
+    backend = LocalCompression(max_workers=1)
+    with backend:
+        backend.compress_frames(paths[:1])
+        executor = backend.get_executor()
+        backend.compress_frames(paths[1:])
+        assert backend.get_executor() is executor
+    assert backend._executor is None
@@ -0,0 +1,175 @@
+import os
+import json
+import time
+import socket
+import threading
+from multiprocessing.connection import Listener
+
+import pytest
+
+from ayon_colorbleed import daemon
+
+posix_only = pytest.mark.skipif(
+    os.name != "posix", reason="Checks POSIX ownership and permissions")
+
+
+@pytest.fixture
+def state_dir(tmp_path):
+    directory = tmp_path / "state"
+    directory.mkdir(mode=0o700)
+    return directory
+
+
+def wait_for_state(path, timeout=5.0):
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        state = daemon.read_state(path)
+        if state:
+            return state
+        time.sleep(0.01)
+    raise TimeoutError("Daemon did not start")
+
+
+def start_daemon(state_filepath, handlers):
+    action_daemon = daemon.ActionDaemon(
+        handlers, state_filepath=state_filepath)
+    thread = threading.Thread(target=action_daemon.serve, daemon=True)
+    thread.start()
+    wait_for_state(state_filepath)
+    return thread
+
+
+def test_request_round_trip(state_dir):
+    state_filepath = str(state_dir / "daemon.json")
+    calls = []
+
+    def fail(**kwargs):
+        raise ValueError("handler failed")
+
+    thread = start_daemon(state_filepath, {
+        "run": lambda **kwargs: calls.append(kwargs), "fail": fail
+    })
+
+    assert daemon.send_request(
+        "run", state_filepath=state_filepath, entity_ids=["a", "b"])
+    assert calls == [{"entity_ids": ["a", "b"]}]
+
+    with pytest.raises(RuntimeError, match="handler failed"):
+        daemon.send_request("fail", state_filepath=state_filepath)
+
+    assert daemon.send_request(daemon.STOP_COMMAND,
+                               state_filepath=state_filepath)
+    thread.join(5)
+    assert not thread.is_alive()
+    assert not os.path.exists(state_filepath)
+    # Falls back to running in-process without a daemon
+    assert not daemon.send_request("run", state_filepath=state_filepath)
+
+
+@posix_only
+def test_state_file_is_private(state_dir):
+    state_filepath = str(state_dir / "daemon.json")
+    daemon.write_state(state_filepath, {"port": 1})
+    assert os.stat(state_filepath).st_mode & 0o777 == 0o600
+    assert daemon.read_state(state_filepath) == {"port": 1}
+
+
+@posix_only
+def test_ignore_state_file_accessible_by_others(state_dir):
+    state_filepath = str(state_dir / "daemon.json")
+    daemon.write_state(state_filepath, {"port": 1})
+    os.chmod(state_filepath, 0o644)
+    assert daemon.read_state(state_filepath) is None
+
+
+@posix_only
+def test_ignore_symlinked_state_file(state_dir, tmp_path):
+    target = tmp_path / "elsewhere.json"
+    target.write_text(json.dumps({"port": 1}))
+    os.chmod(target, 0o600)
+    state_filepath = state_dir / "daemon.json"
+    os.symlink(target, state_filepath)
+    assert daemon.read_state(str(state_filepath)) is None
+
+
+@posix_only
+def test_refuse_shared_state_directory(tmp_path, monkeypatch):
+    runtime_dir = tmp_path / "runtime"
+    (runtime_dir / "ayon_colorbleed").mkdir(parents=True)
+    os.chmod(runtime_dir / "ayon_colorbleed", 0o777)
+    monkeypatch.setattr(daemon.sys, "platform", "linux")
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(runtime_dir))
+
+    with pytest.raises(daemon.UnsafeStateError):
+        daemon.get_state_filepath()
+    assert daemon.read_state() is None
+
+
+EXECUTED = []
+
+
+def _record_execution(value):
+    EXECUTED.append(value)
+
+
+class Exploit:
+    def __reduce__(self):
+        return _record_execution, ("pwned",)
+
+
+def test_responses_are_not_unpickled(state_dir):
+    """A listener answering with a pickle must not run code in the client."""
+    authkey = b"key"
+    state_filepath = str(state_dir / "daemon.json")
+
+    with Listener(("127.0.0.1", 0), authkey=authkey) as listener:
+        host, port = listener.address
+        daemon.write_state(state_filepath, {
+            "host": host, "port": port, "authkey": authkey.hex()
+        })
+
+        def serve():
+            with listener.accept() as conn:
+                conn.recv_bytes()
+                conn.send(Exploit())
+
+        thread = threading.Thread(target=serve, daemon=True)
+        thread.start()
+        with pytest.raises(RuntimeError):
+            daemon.send_request("run", state_filepath=state_filepath)
+        thread.join(5)
+
+    assert not EXECUTED
+
+
+def test_stalled_client_does_not_block_daemon(state_dir, monkeypatch):
+    monkeypatch.setattr(daemon, "CONNECTION_TIMEOUT", 0.5)
+    state_filepath = str(state_dir / "daemon.json")
+    calls = []
+    thread = start_daemon(
+        state_filepath, {"run": lambda **kwargs: calls.append(kwargs)})
+    state = daemon.read_state(state_filepath)
+
+    # Connects but never answers the auth challenge
+    with socket.create_connection((state["host"], state["port"])):
+        assert daemon.send_request(
+            "run", state_filepath=state_filepath, entity_ids=["a"])
+    assert calls == [{"entity_ids": ["a"]}]
+
+    daemon.send_request(daemon.STOP_COMMAND, state_filepath=state_filepath)
+    thread.join(5)
+
+
+def test_unresponsive_port_is_no_daemon(state_dir, monkeypatch):
+    """A stale state file may point to a port now used by another process."""
+    monkeypatch.setattr(daemon, "CONNECTION_TIMEOUT", 0.5)
+    state_filepath = str(state_dir / "daemon.json")
+    with socket.create_server(("127.0.0.1", 0)) as server:
+        host, port = server.getsockname()[:2]
+        daemon.write_state(state_filepath, {
+            "host": host, "port": port, "authkey": "00"
+        })
+
+        start = time.monotonic()
+        assert not daemon.send_request("run", state_filepath=state_filepath)
+        assert time.monotonic() - start < 5
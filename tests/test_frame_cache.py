@@ -0,0 +1,98 @@
+import os
+
+import pytest
+
+from ayon_colorbleed.frame_cache import FrameCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return FrameCache(str(tmp_path / "cache"), max_bytes=25)
+
+
+def write_frame(path, data):
+    path.write_bytes(data)
+    return str(path)
+
+
+def cache_frame(cache, tmp_path, name, data=b"0123456789"):
+    input_path = write_frame(tmp_path / f"{name}.exr", data)
+    png_path = write_frame(tmp_path / f"{name}.png", data)
+    cache.put(input_path, png_path)
+    return input_path
+
+
+def test_get_returns_cached_frame(cache, tmp_path):
+    input_path = cache_frame(cache, tmp_path, "render.1001", b"png data")
+
+    entry_path = cache.get(input_path)
+    with open(entry_path, "rb") as f:
+        assert f.read() == b"png data"
+    key = cache.get_key(input_path)
+    assert entry_path == os.path.join(cache.root, key[:2], f"{key}.png")
+    # No temporary files are left behind
+    assert os.listdir(os.path.dirname(entry_path)) == [f"{key}.png"]
+
+    assert cache.get(str(tmp_path / "missing.exr")) is None
+
+
+def test_key_changes_with_source_file(cache, tmp_path):
+    input_path = cache_frame(cache, tmp_path, "render.1001")
+    stat = os.stat(input_path)
+    key = cache.get_key(input_path)
+
+    # Modified in place
+    os.utime(
+        input_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert cache.get_key(input_path) != key
+    assert cache.get(input_path) is None
+
+    # Rewritten with another size, but with the original mtime
+    write_frame(tmp_path / "render.1001.exr", b"012345678901")
+    os.utime(input_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert cache.get_key(input_path) != key
+    assert cache.get(input_path) is None
+
+    # The original file is a hit again
+    write_frame(tmp_path / "render.1001.exr", b"0123456789")
+    os.utime(input_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert cache.get_key(input_path) == key
+    assert cache.get(input_path)
+
+    # Other conversion parameters
+    other = FrameCache(cache.root, params="-d uint16")
+    assert other.get_key(input_path) != key
+    assert other.get(input_path) is None
+
+
+def test_evict_removes_least_recently_used(cache, tmp_path):
+    input_paths = [
+        cache_frame(cache, tmp_path, f"render.{frame}")
+        for frame in (1001, 1002, 1003)
+    ]
+    entry_paths = [cache.get(path) for path in input_paths]
+    # Used in order of the frames, long ago
+    for index, entry_path in enumerate(entry_paths):
+        os.utime(entry_path, (1000 + index, 1000 + index))
+
+    # Reading the oldest entry makes it the most recently used
+    cache.get(input_paths[0])
+    cache.evict()
+
+    # 30 bytes fit in 25 bytes after removing the second frame only
+    assert [os.path.exists(path) for path in entry_paths] == [
+        True, False, True]
+    assert cache.get(input_paths[1]) is None
+
+
+def test_evict_without_limit(tmp_path):
+    cache = FrameCache(str(tmp_path / "cache"), max_bytes=0)
+    input_paths = [
+        cache_frame(cache, tmp_path, f"render.{frame}")
+        for frame in (1001, 1002, 1003)
+    ]
+    cache.evict()
+    assert all(cache.get(path) for path in input_paths)
+
+    # Evicting a cache that was never written to
+    FrameCache(str(tmp_path / "empty"), max_bytes=1).evict()
@@ -0,0 +1,104 @@
+"""Importing the addon must stay cheap, every AYON process imports it.
+
+Uses `python -X importtime` in a fresh interpreter. `ayon_core.addon` is
+imported first so only the cost of the addon itself is measured. The time
+budget is only asserted when benchmarks are enabled, see
+`conftest.BENCHMARKS_ENV`.
+"""
+import os
+import sys
+import subprocess
+
+import pytest
+
+from conftest import CLIENT_DIR, STUBS_DIR
+
+# Budget of the cumulative import time of the addon package
+IMPORT_TIME_BUDGET_MS = 30
+
+# Modules that may only be imported when the addon actually does something
+DEFERRED_MODULES = {
+    "ayon_api",
+    "ayon_core.pipeline",
+    "ayon_core.lib.transcoding",
+    "ayon_core.settings",
+    "qtpy",
+    "clique",
+    "PIL",
+    "ayon_colorbleed.lib",
+    "ayon_colorbleed.actions",
+    "ayon_colorbleed.resolve",
+    "ayon_colorbleed.daemon",
+}
+
+RUNS = 3
+
+
+def measure_import():
+    """Return import time of the addon in ms and the modules it imported."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, (
+        CLIENT_DIR, env.get("PYTHONPATH"), STUBS_DIR
+    )))
+    result = subprocess.run(
+        [
+            sys.executable, "-X", "importtime", "-c",
+            "import ayon_core.addon; import ayon_colorbleed"
+        ],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+
+    # Lines are `import time: <self us> | <cumulative us> | <module>`, where
+    # the modules imported by the addon follow `ayon_core.addon`
+    cumulative_us = None
+    modules = []
+    measuring = False
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _self_us, cumulative, name = line.split(":", 1)[1].split("|")
+        if not cumulative.strip().isdigit():
+            # Header
+            continue
+        name = name.strip()
+        if name == "ayon_core.addon":
+            measuring = True
+            continue
+        if not measuring:
+            continue
+        modules.append(name)
+        if name == "ayon_colorbleed":
+            cumulative_us = int(cumulative)
+
+    assert cumulative_us is not None, result.stderr
+    return cumulative_us / 1000, modules
+
+
+def test_addon_import_defers_heavy_modules():
+    _import_time_ms, modules = measure_import()
+    heavy = sorted(
+        name for name in modules
+        if any(
+            name == module or name.startswith(module + ".")
+            for module in DEFERRED_MODULES
+        )
+    )
+    assert not heavy, f"Addon import pulls in deferred modules: {heavy}"
+
+
+@pytest.mark.benchmark
+def test_addon_import_time():
+    timings = []
+    for _ in range(RUNS):
+        import_time_ms, modules = measure_import()
+        timings.append(import_time_ms)
+
+    best = min(timings)
+    print(f"\nAddon import time: {best:.1f} ms, modules: {modules}")
+    assert best < IMPORT_TIME_BUDGET_MS, (
+        f"Addon import took {best:.1f} ms, budget is "
+        f"{IMPORT_TIME_BUDGET_MS} ms"
+    )
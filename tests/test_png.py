@@ -0,0 +1,71 @@
+import struct
+
+import pytest
+
+from ayon_colorbleed.png import PNG_SIGNATURE, SRGB_GAMMA, is_passthrough_png
+from test_apng import pack_chunk
+
+
+def make_png(bit_depth=8, color_type=6, chunks=()):
+    ihdr = struct.pack(">IIBBBBB", 16, 16, bit_depth, color_type, 0, 0, 0)
+    return b"".join((
+        PNG_SIGNATURE,
+        pack_chunk(b"IHDR", ihdr),
+        *(pack_chunk(chunk_type, data) for chunk_type, data in chunks),
+        pack_chunk(b"IDAT", b""),
+        pack_chunk(b"IEND", b""),
+    ))
+
+
+def gama(gamma):
+    return b"gAMA", struct.pack(">I", gamma)
+
+
+ICCP = (b"iCCP", b"ACEScg\x00\x00" + b"\x78\x9c")
+SRGB = (b"sRGB", b"\x00")
+
+
+@pytest.mark.parametrize("data, expected", [
+    (make_png(), True),
+    # Grayscale, RGB and grayscale with alpha
+    (make_png(color_type=0), True),
+    (make_png(color_type=2), True),
+    (make_png(color_type=4), True),
+    (make_png(bit_depth=16), False),
+    (make_png(bit_depth=16, color_type=2), False),
+    # Paletted
+    (make_png(color_type=3), False),
+    # Gamma of sRGB, rounded either way by encoders
+    (make_png(chunks=[gama(SRGB_GAMMA)]), True),
+    (make_png(chunks=[gama(SRGB_GAMMA + 1)]), True),
+    (make_png(chunks=[gama(100000)]), False),
+    (make_png(chunks=[ICCP]), False),
+    # Explicit sRGB wins over gamma and ICC profile
+    (make_png(chunks=[gama(100000), SRGB]), True),
+    (make_png(chunks=[ICCP, SRGB]), True),
+    # Chunks after the image data are ignored
+    (make_png().replace(
+        pack_chunk(b"IEND", b""),
+        pack_chunk(*gama(100000)) + pack_chunk(b"IEND", b"")
+    ), True),
+    (b"not a png file", False),
+])
+def test_is_passthrough_png(tmp_path, data, expected):
+    path = tmp_path / "frame.png"
+    path.write_bytes(data)
+    assert is_passthrough_png(str(path)) is expected
+
+
+@pytest.mark.parametrize("chunks", [[], [gama(SRGB_GAMMA)]])
+def test_truncated_png_is_not_passthrough(tmp_path, chunks):
+    data = make_png(chunks=chunks)
+    image_data_offset = data.index(b"IDAT") - 4
+    path = tmp_path / "frame.png"
+    # Cut off anywhere before the image data
+    for size in range(image_data_offset):
+        path.write_bytes(data[:size])
+        assert not is_passthrough_png(str(path)), size
+
+
+def test_missing_png_is_not_passthrough(tmp_path):
+    assert not is_passthrough_png(str(tmp_path / "missing.png"))
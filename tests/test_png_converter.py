@@ -0,0 +1,55 @@
+import time
+import asyncio
+
+import pytest
+
+from ayon_colorbleed import lib
+
+
+def create_pool_converter(max_workers=2):
+    converter = lib.PNGConverter("iconvert", max_workers=max_workers)
+    # Use the worker processes of the `oiio_python` backend without needing
+    # the OpenImageIO bindings
+    converter.backend = "oiio_python"
+    return converter
+
+
+def test_converter_kills_workers_on_error():
+    processes = []
+
+    async def convert():
+        async with create_pool_converter() as converter:
+            executor = converter._executor
+            loop = asyncio.get_running_loop()
+            futures = [
+                loop.run_in_executor(executor, time.sleep, 30)
+                for _ in range(3)
+            ]
+            # Wait for the workers to start
+            while len(executor._processes or {}) < 2:
+                await asyncio.sleep(0.01)
+            processes.extend(executor._processes.values())
+            for future in futures:
+                future.cancel()
+            raise RuntimeError("conversion failed")
+
+    start = time.perf_counter()
+    with pytest.raises(RuntimeError, match="conversion failed"):
+        asyncio.run(convert())
+    # Running conversions are killed rather than waited for
+    assert time.perf_counter() - start < 10
+    assert not any(process.is_alive() for process in processes)
+
+
+def test_converter_joins_workers_when_done():
+    async def convert():
+        async with create_pool_converter() as converter:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(converter._executor, time.sleep, 0)
+            processes = list(converter._executor._processes.values())
+        assert converter._executor is None
+        return processes
+
+    processes = asyncio.run(convert())
+    assert processes
+    assert not any(process.is_alive() for process in processes)
@@ -0,0 +1,185 @@
+import sys
+import asyncio
+import inspect
+
+import pytest
+
+from ayon_colorbleed import lib
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+async def delayed(value, delay):
+    await asyncio.sleep(delay)
+    return value
+
+
+def test_results_are_in_input_order():
+    delays = {"a": 0.03, "b": 0.0, "c": 0.02, "d": 0.01}
+
+    async def process(filepath):
+        return await delayed(filepath.upper(), delays[filepath])
+
+    async def collect_completed():
+        return [item async for item, _ in lib.iter_pool_results(
+            delays, process, max_concurrent=4)]
+
+    assert run(lib.process_files_in_pool(
+        delays, process, pool_size=4)) == ["A", "B", "C", "D"]
+    assert run(collect_completed()) == ["b", "d", "c", "a"]
+
+
+def test_limiter_bounds_concurrency():
+    limiter = lib.AdaptiveLimiter(2)
+    active = []
+
+    async def process(filepath):
+        active.append(limiter.active)
+        return await delayed(filepath, 0.01)
+
+    run(lib.process_files_in_pool(range(6), process, limiter=limiter))
+    assert max(active) == 2
+    assert limiter.completed == 6
+
+
+def test_fail_fast_cancels_running_work():
+    started = []
+    cancelled = []
+
+    async def process(filepath):
+        started.append(filepath)
+        if filepath == "bad":
+            raise ValueError("broken frame")
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(filepath)
+            raise
+
+    with pytest.raises(lib.PoolError) as exc_info:
+        run(lib.process_files_in_pool(
+            ["slow", "bad", "queued", "never"], process, pool_size=2))
+    assert list(exc_info.value.failures) == ["bad"]
+    # Running work is cancelled and no new work is started
+    assert sorted(cancelled) == ["queued", "slow"]
+    assert "never" not in started
+
+
+def test_without_fail_fast_all_failures_are_raised():
+    processed = []
+
+    async def process(filepath):
+        processed.append(filepath)
+        if filepath.startswith("bad"):
+            raise ValueError(filepath)
+        return filepath
+
+    with pytest.raises(lib.PoolError) as exc_info:
+        run(lib.process_files_in_pool(
+            ["bad1", "good", "bad2"], process, pool_size=1,
+            fail_fast=False))
+    assert sorted(exc_info.value.failures) == ["bad1", "bad2"]
+    assert processed == ["bad1", "good", "bad2"]
+
+
+def test_iterator_errors_are_raised():
+    def iter_filepaths():
+        yield 1
+        yield 2
+        raise OSError("folder disappeared")
+
+    async def process(filepath):
+        return filepath * 10
+
+    with pytest.raises(OSError, match="folder disappeared"):
+        run(lib.process_files_in_pool(iter_filepaths(), process, pool_size=1))
+    with pytest.raises(OSError, match="folder disappeared"):
+        run(lib.process_files_in_pool(iter_filepaths(), process, pool_size=4))
+
+
+def test_tasks_pool_closes_unstarted_coroutines():
+    async def fail():
+        raise ValueError("first task failed")
+
+    coroutines = [fail()] + [delayed(index, 0) for index in range(5)]
+    with pytest.raises(ValueError, match="first task failed"):
+        run(lib.create_tasks_pool(iter(coroutines), max_concurrent=2))
+    assert all(
+        inspect.getcoroutinestate(coroutine) == inspect.CORO_CLOSED
+        for coroutine in coroutines
+    )
+
+
+def test_tasks_pool_results_are_in_input_order():
+    coroutines = [delayed(index, 0.01 * (3 - index)) for index in range(3)]
+    assert run(lib.create_tasks_pool(coroutines, max_concurrent=3)) == [
+        0, 1, 2]
+
+
+def test_meminfo_available(tmp_path, monkeypatch):
+    meminfo = tmp_path / "meminfo"
+    meminfo.write_text(
+        "MemTotal:       32000000 kB\n"
+        "MemFree:          500000 kB\n"
+        "MemAvailable:   16000000 kB\n"
+    )
+    real_open = open
+
+    def fake_open(path, *args, **kwargs):
+        if path == "/proc/meminfo":
+            path = str(meminfo)
+        return real_open(path, *args, **kwargs)
+
+    monkeypatch.setattr(lib, "open", fake_open, raising=False)
+    # Includes reclaimable page cache rather than only the free pages
+    assert lib._get_meminfo_available() == 16000000 * 1024
+
+    meminfo.write_text("MemTotal:       32000000 kB\n")
+    assert lib._get_meminfo_available() is None
+
+
+def test_available_memory_prefers_meminfo_over_sysconf(monkeypatch):
+    monkeypatch.setitem(sys.modules, "psutil", None)
+    monkeypatch.setattr(lib, "_get_meminfo_available", lambda: 1024 ** 3)
+    assert lib.get_available_memory() == 1024 ** 3
+
+
+def test_default_pool_size_is_limited_by_memory(monkeypatch):
+    monkeypatch.setattr(lib.os, "cpu_count", lambda: 16)
+    monkeypatch.setattr(
+        lib, "get_available_memory", lambda: 3 * lib.MEMORY_PER_WORKER)
+    assert lib.get_default_pool_size() == 3
+
+    monkeypatch.setattr(lib, "get_available_memory", lambda: 0)
+    assert lib.get_default_pool_size() == 1
+
+    monkeypatch.setattr(lib, "get_available_memory", lambda: None)
+    assert lib.get_default_pool_size() == 16
+
+
+def test_shared_limiter_uses_settings_of_queued_projects(monkeypatch):
+    from conftest import load_plugin
+
+    loader = load_plugin("load/convert_to_apng.py")
+    apngc_settings = {
+        "shots": {"pool_size": 8, "adaptive_pool_size": False},
+        "assets": {"pool_size": 3, "adaptive_pool_size": True},
+        "default": {"pool_size": 0},
+    }
+    monkeypatch.setattr(
+        loader.ConvertToAPNG,
+        "get_apngc_settings",
+        classmethod(lambda cls, project_name: apngc_settings[project_name])
+    )
+    monkeypatch.setattr(lib, "get_default_pool_size", lambda: 4)
+
+    limiter = loader.ConvertToAPNG.get_shared_limiter({"shots", "assets"})
+    assert limiter.max_concurrent == 3
+    assert limiter.adaptive
+
+    # Projects without a pool size use the default pool size
+    limiter = loader.ConvertToAPNG.get_shared_limiter({"shots", "default"})
+    assert limiter.max_concurrent == 4
+    assert not limiter.adaptive
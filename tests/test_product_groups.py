@@ -0,0 +1,132 @@
+import logging
+
+import pyblish.api
+
+from conftest import load_plugin
+
+
+def create_instance(context, product_name, folder_id="folder1", **data):
+    return pyblish.api.Instance(context, {
+        "name": product_name,
+        "productName": product_name,
+        "folderEntity": {"id": folder_id},
+        **data
+    })
+
+
+def set_user_group(instance, product_group):
+    instance.data["publish_attributes"] = {
+        "CollectUserProductGroup": {"productGroup": product_group}
+    }
+
+
+def test_user_product_group_uses_existing_groups(caplog):
+    caplog.set_level(logging.INFO)
+    plugin = load_plugin(
+        "publish/collect_product_group.py").CollectUserProductGroup()
+    context = pyblish.api.Context({
+        "existingProductGroups": {
+            "folder1": {"modelMain": "Models", "lookMain": "Looks"}
+        }
+    })
+
+    # The existing group is left to the integrator when the user sets none
+    keep = create_instance(context, "modelMain")
+    # User defined group replaces the existing group
+    change = create_instance(context, "lookMain")
+    set_user_group(change, "Lookdev")
+    # Collected group is never replaced by the existing group
+    collected = create_instance(context, "modelMain", productGroup="Props")
+    # New product without group
+    new = create_instance(context, "rigMain")
+
+    for instance in context:
+        plugin.process(instance)
+
+    assert "productGroup" not in keep.data
+    assert change.data["productGroup"] == "Lookdev"
+    assert "from 'Looks' to 'Lookdev'" in caplog.text
+    assert collected.data["productGroup"] == "Props"
+    assert "productGroup" not in new.data
+
+
+def test_validate_product_group_change_with_mocked_server(
+    monkeypatch, caplog
+):
+    collector_module = load_plugin(
+        "publish/collect_existing_product_groups.py")
+    validator_module = load_plugin("publish/validate_product_group.py")
+
+    products = [
+        {"name": "modelMain", "folderId": "folder1",
+         "attrib": {"productGroup": "Models"}},
+        {"name": "lookMain", "folderId": "folder1",
+         "attrib": {"productGroup": None}},
+        # Queried because of the names and folders of other instances, but
+        # not a product of any instance
+        {"name": "modelMain", "folderId": "folder2",
+         "attrib": {"productGroup": "Other"}},
+    ]
+    calls = []
+
+    def get_products(project_name, folder_ids=None, product_names=None,
+                     fields=None):
+        calls.append({
+            "project_name": project_name,
+            "folder_ids": set(folder_ids),
+            "product_names": set(product_names),
+            "fields": set(fields),
+        })
+        return iter(
+            product for product in products
+            if product["folderId"] in folder_ids
+            and product["name"] in product_names
+        )
+
+    monkeypatch.setattr(collector_module, "get_products", get_products)
+
+    context = pyblish.api.Context({"projectName": "demo"})
+    changed = create_instance(context, "modelMain", productGroup="Props")
+    unchanged = create_instance(context, "lookMain", productGroup="Looks")
+    create_instance(context, "rigMain", folder_id="folder2",
+                    productGroup="Rigs")
+    create_instance(context, "skipped", publish=False)
+
+    collector_module.CollectExistingProductGroups().process(context)
+
+    # All instances are resolved with a single projected query
+    assert calls == [{
+        "project_name": "demo",
+        "folder_ids": {"folder1", "folder2"},
+        "product_names": {"modelMain", "lookMain", "rigMain"},
+        "fields": {"name", "folderId", "attrib.productGroup"},
+    }]
+    assert context.data["existingProductGroups"] == {
+        "folder1": {"modelMain": "Models", "lookMain": None}
+    }
+
+    validator = validator_module.ValidateProductGroupChange()
+    with caplog.at_level("WARNING"):
+        for instance in context:
+            validator.process(instance)
+
+    warnings = [
+        record.getMessage() for record in caplog.records
+        if record.levelname == "WARNING"
+    ]
+    assert warnings == ["Product group changes from `Models` to `Props`"]
+    assert changed.data["productGroup"] == "Props"
+    assert unchanged.data["productGroup"] == "Looks"
+
+
+def test_collect_existing_product_groups_without_instances(monkeypatch):
+    collector_module = load_plugin(
+        "publish/collect_existing_product_groups.py")
+
+    def get_products(*args, **kwargs):
+        raise AssertionError("Server should not be queried")
+
+    monkeypatch.setattr(collector_module, "get_products", get_products)
+    context = pyblish.api.Context({"projectName": "demo"})
+    collector_module.CollectExistingProductGroups().process(context)
+    assert context.data["existingProductGroups"] == {}
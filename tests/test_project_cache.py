@@ -0,0 +1,112 @@
+import pytest
+
+from ayon_colorbleed import project_cache
+
+from conftest import load_plugin
+
+
+@pytest.fixture
+def projects(monkeypatch):
+    """Patch the server with a project and count the requests."""
+    calls = []
+    projects = {
+        "demo": {
+            "name": "demo",
+            "statuses": [{"name": "In progress"}, {"name": "Approved"}],
+        }
+    }
+
+    def get_project(project_name, fields=None):
+        calls.append((project_name, fields))
+        project_entity = projects.get(project_name)
+        if project_entity is None:
+            return None
+        if fields is None:
+            return dict(project_entity)
+        return {key: project_entity[key] for key in fields}
+
+    monkeypatch.setattr(project_cache.ayon_api, "get_project", get_project)
+    project_cache.invalidate_project_cache()
+    yield projects, calls
+    project_cache.invalidate_project_cache()
+
+
+def test_statuses_are_cached(projects):
+    _projects, calls = projects
+    for _ in range(3):
+        statuses = project_cache.get_project_statuses("demo")
+    assert [status["name"] for status in statuses] == [
+        "In progress", "Approved"]
+    assert calls == [("demo", frozenset({"statuses"}))]
+
+
+def test_cache_expires(projects, monkeypatch):
+    _projects, calls = projects
+    now = [1000.0]
+    monkeypatch.setattr(project_cache.time, "monotonic", lambda: now[0])
+
+    project_cache.get_project_entity("demo", ttl=10)
+    now[0] += 5
+    project_cache.get_project_entity("demo", ttl=10)
+    assert len(calls) == 1
+    now[0] += 10
+    project_cache.get_project_entity("demo", ttl=10)
+    assert len(calls) == 2
+
+
+def test_cached_entity_is_a_copy(projects):
+    statuses = project_cache.get_project_statuses("demo")
+    statuses.append({"name": "Changed"})
+    statuses[0]["name"] = "Changed"
+    assert [
+        status["name"]
+        for status in project_cache.get_project_statuses("demo")
+    ] == ["In progress", "Approved"]
+
+
+def test_invalidate_project_cache(projects):
+    project_entities, calls = projects
+    project_cache.get_project_statuses("demo")
+    project_entities["demo"]["statuses"] = [{"name": "Omitted"}]
+    assert project_cache.get_project_statuses("demo")[0]["name"] == (
+        "In progress")
+
+    project_cache.invalidate_project_cache("demo")
+    assert project_cache.get_project_statuses("demo")[0]["name"] == "Omitted"
+    assert len(calls) == 2
+
+
+def test_missing_project_is_not_cached(projects):
+    _projects, calls = projects
+    assert project_cache.get_project_statuses("missing") == []
+    assert project_cache.get_project_statuses("missing") == []
+    assert len(calls) == 2
+
+
+def test_set_status_refreshes_outdated_statuses(projects):
+    import pyblish.api
+
+    project_entities, _calls = projects
+    plugin_module = load_plugin("publish/set_status.py")
+    plugin_cls = plugin_module.SetVersionStatus
+
+    # Status was added after the statuses were cached
+    project_cache.get_project_statuses("demo")
+    project_entities["demo"]["statuses"] = [
+        {"name": "In progress"}, {"name": "Omitted"}]
+
+    context = pyblish.api.Context({"projectName": "demo"})
+    instance = pyblish.api.Instance(context, {
+        "name": "modelMain",
+        "publish_attributes": {"SetVersionStatus": {"status": "Omitted"}},
+    })
+    plugin_cls().process(instance)
+    assert instance.data["status"] == "Omitted"
+    assert "Omitted" in plugin_cls.statuses
+
+    unknown = pyblish.api.Instance(context, {
+        "name": "modelOther",
+        "publish_attributes": {"SetVersionStatus": {"status": "Unknown"}},
+    })
+    plugin_cls().process(unknown)
+    assert "status" not in unknown.data
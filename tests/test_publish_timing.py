@@ -0,0 +1,175 @@
+import json
+import threading
+
+import pytest
+import ayon_api
+import pyblish.api
+
+from ayon_colorbleed import publish_timing
+from ayon_colorbleed.publish_timing import (
+    TIMINGS_KEY,
+    count_server_calls,
+    summarize_timings,
+    timed,
+)
+from conftest import load_plugin
+
+
+class FakeConnection:
+    def __init__(self):
+        self.requests = []
+
+    def _do_rest_request(self, url):
+        self.requests.append(url)
+        return url
+
+
+@pytest.fixture
+def con(monkeypatch):
+    con = FakeConnection()
+    monkeypatch.setattr(
+        ayon_api, "get_server_api_connection", lambda: con)
+    return con
+
+
+def request_in_thread(con, url):
+    thread = threading.Thread(target=con._do_rest_request, args=(url,))
+    thread.start()
+    thread.join()
+
+
+def test_count_server_calls_nested(con):
+    with count_server_calls() as outer:
+        con._do_rest_request("a")
+        with count_server_calls() as inner:
+            con._do_rest_request("b")
+        # The outer counter is still counting after the inner context
+        con._do_rest_request("c")
+        # Requests of other threads on the shared connection
+        request_in_thread(con, "d")
+
+    assert outer == [3]
+    assert inner == [1]
+    assert con.requests == ["a", "b", "c", "d"]
+    # The method of the class is used again
+    assert "_do_rest_request" not in vars(con)
+
+
+def test_count_server_calls_without_connection(monkeypatch):
+    monkeypatch.setattr(
+        ayon_api, "get_server_api_connection", lambda: None)
+    with count_server_calls() as counter:
+        pass
+    assert counter == [0]
+
+
+class TimedCollector(pyblish.api.InstancePlugin):
+    @timed
+    def process(self, instance):
+        ayon_api.get_server_api_connection()._do_rest_request("products")
+        if instance.data.get("fail"):
+            raise ValueError("collector failed")
+
+
+class TimedContextCollector(pyblish.api.ContextPlugin):
+    @timed
+    def process(self, context):
+        pass
+
+
+def test_timed_records_per_instance(con, monkeypatch):
+    clock = iter([10.0, 10.5, 20.0, 22.0, 30.0, 30.25])
+    monkeypatch.setattr(
+        publish_timing.time, "perf_counter", lambda: next(clock))
+
+    context = pyblish.api.Context()
+    plugin = TimedCollector()
+    plugin.process(pyblish.api.Instance(context, {"name": "modelMain"}))
+    with pytest.raises(ValueError, match="collector failed"):
+        plugin.process(
+            pyblish.api.Instance(context, {"name": "rigMain", "fail": True}))
+    TimedContextCollector().process(context)
+
+    assert context.data[TIMINGS_KEY] == [
+        {
+            "plugin": "TimedCollector",
+            "instance": "modelMain",
+            "duration": 0.5,
+            "server_calls": 1,
+        },
+        # Failed plugins are recorded too
+        {
+            "plugin": "TimedCollector",
+            "instance": "rigMain",
+            "duration": 2.0,
+            "server_calls": 1,
+        },
+        {
+            "plugin": "TimedContextCollector",
+            "instance": None,
+            "duration": 0.25,
+            "server_calls": 0,
+        },
+    ]
+    assert "_do_rest_request" not in vars(con)
+
+
+def test_timed_keeps_argument_name():
+    # Pyblish passes the instance or context by the argument name
+    assert TimedCollector.process.__name__ == "process"
+    assert publish_timing.inspect.getfullargspec(
+        TimedCollector.process).args == ["self", "instance"]
+
+    with pytest.raises(TypeError, match="'item'"):
+        @timed
+        def process(self, item):
+            pass
+
+
+def test_summarize_timings():
+    timings = [
+        {"plugin": "A", "instance": "x", "duration": 1.0, "server_calls": 2},
+        {"plugin": "B", "instance": None, "duration": 3.0, "server_calls": 0},
+        {"plugin": "A", "instance": "y", "duration": 2.5, "server_calls": 1},
+    ]
+    assert summarize_timings(timings) == [
+        {"plugin": "A", "duration": 3.5, "server_calls": 3, "count": 2},
+        {"plugin": "B", "duration": 3.0, "server_calls": 0, "count": 1},
+    ]
+    assert summarize_timings([]) == []
+
+
+def test_report_writes_json(tmp_path, caplog):
+    plugin = load_plugin(
+        "publish/report_publish_timings.py").ReportPublishTimings()
+    plugin.json_directory = str(tmp_path / "timings")
+    timings = [
+        {"plugin": "A", "instance": "x", "duration": 1.0, "server_calls": 2},
+    ]
+    context = pyblish.api.Context({
+        TIMINGS_KEY: timings,
+        "projectName": "demo",
+        "hostName": "maya",
+    })
+
+    with caplog.at_level("INFO"):
+        plugin.process(context)
+    assert "1.000s    2 calls    1x  A" in caplog.text
+
+    filepaths = list((tmp_path / "timings").iterdir())
+    assert len(filepaths) == 1
+    assert filepaths[0].name.startswith("publish_timings_")
+    with open(filepaths[0], encoding="utf-8") as f:
+        data = json.load(f)
+    assert data["project"] == "demo"
+    assert data["host"] == "maya"
+    assert data["timings"] == timings
+    assert data["summary"] == summarize_timings(timings)
+
+
+def test_report_without_timings_writes_nothing(tmp_path):
+    plugin = load_plugin(
+        "publish/report_publish_timings.py").ReportPublishTimings()
+    plugin.json_directory = str(tmp_path / "timings")
+    plugin.process(pyblish.api.Context())
+    assert not (tmp_path / "timings").exists()
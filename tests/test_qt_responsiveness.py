@@ -0,0 +1,117 @@
+"""Compare UI responsiveness of running conversions in the loader.
+
+The loader used to run the conversion on the UI thread and poll
+`QApplication.processEvents` every 10 ms from within the asyncio event loop
+(`update_qt`). It now runs the coroutine in a `CoroutineThread` while the UI
+thread waits in a nested `QEventLoop`.
+
+The coroutine simulates a conversion that runs short blocking steps on its
+event loop thread, like compressing frames or writing files does. A timer
+on the UI thread measures how late its events are handled, and the CPU time
+of the UI thread is measured while the conversion runs. The timings are
+only asserted when benchmarks are enabled, see `conftest.BENCHMARKS_ENV`.
+"""
+import time
+import asyncio
+import contextlib
+
+import pytest
+
+from conftest import load_plugin
+
+# Duration of a blocking step of the simulated conversion
+BLOCKING_STEP = 0.1
+BLOCKING_STEPS = 5
+TIMER_INTERVAL_MS = 20
+
+
+async def simulated_conversion():
+    for _ in range(BLOCKING_STEPS):
+        time.sleep(BLOCKING_STEP)
+        await asyncio.sleep(0.02)
+    return "done"
+
+
+async def update_qt(app):
+    """Previous approach of keeping the UI responsive, for comparison."""
+    while True:
+        app.processEvents()
+        await asyncio.sleep(0.01)
+
+
+def run_task_with_polling(app, task):
+    async def runner():
+        background = asyncio.ensure_future(update_qt(app))
+        try:
+            return await task
+        finally:
+            background.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await background
+    return asyncio.run(runner())
+
+
+def measure(app, run):
+    """Return max UI event latency and UI thread CPU time of `run`."""
+    from qtpy import QtCore
+
+    latencies = []
+    expected = [time.perf_counter() + TIMER_INTERVAL_MS / 1000]
+
+    def on_timeout():
+        now = time.perf_counter()
+        latencies.append(max(0.0, now - expected[0]))
+        expected[0] = now + TIMER_INTERVAL_MS / 1000
+
+    timer = QtCore.QTimer()
+    timer.setTimerType(QtCore.Qt.PreciseTimer)
+    timer.timeout.connect(on_timeout)
+    timer.start(TIMER_INTERVAL_MS)
+
+    cpu_start = time.thread_time()
+    result = run()
+    cpu_time = time.thread_time() - cpu_start
+    timer.stop()
+
+    assert result == "done"
+    assert latencies, "UI timer never fired"
+    return max(latencies), cpu_time
+
+
+def test_coroutine_thread_handles_ui_events(qapp):
+    loader = load_plugin("load/convert_to_apng.py")
+
+    # UI events are handled while the conversion runs
+    measure(
+        qapp, lambda: loader.run_task_with_qt_update(simulated_conversion()))
+
+
+@pytest.mark.benchmark
+def test_coroutine_thread_keeps_ui_responsive(qapp):
+    loader = load_plugin("load/convert_to_apng.py")
+
+    polling_latency, polling_cpu = measure(
+        qapp, lambda: run_task_with_polling(qapp, simulated_conversion()))
+    thread_latency, thread_cpu = measure(
+        qapp, lambda: loader.run_task_with_qt_update(simulated_conversion()))
+
+    print(
+        f"\nupdate_qt polling: max UI latency {polling_latency * 1000:.1f} "
+        f"ms, UI thread CPU {polling_cpu * 1000:.1f} ms"
+        f"\nCoroutineThread:   max UI latency {thread_latency * 1000:.1f} "
+        f"ms, UI thread CPU {thread_cpu * 1000:.1f} ms"
+    )
+    # Polling can't handle UI events while the event loop thread is blocked
+    assert polling_latency >= BLOCKING_STEP * 0.5
+    assert thread_latency < BLOCKING_STEP * 0.5
+    assert thread_latency < polling_latency
+
+
+def test_coroutine_thread_raises_error(qapp):
+    loader = load_plugin("load/convert_to_apng.py")
+
+    async def fail():
+        raise ValueError("conversion failed")
+
+    with pytest.raises(ValueError, match="conversion failed"):
+        loader.run_task_with_qt_update(fail())
@@ -0,0 +1,149 @@
+import os
+
+import pytest
+
+from ayon_colorbleed import sequence
+
+
+@pytest.fixture(autouse=True)
+def clear_folder_index():
+    sequence.clear_folder_index()
+    yield
+    sequence.clear_folder_index()
+
+
+def touch(folder, *filenames):
+    for filename in filenames:
+        open(os.path.join(folder, filename), "wb").close()
+
+
+def bump_mtime(folder):
+    # Filesystems may not have a finer mtime resolution than the test runs
+    mtime = os.stat(folder).st_mtime_ns + 1_000_000_000
+    os.utime(folder, ns=(mtime, mtime))
+
+
+@pytest.mark.parametrize("filename, frame, head, padding", [
+    ("render.1001.exr", None, "render.", 4),
+    ("render.1001.exr", 1001, "render.", 4),
+    # The frame from the context is preferred over the last number
+    ("sh010_1001_v002.exr", "1001", "sh010_", 4),
+    ("sh010_1001_v002.exr", None, "sh010_1001_v", 3),
+    # Of the numbers matching the frame the last one is used
+    ("sh002_v002.0002.exr", 2, "sh002_v002.", 4),
+    # Frames that are not in the filename or not numbers are ignored
+    ("render.1001.exr", 1050, "render.", 4),
+    ("render.1001.exr", "#", "render.", 4),
+])
+def test_frame_pattern(filename, frame, head, padding):
+    pattern, result_padding = sequence.get_frame_pattern(filename, frame)
+    match = pattern.match(filename)
+    assert match.group("head") == head
+    assert result_padding == padding
+
+
+def test_frame_pattern_without_number():
+    with pytest.raises(ValueError, match="No frame number"):
+        sequence.get_frame_pattern("render.exr")
+
+
+def test_collection_filters_padding():
+    pattern, padding = sequence.get_frame_pattern("render.1001.exr")
+    filenames = [
+        "render.0999.exr",
+        "render.1001.exr",
+        # Frames beyond the padding are not padded
+        "render.10000.exr",
+        # Frames with another padding belong to another sequence
+        "render.999.exr",
+        "render.01002.exr",
+        "render.1003.png",
+        "other.1004.exr",
+    ]
+    collection = sequence.collection_from_filenames(
+        "/renders", filenames, pattern, padding)
+    assert collection.head == os.path.join("/renders", "render.")
+    assert collection.tail == ".exr"
+    assert collection.padding == 4
+    assert collection.indexes == {999, 1001, 10000}
+
+    assert sequence.collection_from_filenames(
+        "/renders", ["other.1001.exr"], pattern, padding) is None
+
+
+def test_sequence_from_representation_files(tmp_path, monkeypatch):
+    def list_folder(folder):
+        raise AssertionError("Folder was listed")
+
+    monkeypatch.setattr(sequence, "list_folder", list_folder)
+    repre_entity = {
+        "context": {"frame": "1001"},
+        "files": [
+            {"path": f"{{root[work]}}/renders/render.{frame}.exr"}
+            for frame in range(1001, 1004)
+        ] + [{"path": ""}],
+    }
+    collection = sequence.get_representation_sequence(
+        repre_entity, str(tmp_path / "render.1001.exr"))
+    assert collection.head == str(tmp_path / "render.")
+    assert collection.indexes == {1001, 1002, 1003}
+
+
+@pytest.mark.parametrize("files", [
+    None,
+    [],
+    # Files that do not belong to the sequence of the path
+    [{"path": "/renders/preview.mov"}],
+])
+def test_sequence_falls_back_to_folder_scan(tmp_path, files):
+    touch(tmp_path, "render.1001.exr", "render.1002.exr", "render.mov")
+    repre_entity = {"files": files}
+    collection = sequence.get_representation_sequence(
+        repre_entity, str(tmp_path / "render.1001.exr"))
+    assert collection.indexes == {1001, 1002}
+
+
+def test_sequence_not_found(tmp_path):
+    touch(tmp_path, "other.1001.exr")
+    with pytest.raises(ValueError, match="No sequence collection found"):
+        sequence.get_representation_sequence(
+            {}, str(tmp_path / "render.1001.exr"))
+
+
+def test_list_folder_is_cached_until_mtime_changes(tmp_path, monkeypatch):
+    folder = str(tmp_path)
+    touch(folder, "render.1001.exr")
+    scandir = os.scandir
+    scanned = []
+
+    def counting_scandir(path):
+        scanned.append(path)
+        return scandir(path)
+
+    monkeypatch.setattr(sequence.os, "scandir", counting_scandir)
+
+    assert sequence.list_folder(folder) == ["render.1001.exr"]
+    assert sequence.list_folder(folder) == ["render.1001.exr"]
+    assert scanned == [folder]
+
+    touch(folder, "render.1002.exr")
+    bump_mtime(folder)
+    assert sorted(sequence.list_folder(folder)) == [
+        "render.1001.exr", "render.1002.exr"]
+    assert scanned == [folder, folder]
+
+
+def test_list_folder_evicts_least_recently_used(tmp_path, monkeypatch):
+    monkeypatch.setattr(sequence, "FOLDER_INDEX_SIZE", 2)
+    folders = []
+    for name in ("a", "b", "c"):
+        folder = tmp_path / name
+        folder.mkdir()
+        folders.append(str(folder))
+
+    sequence.list_folder(folders[0])
+    sequence.list_folder(folders[1])
+    # Using the listing of `a` again makes `b` the least recently used
+    sequence.list_folder(folders[0])
+    sequence.list_folder(folders[2])
+    assert list(sequence._FOLDER_INDEX) == [folders[0], folders[2]]
@@ -0,0 +1,186 @@
+import os
+import errno
+import shutil
+import struct
+import tempfile
+import zlib
+
+import clique
+import pytest
+
+from ayon_colorbleed import staging
+from ayon_colorbleed.png import PNG_SIGNATURE
+
+
+def write_png(path, width, height, bit_depth=8, color_type=6):
+    ihdr = struct.pack(
+        ">IIBBBBB", width, height, bit_depth, color_type, 0, 0, 0)
+    data = b""
+    for chunk_type, chunk_data in ((b"IHDR", ihdr), (b"IDAT", b"")):
+        chunk = chunk_type + chunk_data
+        data += (
+            struct.pack(">I", len(chunk_data))
+            + chunk
+            + struct.pack(">I", zlib.crc32(chunk))
+        )
+    # Only the headers are read, so the image data can be left out
+    path.write_bytes(PNG_SIGNATURE + data)
+
+
+def test_estimate_only_counts_converted_frames(tmp_path):
+    for frame in range(1, 5):
+        write_png(tmp_path / f"render.{frame:04d}.png", 100, 50)
+    collection = clique.Collection(
+        str(tmp_path / "render."), ".png", 4, set(range(1, 5)))
+
+    staged, to_convert = staging.get_staged_frames(collection)
+    # 8-bit RGBA PNGs are linked, not converted
+    assert sorted(staged) == sorted(collection)
+    assert to_convert == []
+    assert staging.estimate_staging_bytes([to_convert]) == 0
+
+    frames = list(collection)[:2]
+    expected = int(
+        100 * 50 * staging.STAGED_BYTES_PER_PIXEL
+        * staging.STAGED_PNG_COMPRESSION_RATIO
+    ) * 2
+    assert staging.estimate_staging_bytes([frames, []]) == expected
+
+
+def test_select_scratch_directory_is_advisory(tmp_path, caplog):
+    scratch = str(tmp_path / "scratch")
+    assert staging.select_scratch_directory(0, scratch) == scratch
+
+    directory = staging.select_scratch_directory(2 ** 62, scratch)
+    assert directory in (scratch, tempfile.gettempdir())
+    assert "No scratch directory has enough free space" in caplog.text
+
+
+# Larger than the buffer of the streamed copy
+DELIVERED_DATA = os.urandom(3 * 1024 ** 2 + 7)
+PREVIOUS_DATA = b"previous output"
+
+
+@pytest.fixture
+def cross_device(monkeypatch, tmp_path):
+    """Deliver to a path of which `os.replace` from the source fails.
+
+    Returns source and destination paths. The destination holds previous
+    output, which is checked to be intact until the final rename.
+    """
+    src = tmp_path / "src" / "turntable.png"
+    src.parent.mkdir()
+    src.write_bytes(DELIVERED_DATA)
+    dst = tmp_path / "dst" / "turntable.png"
+    dst.parent.mkdir()
+    dst.write_bytes(PREVIOUS_DATA)
+
+    replace = os.replace
+
+    def cross_device_replace(source, target):
+        if os.path.dirname(source) == str(src.parent):
+            raise OSError(errno.EXDEV, "Invalid cross-device link")
+        # Renaming the fully written temporary file
+        assert dst.read_bytes() == PREVIOUS_DATA
+        assert os.path.getsize(source) == len(DELIVERED_DATA)
+        return replace(source, target)
+
+    monkeypatch.setattr(staging.os, "replace", cross_device_replace)
+    return src, dst
+
+
+def assert_delivered(src, dst):
+    assert dst.read_bytes() == DELIVERED_DATA
+    # The source is only removed when renamed
+    assert src.read_bytes() == DELIVERED_DATA
+    assert os.listdir(dst.parent) == [dst.name]
+
+
+def test_deliver_file_renames_on_same_filesystem(tmp_path):
+    src = tmp_path / "turntable.tmp"
+    src.write_bytes(DELIVERED_DATA)
+    dst = tmp_path / "turntable.png"
+    dst.write_bytes(PREVIOUS_DATA)
+
+    staging.deliver_file(str(src), str(dst))
+    assert dst.read_bytes() == DELIVERED_DATA
+    assert not src.exists()
+
+
+def test_deliver_file_reflinks_across_devices(cross_device, monkeypatch):
+    src, dst = cross_device
+
+    def clone_file(src_fd, dst_fd):
+        # Reflinks are not supported by every filesystem tests run on
+        os.write(dst_fd, os.pread(src_fd, len(DELIVERED_DATA), 0))
+        return True
+
+    def copy_file_range(*args):
+        raise AssertionError("Data was copied after reflinking it")
+
+    monkeypatch.setattr(staging, "_clone_file", clone_file)
+    monkeypatch.setattr(staging, "_copy_file_range", copy_file_range)
+    staging.deliver_file(str(src), str(dst))
+    assert_delivered(src, dst)
+
+
+@pytest.mark.skipif(
+    not hasattr(os, "copy_file_range"), reason="Requires copy_file_range")
+def test_deliver_file_copies_file_range_across_devices(
+    cross_device, monkeypatch
+):
+    src, dst = cross_device
+    monkeypatch.setattr(staging, "_clone_file", lambda *args: False)
+
+    def copyfileobj(*args, **kwargs):
+        raise AssertionError("Data was streamed")
+
+    monkeypatch.setattr(staging.shutil, "copyfileobj", copyfileobj)
+    staging.deliver_file(str(src), str(dst))
+    assert_delivered(src, dst)
+
+
+def test_deliver_file_streams_after_failed_copy_file_range(
+    cross_device, monkeypatch
+):
+    src, dst = cross_device
+    monkeypatch.setattr(staging, "_clone_file", lambda *args: False)
+    calls = []
+
+    def copy_file_range(src_fd, dst_fd, count):
+        # Copy part of the data before failing
+        calls.append(count)
+        if len(calls) > 1:
+            raise OSError(errno.EXDEV, "Invalid cross-device link")
+        data = os.read(src_fd, 1024)
+        return os.write(dst_fd, data)
+
+    monkeypatch.setattr(
+        staging.os, "copy_file_range", copy_file_range, raising=False)
+    staging.deliver_file(str(src), str(dst))
+    assert len(calls) == 2
+    assert_delivered(src, dst)
+
+
+def test_deliver_file_leaves_destination_on_error(cross_device, monkeypatch):
+    src, dst = cross_device
+    monkeypatch.setattr(staging, "_clone_file", lambda *args: False)
+    monkeypatch.setattr(staging, "_copy_file_range", lambda *args: False)
+    copyfileobj = shutil.copyfileobj
+
+    def copyfileobj_disk_full(fsrc, fdst, length=0):
+        fdst.write(fsrc.read(1024))
+        raise OSError(errno.ENOSPC, "No space left on device")
+
+    monkeypatch.setattr(staging.shutil, "copyfileobj", copyfileobj_disk_full)
+    with pytest.raises(OSError, match="No space left"):
+        staging.deliver_file(str(src), str(dst))
+
+    # The previous output is intact and the temporary file is removed
+    assert dst.read_bytes() == PREVIOUS_DATA
+    assert os.listdir(dst.parent) == [dst.name]
+    assert src.read_bytes() == DELIVERED_DATA
+
+    monkeypatch.setattr(staging.shutil, "copyfileobj", copyfileobj)
+    staging.deliver_file(str(src), str(dst))
+    assert_delivered(src, dst)
@@ -0,0 +1,59 @@
+import logging
+
+from conftest import load_plugin
+
+
+def write_events(path, *events):
+    from ayon_colorbleed.apng_job import StatusWriter
+
+    writer = StatusWriter(str(path))
+    for event, data in events:
+        writer.write(event, **data)
+
+
+def test_watcher_stops_on_terminal_event(qapp, tmp_path, caplog):
+    caplog.set_level(logging.INFO)
+    loader = load_plugin("load/convert_to_apng.py")
+    status_file = tmp_path / "status.jsonl"
+    status_file.write_bytes(b"")
+    watcher = loader.StatusFileWatcher(
+        str(status_file), logging.getLogger("test"))
+    try:
+        write_events(
+            status_file,
+            ("started", {"sequences": ["render.1-10#.exr"]}),
+            ("progress", {"sequence": "render.1-10#.exr",
+                          "done": 5, "total": 10}),
+        )
+        watcher._on_timeout()
+        assert watcher in loader.StatusFileWatcher._active
+        assert status_file.exists()
+
+        write_events(status_file, ("failed", {"error": "APNGC crashed"}))
+        watcher._on_timeout()
+        assert "Converted 5/10" in caplog.text
+        assert "APNGC crashed" in caplog.text
+        assert watcher not in loader.StatusFileWatcher._active
+        assert not status_file.exists()
+    finally:
+        watcher.stop()
+
+
+def test_watcher_stops_when_stale(qapp, tmp_path, caplog):
+    loader = load_plugin("load/convert_to_apng.py")
+    status_file = tmp_path / "status.jsonl"
+    status_file.write_bytes(b"")
+    watcher = loader.StatusFileWatcher(
+        str(status_file), logging.getLogger("test"), stale_timeout=60)
+    try:
+        watcher._on_timeout()
+        assert watcher in loader.StatusFileWatcher._active
+
+        # Pretend the last event was written long ago
+        watcher._last_event_time -= 61
+        watcher._on_timeout()
+        assert "wrote no progress" in caplog.text
+        assert watcher not in loader.StatusFileWatcher._active
+        assert not status_file.exists()
+    finally:
+        watcher.stop()
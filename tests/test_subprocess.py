@@ -0,0 +1,75 @@
+import sys
+import time
+import asyncio
+import logging
+
+import pytest
+
+from ayon_colorbleed import lib
+
+
+def python(code):
+    return [sys.executable, "-c", code]
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_result_unpacks_to_stdout_and_stderr():
+    result = run(lib.run_subprocess_async(python(
+        "import sys; print('out'); print('err', file=sys.stderr); "
+        "sys.exit(3)"
+    )))
+    stdout, stderr = result
+    assert (stdout.strip(), stderr.strip()) == ("out", "err")
+    assert result.stdout == stdout
+    assert result.returncode == 3
+
+
+def test_check_raises_with_stderr():
+    with pytest.raises(lib.SubprocessError) as exc_info:
+        run(lib.run_subprocess_async(python(
+            "import sys; print('broken frame', file=sys.stderr); "
+            "sys.exit(2)"
+        ), check=True))
+    assert exc_info.value.returncode == 2
+    assert "broken frame" in str(exc_info.value)
+
+
+def test_discard_keeps_stderr_tail():
+    result = run(lib.run_subprocess_async(python(
+        "import sys\n"
+        "for i in range(100): print(i); print(i, file=sys.stderr)"
+    ), output="discard", tail_lines=3))
+    assert result.stdout == ""
+    assert result.stderr.split() == ["97", "98", "99"]
+
+
+def test_stream_logs_lines_and_truncates_long_lines(caplog):
+    logger = logging.getLogger("test_subprocess")
+    with caplog.at_level(logging.INFO, logger="test_subprocess"):
+        result = run(lib.run_subprocess_async(python(
+            "print('first'); print('x' * (3 * 1024 ** 2)); print('last')"
+        ), output="stream", logger=logger))
+    assert result.returncode == 0
+    lines = [record.getMessage() for record in caplog.records]
+    assert lines[0] == "first"
+    assert lines[-1] == "last"
+    # The long line is cut off at the limit instead of failing to read
+    assert len(lines) == 3
+    assert lines[1] == "x" * lib.SUBPROCESS_LINE_LIMIT
+
+
+def test_cancelling_kills_the_process():
+    async def cancel():
+        task = asyncio.ensure_future(lib.run_subprocess_async(
+            python("import time; time.sleep(30)"), output="discard"))
+        await asyncio.sleep(0.5)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    start = time.perf_counter()
+    run(cancel())
+    assert time.perf_counter() - start < 10